@@ -0,0 +1,290 @@
+#
+# PDF Benchmarks
+# --------------
+# This script contains the
+# benchmarks of the pdfer hot paths
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+# Usage (from the repo root):
+#   python benchmarks/bench_pdf.py                              # run and print
+#   python benchmarks/bench_pdf.py --save-baseline base.json    # store a baseline
+#   python benchmarks/bench_pdf.py --baseline base.json         # fail on regressions
+#
+
+
+# + + + + + Libraries + + + + +
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+# run from the repo root without installing pdfer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from golog.log import (
+    error_print,
+    warning_print,
+    success_print
+)
+from synthetic import (
+    make_text_pdf,
+    make_table_pdf,
+    make_scanned_pdf
+)
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# document: (generator, pages, quick pages)
+DOCUMENTS = {
+    "text": (make_text_pdf, 10, 10),
+    "many_pages": (make_text_pdf, 500, 100),
+    "scanned": (make_scanned_pdf, 5, 2),
+    "tables": (make_table_pdf, 5, 2),
+}
+# the external tools each backend needs
+POPPLER = 'pdftoppm'
+TESSERACT = 'tesseract'
+JAVA = 'java'
+# a regression is a wall time or peak RSS over the baseline by more than this
+DEFAULT_TOLERANCE = 0.25
+# + + + + + Constants + + + + +
+
+
+# + + + + + Benchmarks + + + + +
+# each benchmark is setup(path, workdir) -> state (not timed), run(state, workdir) -> pages processed
+def _open(path, workdir):
+    from pdfer import PDF
+    return PDF(path, lazy=True)
+
+
+def _open_two(path, workdir):
+    from pdfer import PDF
+    return PDF(path, lazy=True), PDF(path, lazy=True)
+
+
+def _path(path, workdir):
+    return path
+
+
+def run_init(path, workdir):
+    from pdfer import PDF
+    pdf = PDF(path)
+    pdf.close()
+    return pdf.num_pages
+
+
+def run_init_lazy(path, workdir):
+    from pdfer import PDF
+    pdf = PDF(path, lazy=True)
+    pdf.close()
+    return pdf.num_pages
+
+
+def run_get_pdf_text(pdf, workdir):
+    pdf.get_pdf_text()
+    return pdf.num_pages
+
+
+def run_pdf_to_jpgs(pdf, workdir):
+    return len(pdf.pdf_to_jpgs(where=workdir))
+
+
+def run_pdf_to_df_pyocr(pdf, workdir):
+    pdf.pdf_to_df(ocr='pyocr')
+    return pdf.num_pages
+
+
+def run_pdf_to_df_pyocr_preprocess(pdf, workdir):
+    pdf.pdf_to_df(ocr='pyocr', dpi='auto', preprocess='fast')
+    return pdf.num_pages
+
+
+def run_pdf_to_df_pytesseract(pdf, workdir):
+    pdf.pdf_to_df(ocr='pytesseract')
+    return pdf.num_pages
+
+
+def run_get_pdf_tables(pdf, workdir):
+    pdf.get_pdf_tables(pages='all')
+    return pdf.num_pages
+
+
+def run_pdf_rotate(pdf, workdir):
+    pdf.pdf_rotate(90)
+    return pdf.num_pages
+
+
+def run_to_pdf(pdf, workdir):
+    pdf.to_pdf(os.path.join(workdir, "copy.pdf"))
+    return pdf.num_pages
+
+
+def run_add(pdfs, workdir):
+    merged = pdfs[0] + pdfs[1]
+    return merged.num_pages
+
+
+# name: (document, setup, run, tools)
+BENCHMARKS = {
+    "init[text]": ("text", _path, run_init, []),
+    "init[many_pages]": ("many_pages", _path, run_init, []),
+    "init_lazy[many_pages]": ("many_pages", _path, run_init_lazy, []),
+    "get_pdf_text[text]": ("text", _open, run_get_pdf_text, []),
+    "get_pdf_text[many_pages]": ("many_pages", _open, run_get_pdf_text, []),
+    "pdf_to_jpgs[scanned]": ("scanned", _open, run_pdf_to_jpgs, [POPPLER]),
+    "pdf_to_df_pyocr[scanned]": ("scanned", _open, run_pdf_to_df_pyocr, [POPPLER, TESSERACT]),
+    "pdf_to_df_pyocr_preprocess[scanned]": ("scanned", _open, run_pdf_to_df_pyocr_preprocess, [POPPLER, TESSERACT]),
+    "pdf_to_df_pytesseract[scanned]": ("scanned", _open, run_pdf_to_df_pytesseract, [POPPLER, TESSERACT]),
+    "get_pdf_tables[tables]": ("tables", _open, run_get_pdf_tables, [JAVA]),
+    "pdf_rotate[many_pages]": ("many_pages", _open, run_pdf_rotate, []),
+    "to_pdf[many_pages]": ("many_pages", _open, run_to_pdf, []),
+    "add[text]": ("text", _open_two, run_add, []),
+}
+# + + + + + Benchmarks + + + + +
+
+
+# + + + + + Functions + + + + +
+def _measure(name, path, repeats):
+    """Run one benchmark (in its own process, so the peak RSS is its own)"""
+    _, setup, run, _ = BENCHMARKS[name]
+    # import before timing, the import cost is not part of the hot paths
+    import pdfer  # noqa: F401
+    walls, cpus = [], []
+    pages = 0
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as workdir:
+            # work on a copy, some operations write next to the PDF
+            work_path = shutil.copy(path, os.path.join(workdir, os.path.basename(path)))
+            state = setup(work_path, workdir)
+            self_start = resource.getrusage(resource.RUSAGE_SELF)
+            children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+            wall_start = time.perf_counter()
+            pages = run(state, workdir)
+            wall = time.perf_counter() - wall_start
+            self_end = resource.getrusage(resource.RUSAGE_SELF)
+            children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        walls.append(wall)
+        # subprocesses (tesseract, poppler, java) count too
+        cpus.append(
+            (self_end.ru_utime + self_end.ru_stime - self_start.ru_utime - self_start.ru_stime)
+            + (children_end.ru_utime + children_end.ru_stime - children_start.ru_utime - children_start.ru_stime)
+        )
+    wall = min(walls)
+    return {
+        "wall_seconds": wall,
+        "cpu_seconds": min(cpus),
+        # ru_maxrss is in KB on linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "pages": pages,
+        "pages_per_second": pages / wall if wall > 0 else None,
+    }
+
+
+def make_documents(where, quick=False):
+    paths = {}
+    for document, (generator, pages, quick_pages) in DOCUMENTS.items():
+        paths[document] = generator(os.path.join(where, f"{document}.pdf"), num_pages=quick_pages if quick else pages)
+    return paths
+
+
+def run_benchmarks(names=None, repeats=3, quick=False):
+    """Run the benchmarks, each one in a fresh process, return {name: measures}"""
+    names = list(BENCHMARKS) if names is None else names
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as where:
+        paths = make_documents(where, quick=quick)
+        for name in names:
+            document, _, _, tools = BENCHMARKS[name]
+            missing = [tool for tool in tools if shutil.which(tool) is None]
+            if missing:
+                warning_print(f"Skipping {name}, missing {missing}")
+                continue
+            with context.Pool(1) as pool:
+                try:
+                    results[name] = pool.apply(_measure, (name, paths[document], repeats))
+                except Exception as e:
+                    error_print(f"Benchmark {name} failed: {type(e).__name__}: {e}")
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """The regressions of the results against the baseline, as a list of messages"""
+    regressions = []
+    for name, measures in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for measure in ["wall_seconds", "peak_rss_mb"]:
+            if base.get(measure) and measures[measure] > base[measure] * (1 + tolerance):
+                regressions.append(
+                    f"{name} {measure}: {measures[measure]:.3f} vs baseline {base[measure]:.3f} "
+                    f"(+{(measures[measure] / base[measure] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<34}{'wall s':>10}{'cpu s':>10}{'rss MB':>10}{'pages/s':>10}{'vs base':>10}")
+    for name, measures in results.items():
+        change = ""
+        if baseline and baseline.get(name, {}).get("wall_seconds"):
+            change = f"{(measures['wall_seconds'] / baseline[name]['wall_seconds'] - 1) * 100:+.0f}%"
+        pages_per_second = measures["pages_per_second"]
+        print(
+            f"{name:<34}{measures['wall_seconds']:>10.3f}{measures['cpu_seconds']:>10.3f}"
+            f"{measures['peak_rss_mb']:>10.1f}"
+            f"{pages_per_second if pages_per_second is None else round(pages_per_second, 1)!s:>10}{change:>10}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pdfer hot paths on synthetic PDFs")
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per benchmark, the best one is kept")
+    parser.add_argument("--quick", action="store_true", help="smaller documents")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON baseline, exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.only, repeats=args.repeats, quick=args.quick)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    for output in [args.output, args.save_baseline]:
+        if output:
+            with open(output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            for regression in regressions:
+                error_print(f"Regression: {regression}")
+            return 1
+        success_print("No regressions against the baseline")
+    return 0
+# + + + + + Functions + + + + +
+
+
+if __name__ == '__main__':
+    sys.exit(main())
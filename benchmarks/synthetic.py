@@ -0,0 +1,188 @@
+#
+# Synthetic PDFs
+# --------------
+# This script contains the
+# synthetic PDF generators used by the benchmarks
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+import io
+import random
+from PIL import (
+    Image,
+    ImageDraw,
+    ImageFont
+)
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+WORDS = (
+    "invoice total amount due date customer order number payment account "
+    "balance tax net gross item quantity price description reference period"
+).split()
+# + + + + + Constants + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + PDF Builder + + + + +
+class PDFBuilder(object):
+    def __init__(self):
+        """A minimal PDF writer: pages made of a content stream, Helvetica and optional images"""
+        # 1 catalog, 2 pages, 3 font
+        self.objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        ]
+        self.page_ids = []
+
+    def add_object(self, body):
+        self.objects.append(body)
+        return len(self.objects)
+
+    def add_stream(self, data, dictionary=b""):
+        return self.add_object(
+            b"<< /Length %d " % len(data) + dictionary + b" >>\nstream\n" + data + b"\nendstream"
+        )
+
+    def add_page(self, content, images=None):
+        """Add a page, images is a dict of name: JPEG image object id"""
+        content_id = self.add_stream(content)
+        xobjects = b""
+        if images:
+            xobjects = b" /XObject << " + b" ".join(
+                b"/%s %d 0 R" % (name.encode(), image_id) for name, image_id in images.items()
+            ) + b" >>"
+        page_id = self.add_object(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] " % (PAGE_WIDTH, PAGE_HEIGHT)
+            + b"/Resources << /Font << /F1 3 0 R >>" + xobjects + b" >> "
+            + b"/Contents %d 0 R >>" % content_id
+        )
+        self.page_ids.append(page_id)
+        return page_id
+
+    def add_jpeg(self, image):
+        """Add a PIL image as a gray JPEG image object"""
+        image = image.convert('L')
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        width, height = image.size
+        return self.add_stream(
+            buffer.getvalue(),
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d " % (width, height)
+            + b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /DCTDecode"
+        )
+
+    def write(self, path):
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self.objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.page_ids)
+
+        out = b"%PDF-1.4\n"
+        offsets = []
+        for i, obj in enumerate(self.objects):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % (i + 1) + obj + b"\nendobj\n"
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.objects) + 1)
+        for offset in offsets:
+            out += b"%010d 00000 n \n" % offset
+        out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.objects) + 1, xref)
+
+        with open(str(path), 'wb') as f:
+            f.write(out)
+        return str(path)
+# + + + + + PDF Builder + + + + +
+# + + + + + Classes + + + + +
+
+
+# + + + + + Functions + + + + +
+def random_line(rng, num_words=10):
+    return " ".join(rng.choice(WORDS) for _ in range(num_words))
+
+
+def text_page_content(rng, num_lines=45):
+    lines = [b"BT /F1 11 Tf 14 TL 72 740 Td"]
+    for _ in range(num_lines):
+        lines.append(b"(" + random_line(rng).encode() + b") Tj T*")
+    lines.append(b"ET")
+    return b"\n".join(lines)
+
+
+def table_page_content(rng, rows=30, columns=5):
+    """A grid of ruled cells with a value in each one"""
+    left, top, cell_width, cell_height = 56, 740, 100, 22
+    parts = [b"0.5 w"]
+    for row in range(rows + 1):
+        y = top - row * cell_height
+        parts.append(b"%d %d m %d %d l S" % (left, y, left + columns * cell_width, y))
+    for column in range(columns + 1):
+        x = left + column * cell_width
+        parts.append(b"%d %d m %d %d l S" % (x, top, x, top - rows * cell_height))
+    parts.append(b"BT /F1 9 Tf")
+    for row in range(rows):
+        for column in range(columns):
+            if row == 0:
+                value = rng.choice(WORDS)
+            else:
+                value = "%.2f" % rng.uniform(0, 10000)
+            x = left + column * cell_width + 4
+            y = top - (row + 1) * cell_height + 7
+            parts.append(b"1 0 0 1 %d %d Tm (%s) Tj" % (x, y, value.encode()))
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def scanned_page_image(rng, dpi=150, num_lines=35):
+    """A page rendered as a gray image, like a scan"""
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    image = Image.new('L', (width, height), color=255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=int(dpi / 6))
+    except TypeError:
+        # old Pillow without sizes for the default font
+        font = ImageFont.load_default()
+    line_height = int((height - 2 * dpi) / num_lines)
+    for i in range(num_lines):
+        draw.text((dpi, dpi + i * line_height), random_line(rng, 8), fill=0, font=font)
+    return image
+
+
+def make_text_pdf(path, num_pages=10, seed=0):
+    rng = random.Random(seed)
+    builder = PDFBuilder()
+    for _ in range(num_pages):
+        builder.add_page(text_page_content(rng))
+    return builder.write(path)
+
+
+def make_table_pdf(path, num_pages=5, seed=0):
+    rng = random.Random(seed)
+    builder = PDFBuilder()
+    for _ in range(num_pages):
+        builder.add_page(table_page_content(rng))
+    return builder.write(path)
+
+
+def make_scanned_pdf(path, num_pages=5, seed=0, dpi=150):
+    rng = random.Random(seed)
+    builder = PDFBuilder()
+    for _ in range(num_pages):
+        image_id = builder.add_jpeg(scanned_page_image(rng, dpi=dpi))
+        content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (PAGE_WIDTH, PAGE_HEIGHT)
+        builder.add_page(content, images={"Im0": image_id})
+    return builder.write(path)
+# + + + + + Functions + + + + +
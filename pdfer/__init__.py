@@ -5,9 +5,53 @@
 #
 
 # import submodules you want to install
+import importlib
 from .pdf import (
     PDF
 )
+from .cache import (
+    OCRCache,
+    DocumentCache,
+    document_cache
+)
+from .ocr import (
+    OCRRegistry,
+    ocr_registry
+)
+from .metrics import (
+    Instrumentation,
+    TimingReport,
+    instrumentation
+)
+from .search import (
+    PageIndex,
+    Hit
+)
+from .batch import (
+    PDFBatch,
+    BatchResult
+)
+
+# the features with heavy dependencies (OpenCV, tabula, asyncio) are imported on first use
+_LAZY_EXPORTS = {
+    'OCRPreprocessor': 'preprocess',
+    'OCRPage': 'records',
+    'TableEngine': 'tables',
+    'TableResult': 'tables',
+    'table_engine': 'tables',
+    'AsyncPDF': 'aio'
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(f".{_LAZY_EXPORTS[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
 
 
 __docformat__ = "restructuredtext"
@@ -0,0 +1,213 @@
+#
+# Async PDF
+# ---------
+# This script contains the
+# class AsyncPDF
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    error_print
+)
+from golog.tools import (
+    to_int
+)
+import asyncio
+import csv
+import functools
+import os
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from PIL import Image
+from .pdf import (
+    PDF
+)
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# the external engines, run as asyncio subprocesses
+PDFTOPPM = 'pdftoppm'
+TESSERACT = 'tesseract'
+# + + + + + Constants + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Async PDF + + + + +
+class AsyncPDF(object):
+    def __init__(self, pdf, max_concurrency=None, executor=None):
+        """An asyncio facade of a PDF, nothing it does blocks the event loop
+
+        The parsing runs in the executor (the loop default one if None) one call at a time,
+        the PyPDF2 reader is not thread safe. Poppler, tesseract and tabula run concurrently,
+        at most max_concurrency of them (the number of CPUs by default) at once for this document.
+        Build it with await AsyncPDF.open(...) to open the PDF off the loop too
+        """
+        self.pdf = pdf
+        self.max_concurrency = (os.cpu_count() or 1) if max_concurrency is None else to_int(max_concurrency)
+        if self.max_concurrency is None or self.max_concurrency < 1:
+            raise ValueError("The max concurrency must be an integer greater than 0")
+        self.executor = executor
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # one PyPDF2 call at a time on the reader (and its file)
+        self._parse_lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, pdf_file_path, max_concurrency=None, executor=None, **pdf_kwargs):
+        """Open a PDF (a path or its content, see PDF) lazily in the executor, None if it cannot be opened"""
+        pdf_kwargs.setdefault('lazy', True)
+        # never ask a password interactively inside a service
+        pdf_kwargs.setdefault('password', '')
+        pdf = await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(PDF, pdf_file_path, **pdf_kwargs)
+        )
+        if not hasattr(pdf, 'pages'):
+            error_print(f"Could not open the PDF {pdf_file_path}")
+            return None
+        return cls(pdf, max_concurrency=max_concurrency, executor=executor)
+
+    def __repr__(self):
+        return "<Async PDF [%s] (%s pages) >" % (self.pdf.pdf_file_name, self.pdf.num_pages)
+
+    def __len__(self):
+        return self.pdf.num_pages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+    async def close(self):
+        return await self._parse(self.pdf.close)
+
+    async def _run(self, function, *args, **kwargs):
+        """Run a blocking function in the executor, within the concurrency limit"""
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(function, *args, **kwargs)
+            )
+
+    async def _parse(self, function, *args, **kwargs):
+        """Run a blocking function using the PDF reader or file in the executor, one at a time"""
+        async with self._parse_lock:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(function, *args, **kwargs)
+            )
+
+    async def _exec(self, *command, stdin=None):
+        """Run an external engine as an asyncio subprocess, within the concurrency limit, return its stdout"""
+        async with self._semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate(stdin)
+        if process.returncode != 0:
+            raise RuntimeError(f"{command[0]} failed ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+        return stdout
+
+    # - Text -
+    async def text(self):
+        """The whole PDF text"""
+        return await self._parse(lambda: self.pdf.text)
+
+    async def page_text(self, page_number):
+        return await self._parse(self.pdf.get_page_text, page_number)
+
+    async def iter_pages(self, pages=None):
+        """Yield the selected PDFPages (all by default, see parse_pages) with their text already extracted"""
+        page_numbers = self.pdf._page_numbers(pages)
+        if page_numbers is None:
+            return
+        for page_number in page_numbers:
+            page = self.pdf.get_page(page_number)
+            await self._parse(lambda: page.page_text)
+            yield page
+    # - Text -
+
+    # - Tables -
+    async def tables(self, **kwargs):
+        """The tables of the PDF (see PDF.get_pdf_tables), the tabula JVM is waited on in the executor"""
+        # the content of a file like PDF is read (once) with the reader, tabula then only gets the bytes
+        await self._parse(self.pdf._pdf_bytes)
+        return await self._run(self.pdf.get_pdf_tables, **kwargs)
+    # - Tables -
+
+    # - Images -
+    async def page_image_bytes(self, page_number, dpi=350):
+        """The PNG of a page (page_number starts from 1) rasterized by a poppler subprocess"""
+        page_number = to_int(page_number)
+        if page_number is None or not 1 <= page_number <= self.pdf.num_pages:
+            raise ValueError(f"The page number {page_number} is not valid for a PDF of {self.pdf.num_pages} pages")
+        command = [PDFTOPPM, '-png', '-r', str(dpi), '-f', str(page_number), '-l', str(page_number)]
+        if self.pdf.pdf_file_path is not None:
+            return await self._exec(*command, self.pdf.pdf_file_path)
+        # an in memory PDF goes through stdin
+        content = await self._parse(lambda: bytes(self.pdf._pdf_bytes()))
+        return await self._exec(*command, '-', stdin=content)
+
+    async def page_image(self, page_number, dpi=350):
+        """The PIL image of a page (page_number starts from 1)"""
+        image = Image.open(BytesIO(await self.page_image_bytes(page_number, dpi=dpi)))
+        image.load()
+        return image
+    # - Images -
+
+    # - OCR -
+    async def ocr_page_df(self, page_number, dpi=350, lang='eng'):
+        """OCR a page (page_number starts from 1) with tesseract, the data frame of pytesseract_image_to_df"""
+        png = await self.page_image_bytes(page_number, dpi=dpi)
+        # the PNG is piped from poppler to tesseract, never decoded here
+        tsv = await self._exec(TESSERACT, 'stdin', 'stdout', '-l', str(lang), 'tsv', stdin=png)
+        page_df = pd.read_csv(BytesIO(tsv), quoting=csv.QUOTE_NONE, sep='\t')
+        page_df['page'] = np.int32(page_number)
+        return page_df
+
+    async def ocr_df(self, dpi=350, lang='eng', pages=None):
+        """OCR the selected pages concurrently (within the concurrency limit) into one data frame
+
+        Like pdf_to_df(ocr='pytesseract'), a failing page is reported in pdf.ocr_errors
+        """
+        page_numbers = self.pdf._page_numbers(pages)
+        if page_numbers is None:
+            return None
+        # page numbers of the OCR start from 1
+        selected_pages = sorted(set(page_number + 1 for page_number in page_numbers))
+        results = await asyncio.gather(
+            *[self.ocr_page_df(page_number, dpi=dpi, lang=lang) for page_number in selected_pages],
+            return_exceptions=True
+        )
+
+        self.pdf.ocr_errors = {}
+        page_dfs = []
+        for page_number, result in zip(selected_pages, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                error = f"{type(result).__name__}: {result}"
+                error_print(f"OCR failed on page {page_number}: {error}")
+                self.pdf.ocr_errors[page_number] = error
+            else:
+                page_dfs.append(result)
+        if not page_dfs:
+            error_print("The OCR failed on every page of this PDF")
+            return None
+        return pd.concat(page_dfs, ignore_index=True)
+    # - OCR -
+# + + + + + Async PDF + + + + +
+# + + + + + Classes + + + + +
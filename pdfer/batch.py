@@ -0,0 +1,183 @@
+#
+# Batch
+# -----
+# This script contains the
+# class PDFBatch
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    error_print,
+    warning_print
+)
+from golog.tools import (
+    to_int
+)
+import glob
+import signal
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed
+)
+from .pdf import (
+    PDF
+)
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# the result of one document of a batch, error is None if the operation succeeded
+BatchResult = namedtuple('BatchResult', ['index', 'path', 'result', 'error', 'seconds'])
+GLOB_CHARS = '*?['
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def expand_paths(paths):
+    """A list of file paths from a path, a glob or a list of them (globs are sorted)"""
+    if isinstance(paths, str) or not hasattr(paths, '__iter__'):
+        paths = [paths]
+    expanded = []
+    for path in paths:
+        path = str(path)
+        if any(char in path for char in GLOB_CHARS):
+            expanded.extend(sorted(glob.glob(path, recursive=True)))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+class _DocumentTimeout(BaseException):
+    """Not an Exception, so the per page error handling of the operations cannot swallow it"""
+    pass
+
+
+def _can_alarm():
+    """The timeout is an alarm, only available in the main thread on unix"""
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+def _raise_timeout(signum, frame):
+    raise _DocumentTimeout()
+
+
+def _run_pdf_operation(index, path, operation, args, kwargs, pdf_kwargs, timeout=None):
+    """Open one PDF and run one of its operations, never raise (the error is in the result)"""
+    start = time.perf_counter()
+    use_alarm = timeout is not None and _can_alarm()
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    pdf = None
+    try:
+        pdf = PDF(path, **pdf_kwargs)
+        if not hasattr(pdf, 'pages'):
+            raise ValueError(f"Could not open the PDF {path} (missing, broken or encrypted)")
+        result = getattr(pdf, operation)(*args, **kwargs)
+        error = None
+    except _DocumentTimeout:
+        result, error = None, f"TimeoutError: {operation} took more than {timeout} seconds"
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        if pdf is not None and hasattr(pdf, 'pdf_file'):
+            pdf.close()
+    return BatchResult(index, path, result, error, time.perf_counter() - start)
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + PDF Batch + + + + +
+class PDFBatch(object):
+    def __init__(self, paths, workers=None, timeout=None, password='', **pdf_kwargs):
+        """Run PDF operations over many documents with a process pool
+
+        paths can be paths or globs, every PDF method is available in batch form
+        (e.g. batch.get_pdf_text()) and returns a BatchResult per document,
+        a document that fails (broken, encrypted, over the timeout in seconds) only fails its own result.
+        The timeout is a SIGALRM: on unix only, and with workers=None (in process) only when called
+        from the main thread, otherwise it is not enforced.
+        The password is used for the encrypted PDFs instead of asking it interactively
+        """
+        self.paths = expand_paths(paths)
+        self.workers = workers
+        self.timeout = timeout
+        self.pdf_kwargs = dict(pdf_kwargs, password=password)
+
+    def __repr__(self):
+        return "<PDF Batch [%s documents] >" % len(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __getattr__(self, operation):
+        # every public PDF method in batch form
+        if operation.startswith('_') or not callable(getattr(PDF, operation, None)):
+            raise AttributeError(f"PDFBatch has no attribute {operation}")
+
+        def batch_operation(*args, ordered=True, **kwargs):
+            return self.run(operation, *args, ordered=ordered, **kwargs)
+
+        batch_operation.__name__ = operation
+        batch_operation.__doc__ = getattr(PDF, operation).__doc__
+        return batch_operation
+
+    def run(self, operation, *args, ordered=True, **kwargs):
+        """Run the operation on every document, return the BatchResults in the input order (or as they finish)"""
+        results = self.iter_results(operation, *args, ordered=ordered, **kwargs)
+        return None if results is None else list(results)
+
+    def iter_results(self, operation, *args, ordered=True, **kwargs):
+        """Yield the BatchResult of each document in the input order, or as they finish with ordered=False"""
+        if operation.startswith('_') or not callable(getattr(PDF, operation, None)):
+            error_print(f"This operation {operation} is not a PDF method")
+            return None
+        workers = 1 if self.workers is None else to_int(self.workers)
+        if workers is None or workers < 1:
+            error_print("The number of workers must be an integer greater than 0")
+            return None
+        return self._iter_results(operation, args, kwargs, ordered, workers)
+
+    def _iter_results(self, operation, args, kwargs, ordered, workers):
+        tasks = [
+            (index, path, operation, args, kwargs, self.pdf_kwargs, self.timeout)
+            for index, path in enumerate(self.paths)
+        ]
+        if workers == 1:
+            if self.timeout is not None and not _can_alarm():
+                warning_print("The batch timeout is not enforced, it needs unix and the main thread (or workers > 1)")
+            for task in tasks:
+                yield _run_pdf_operation(*task)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(workers, max(len(tasks), 1))) as pool:
+            futures = {pool.submit(_run_pdf_operation, *task): task for task in tasks}
+            for future in (futures if ordered else as_completed(futures)):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # e.g. a worker process died
+                    index, path = futures[future][:2]
+                    yield BatchResult(index, path, None, f"{type(e).__name__}: {e}", None)
+# + + + + + PDF Batch + + + + +
+# + + + + + Classes + + + + +
@@ -0,0 +1,360 @@
+#
+# Cache
+# -----
+# This script contains the
+# class OCRCache and class DocumentCache
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    warning_print
+)
+import os
+import sys
+import hashlib
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from .lazy import (
+    lazy_import
+)
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# 1 GB
+DEFAULT_OCR_CACHE_MAX_SIZE = 1024 ** 3
+OCR_CACHE_EXTENSION = '.pkl'
+# 256 MB
+DEFAULT_DOCUMENT_CACHE_MAX_SIZE = 256 * 1024 ** 2
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def image_digest(image):
+    """A sha256 hex digest of an image content (a PIL image, a NumPy array or a file path)"""
+    digest = hashlib.sha256()
+    if isinstance(image, Image.Image):
+        digest.update(f"{image.mode}{image.size}".encode())
+        digest.update(image.tobytes())
+    elif isinstance(image, np.ndarray):
+        digest.update(f"{image.dtype}{image.shape}".encode())
+        digest.update(np.ascontiguousarray(image).data)
+    else:
+        return file_digest(image)
+    return digest.hexdigest()
+
+
+def buffer_digest(buffer):
+    """A sha256 hex digest of an in memory content (bytes, memoryview, mmap)"""
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """A sha256 hex digest of a file content"""
+    digest = hashlib.sha256()
+    with open(str(file_path), 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + OCR Cache + + + + +
+class OCRCache(object):
+    def __init__(self, cache_dir, max_size=DEFAULT_OCR_CACHE_MAX_SIZE):
+        """A persistent content addressed cache of OCR results on disk
+
+        Entries are written atomically so many worker processes can share the same folder,
+        when the folder grows over max_size bytes the least recently used entries are evicted
+        """
+        self.cache_dir = str(cache_dir)
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # counters of this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # approximate size, refreshed on every eviction
+        self._size = None
+
+    def __repr__(self):
+        return "<OCR Cache [%s] hits %s misses %s >" % (self.cache_dir, self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.exists(self._entry_path(key))
+
+    @staticmethod
+    def key(*parts):
+        """The cache key of some parts (e.g. image digest, dpi, engine, lang, builder)"""
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def get(self, key, default=None):
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses = self.misses + 1
+            return default
+        except (pickle.UnpicklingError, EOFError, ValueError) as e:
+            warning_print(f"Broken OCR cache entry {entry_path} ({e}), ignoring it")
+            self._remove(entry_path)
+            self.misses = self.misses + 1
+            return default
+        # mark as recently used
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            pass
+        self.hits = self.hits + 1
+        return value
+
+    def set(self, key, value):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # write to a tmp file then rename, readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        if self._size is None:
+            self._size = sum(entry_size for _, entry_size, _ in self._entries())
+        else:
+            self._size = self._size + size
+        if self._size > self.max_size:
+            self.evict()
+        return value
+
+    def get_or_compute(self, key, compute):
+        """The cached value of key, computed (and cached) on a miss, None results are not cached"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def evict(self, max_size=None):
+        """Remove the least recently used entries until the cache is under max_size bytes"""
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for entry_path, entry_size, _ in entries:
+            if size <= max_size:
+                break
+            if self._remove(entry_path):
+                self.evictions = self.evictions + 1
+            size = size - entry_size
+        self._size = size
+        return size
+
+    def clear(self):
+        return self.evict(max_size=0)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + OCR_CACHE_EXTENSION)
+
+    def _entries(self):
+        """(path, size, last use) of every entry"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for file_name in files:
+                if not file_name.endswith(OCR_CACHE_EXTENSION):
+                    continue
+                entry_path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(entry_path)
+                except FileNotFoundError:
+                    # evicted by another process
+                    continue
+                entries.append((entry_path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _remove(self, file_path):
+        try:
+            os.remove(file_path)
+            return True
+        except FileNotFoundError:
+            return False
+# + + + + + OCR Cache + + + + +
+
+
+# + + + + + Document Cache + + + + +
+class DocumentEntry(object):
+    """What a PDF parse gives, the number of pages and the page texts extracted so far"""
+    __slots__ = ('num_pages', 'texts', 'size')
+
+    def __init__(self, num_pages):
+        self.num_pages = num_pages
+        self.texts = {}
+        self.size = sys.getsizeof(self) + sys.getsizeof(self.texts)
+
+    def __repr__(self):
+        return "<Document Entry [%s/%s texts] >" % (len(self.texts), self.num_pages)
+
+
+class DocumentCache(object):
+    def __init__(self, max_size=DEFAULT_DOCUMENT_CACHE_MAX_SIZE):
+        """An in memory LRU cache of the parsed PDFs, shared by the PDF instances using it (see PDF document_cache)
+
+        A PDF file is keyed by its real path, size and modification time, an in memory PDF by its
+        content digest, so opening the same document again skips the parse and the text extraction.
+        When the entries go over max_size bytes the least recently used documents are evicted
+        """
+        self.max_size = max_size
+        # counters of this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "<Document Cache [%s documents, %s bytes] hits %s misses %s >" % (len(self), self._size, self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def path_key(file_path):
+        """The key of a PDF file, None if it cannot be read"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def content_key(digest):
+        """The key of an in memory PDF, from its content digest (see buffer_digest)"""
+        return ('sha256', digest)
+
+    @property
+    def size(self):
+        """The approximate bytes of the entries"""
+        return self._size
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "documents": len(self),
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def get(self, key):
+        """The DocumentEntry of key, None if the document was not parsed before"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses = self.misses + 1
+                return None
+            # mark as recently used
+            self._entries.move_to_end(key)
+            self.hits = self.hits + 1
+            return entry
+
+    def text(self, key, page_number):
+        """The cached text of a page (from 0), None if not extracted yet"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.texts.get(page_number)
+
+    def add(self, key, num_pages, texts=None):
+        """Add a parsed document, or some page texts {page_number: text} to it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = DocumentEntry(num_pages)
+                self._entries[key] = entry
+                self._size = self._size + entry.size
+            else:
+                self._entries.move_to_end(key)
+            for page_number, text in (texts or {}).items():
+                if page_number in entry.texts:
+                    continue
+                entry.texts[page_number] = text
+                text_size = sys.getsizeof(text)
+                entry.size = entry.size + text_size
+                self._size = self._size + text_size
+            if self._size > self.max_size:
+                self.evict()
+            return entry
+
+    def evict(self, max_size=None):
+        """Remove the least recently used documents until the cache is under max_size bytes"""
+        max_size = self.max_size if max_size is None else max_size
+        with self._lock:
+            while self._entries and self._size > max_size:
+                _, entry = self._entries.popitem(last=False)
+                self._size = self._size - entry.size
+                self.evictions = self.evictions + 1
+            return self._size
+
+    def invalidate(self, file_path):
+        """Forget every version of a PDF file (e.g. after writing it), return how many were removed"""
+        real_path = os.path.realpath(str(file_path))
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == real_path]
+            for key in keys:
+                self._size = self._size - self._entries.pop(key).size
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __getstate__(self):
+        # only the settings, every process fills its own cache
+        return {'max_size': self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+# + + + + + Document Cache + + + + +
+# + + + + + Classes + + + + +
+
+
+# the parsed documents of the whole process, used by PDF(..., document_cache=True)
+document_cache = DocumentCache()
@@ -0,0 +1,224 @@
+#
+# Export
+# ------
+# This script contains the
+# class ColumnarWriter and the Parquet / Arrow schemas of the PDF contents
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+COLUMNAR_FORMATS = ['parquet', 'arrow']
+COLUMNAR_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+# pages start from 1 like the OCR, a box is (x0, y0, x1, y1) in pixels of the page image
+OCR_SCHEMA = pa.schema([
+    ('page', pa.int32()),
+    ('line_id', pa.int32()),
+    ('line_x0', pa.int32()), ('line_y0', pa.int32()), ('line_x1', pa.int32()), ('line_y1', pa.int32()),
+    ('line_content', pa.string()),
+    ('word_box_x0', pa.int32()), ('word_box_y0', pa.int32()), ('word_box_x1', pa.int32()), ('word_box_y1', pa.int32()),
+    ('word_box_content', pa.string()),
+    ('word_box_confidence', pa.int16())
+])
+# source is 'text_layer' or 'ocr' (see PDF.extract_text)
+TEXT_SCHEMA = pa.schema([
+    ('page', pa.int32()),
+    ('source', pa.string()),
+    ('text', pa.string())
+])
+# the tables in long form, one cell per row (the tables have different columns)
+TABLES_SCHEMA = pa.schema([
+    ('page', pa.int32()),
+    ('area', pa.int32()),
+    ('table', pa.int32()),
+    ('row', pa.int32()),
+    ('column', pa.string()),
+    ('value', pa.string())
+])
+COLUMNAR_SCHEMAS = {'ocr': OCR_SCHEMA, 'text': TEXT_SCHEMA, 'tables': TABLES_SCHEMA}
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def _string(value):
+    return None if value is None or pd.isna(value) else str(value)
+
+
+def _nullable(values):
+    """Values to a float array with NaN for the missing ones (pyarrow casts it back to ints with nulls)"""
+    return pd.to_numeric(pd.Series(values), errors='coerce').astype('float64').to_numpy()
+
+
+def ocr_table(page_df, page):
+    """An OCR data frame (pyocr_image_to_df, OCRPage.to_df or pytesseract_image_to_df) as a table of OCR_SCHEMA"""
+    if 'word_box_content' in page_df.columns:
+        line_key = page_df['line_uuid'] if 'line_uuid' in page_df.columns else page_df['line_id']
+        columns = {
+            column: page_df[column]
+            for column in [
+                'line_x0', 'line_y0', 'line_x1', 'line_y1', 'line_content',
+                'word_box_x0', 'word_box_y0', 'word_box_x1', 'word_box_y1',
+                'word_box_content', 'word_box_confidence'
+            ]
+        }
+    else:
+        # pytesseract: the words only, their lines are the (block, paragraph, line) groups
+        words = page_df
+        if 'level' in words.columns:
+            words = words[words['level'] == 5]
+        words = words[words['conf'] != -1]
+        lines = words.groupby(['block_num', 'par_num', 'line_num'], sort=False)
+        line_key = lines.ngroup()
+        right, bottom = words['left'] + words['width'], words['top'] + words['height']
+        columns = {
+            'line_x0': lines['left'].transform('min'), 'line_y0': lines['top'].transform('min'),
+            'line_x1': right.groupby(line_key).transform('max'), 'line_y1': bottom.groupby(line_key).transform('max'),
+            'line_content': lines['text'].transform(lambda line: " ".join(str(word) for word in line.dropna())),
+            'word_box_x0': words['left'], 'word_box_y0': words['top'],
+            'word_box_x1': right, 'word_box_y1': bottom,
+            'word_box_content': words['text'],
+            'word_box_confidence': _nullable(words['conf']).round()
+        }
+
+    num_rows = len(line_key)
+    data = {
+        'page': np.full(num_rows, page, dtype=np.int32),
+        # the line ids of the page, in order of appearance
+        'line_id': pd.factorize(pd.Series(line_key).to_numpy(), use_na_sentinel=False)[0].astype(np.int32)
+    }
+    for column, values in columns.items():
+        if column.endswith('_content'):
+            data[column] = [_string(value) for value in values]
+        else:
+            data[column] = _nullable(values)
+    return _to_table(data, OCR_SCHEMA)
+
+
+def text_table(page, text, source):
+    """The text of one page as a table of TEXT_SCHEMA"""
+    return _to_table({'page': [page], 'source': [source], 'text': [text]}, TEXT_SCHEMA)
+
+
+def tables_table(table_results):
+    """TableResults (see TableEngine.extract) as a table of TABLES_SCHEMA, one cell per row"""
+    data = {name: [] for name in TABLES_SCHEMA.names}
+    for result in table_results:
+        for row, values in enumerate(result.df.itertuples(index=False)):
+            for column, value in zip(result.df.columns, values):
+                data['page'].append(result.page)
+                data['area'].append(result.area)
+                data['table'].append(result.table)
+                data['row'].append(row)
+                data['column'].append(str(column))
+                data['value'].append(_string(value))
+    return _to_table(data, TABLES_SCHEMA)
+
+
+def _to_table(data, schema):
+    arrays = []
+    for field in schema:
+        values = data[field.name]
+        if pa.types.is_integer(field.type) and isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+            # NaN is a missing value
+            arrays.append(pa.array(values, type=pa.float64(), from_pandas=True).cast(field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def read_pages(file_path, pages=None, columns=None, format='parquet'):
+    """Read back a columnar export as a data frame, only the selected pages (from 1) and columns
+
+    With Parquet the page filter is pushed down to the file, the row groups of other pages are
+    skipped by their statistics. An Arrow (IPC) file has no statistics, every record batch is
+    read and filtered
+    """
+    if format not in COLUMNAR_FORMATS:
+        raise ValueError(f"This format {format} not available, only these ones {COLUMNAR_FORMATS}")
+    dataset = ds.dataset(str(file_path), format='parquet' if format == 'parquet' else 'ipc')
+    page_filter = None
+    if pages is not None:
+        page_filter = ds.field('page').isin([int(page) for page in ([pages] if isinstance(pages, int) else pages)])
+    return dataset.to_table(columns=columns, filter=page_filter).to_pandas()
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Columnar Writer + + + + +
+class ColumnarWriter(object):
+    def __init__(self, output_file_path, schema, format='parquet', row_group_pages=1, compression='zstd'):
+        """Write tables of one schema to a Parquet or Arrow (IPC) file as they come
+
+        The tables of every row_group_pages pages are written as one Parquet row group
+        (or Arrow record batch), nothing else is kept in memory
+        """
+        if format not in COLUMNAR_FORMATS:
+            raise ValueError(f"This format {format} not available, only these ones {COLUMNAR_FORMATS}")
+        if row_group_pages is None or int(row_group_pages) < 1:
+            raise ValueError("The pages per row group must be an integer greater than 0")
+        self.output_file_path = str(output_file_path)
+        self.schema = schema
+        self.format = format
+        self.row_group_pages = int(row_group_pages)
+        self.rows = 0
+        self._pending = []
+        if format == 'parquet':
+            self._writer = pq.ParquetWriter(self.output_file_path, schema, compression=compression)
+        else:
+            self._sink = pa.OSFile(self.output_file_path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def __repr__(self):
+        return "<Columnar Writer [%s] %s rows >" % (self.output_file_path, self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def write(self, table):
+        """Add the table of one page"""
+        self._pending.append(table)
+        if len(self._pending) >= self.row_group_pages:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        table = pa.concat_tables(self._pending)
+        self._pending = []
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        else:
+            for batch in table.combine_chunks().to_batches(max_chunksize=max(table.num_rows, 1)):
+                self._writer.write_batch(batch)
+        self.rows = self.rows + table.num_rows
+
+    def close(self):
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+        if self.format == 'arrow':
+            self._sink.close()
+# + + + + + Columnar Writer + + + + +
+# + + + + + Classes + + + + +
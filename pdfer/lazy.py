@@ -0,0 +1,48 @@
+#
+# Lazy
+# ----
+# This script contains the
+# lazy imports of the heavy dependencies
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+import importlib
+import sys
+import types
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Lazy Module + + + + +
+class LazyModule(types.ModuleType):
+    """Stands for a module until an attribute is needed, then imports it (under the import lock, thread safe)
+
+    A missing dependency raises only when a feature needs it
+    """
+
+    def __getattr__(self, attribute):
+        if attribute.startswith('__'):
+            raise AttributeError(attribute)
+        return getattr(importlib.import_module(self.__name__), attribute)
+# + + + + + Lazy Module + + + + +
+# + + + + + Classes + + + + +
+
+
+# + + + + + Functions + + + + +
+def lazy_import(name):
+    """The module name if already imported, a LazyModule importing it on first use otherwise"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+# + + + + + Functions + + + + +
@@ -0,0 +1,40 @@
+#
+# Locks
+# -----
+# This script contains the
+# class Locked, the base of the objects shared across threads
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+import threading
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Locked + + + + +
+class Locked(object):
+    """An object guarded by the threading.Lock in self._lock
+
+    The lock cannot be pickled (e.g. to a worker process), an unpickled copy gets a new one
+    """
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+# + + + + + Locked + + + + +
+# + + + + + Classes + + + + +
@@ -0,0 +1,233 @@
+#
+# Metrics
+# -------
+# This script contains the
+# class Instrumentation and class TimingReport
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    warning_print
+)
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from .locks import (
+    Locked
+)
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# a finished stage, start is time.perf_counter() and duration is in seconds,
+# attributes are e.g. document, page, bytes, dpi, engine (and error if it raised)
+Span = namedtuple('Span', ['name', 'start', 'duration', 'attributes'])
+# + + + + + Constants + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Spans + + + + +
+class _NullSpan(object):
+    """The span of a disabled instrumentation, it does nothing (and is falsy)"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan(object):
+    __slots__ = ('instrumentation', 'name', 'attributes', 'start')
+
+    def __init__(self, instrumentation, name, attributes):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.attributes = attributes
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        self.instrumentation.emit(Span(self.name, self.start, duration, self.attributes))
+        return False
+
+    def __bool__(self):
+        return True
+
+    def set(self, **attributes):
+        """Add attributes known only inside the span (e.g. the bytes read)"""
+        self.attributes.update(attributes)
+# + + + + + Spans + + + + +
+
+
+# + + + + + Instrumentation + + + + +
+class Instrumentation(object):
+    def __init__(self):
+        """Where the stages of pdfer report their spans
+
+        A hook is any callable taking a Span (e.g. a TimingReport, or a function forwarding to
+        a tracing or metrics library). Without hooks span() returns a shared no op span, so the
+        instrumentation costs a function call per stage when nobody listens
+        """
+        self._hooks = ()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<Instrumentation [%s hooks] >" % len(self._hooks)
+
+    @property
+    def enabled(self):
+        return bool(self._hooks)
+
+    def add_hook(self, hook):
+        with self._lock:
+            self._hooks = self._hooks + (hook,)
+        return hook
+
+    def remove_hook(self, hook):
+        with self._lock:
+            hooks = list(self._hooks)
+            if hook in hooks:
+                hooks.remove(hook)
+            self._hooks = tuple(hooks)
+
+    def clear_hooks(self):
+        """Remove every hook (e.g. the ones a forked worker process inherited)"""
+        with self._lock:
+            self._hooks = ()
+
+    @contextmanager
+    def hooked(self, hook):
+        """Add a hook for the duration of a with block"""
+        self.add_hook(hook)
+        try:
+            yield hook
+        finally:
+            self.remove_hook(hook)
+
+    def span(self, name, **attributes):
+        """A context manager timing a stage, its Span goes to every hook when the block exits"""
+        if not self._hooks:
+            return NULL_SPAN
+        return _ActiveSpan(self, name, attributes)
+
+    def emit(self, span):
+        """Send a finished Span to the hooks (e.g. the spans recorded by a worker process)"""
+        for hook in self._hooks:
+            try:
+                hook(span)
+            except Exception as e:
+                # a broken hook never breaks the document processing
+                warning_print(f"The instrumentation hook {hook} failed: {type(e).__name__}: {e}")
+# + + + + + Instrumentation + + + + +
+
+
+# + + + + + Timing Report + + + + +
+class TimingReport(Locked):
+    def __init__(self, document=None):
+        """A hook collecting the spans (of one document if given) and timing them per stage"""
+        self.document = document
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<Timing Report [%s] %s spans, %.3fs >" % (self.document, len(self.spans), self.total)
+
+    def __call__(self, span):
+        if self.document is not None and span.attributes.get('document') != self.document:
+            return
+        with self._lock:
+            self.spans.append(span)
+
+    def __len__(self):
+        return len(self.spans)
+
+    @property
+    def total(self):
+        """The seconds spent in the outermost spans (nested spans are not counted twice)"""
+        total, covered_until = 0.0, None
+        for span in sorted(self.spans, key=lambda span: span.start):
+            end = span.start + span.duration
+            if covered_until is None or span.start >= covered_until:
+                total, covered_until = total + span.duration, end
+            elif end > covered_until:
+                total, covered_until = total + end - covered_until, end
+        return total
+
+    def stages(self):
+        """{stage: {'count', 'seconds', 'max_seconds'}} in the order the stages first ran"""
+        stages = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            stage = stages.setdefault(span.name, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stage['count'] = stage['count'] + 1
+            stage['seconds'] = stage['seconds'] + span.duration
+            stage['max_seconds'] = max(stage['max_seconds'], span.duration)
+        return stages
+
+    def to_df(self):
+        """One row per span, its attributes as columns"""
+        import pandas as pd
+        return pd.DataFrame([
+            dict(span.attributes, name=span.name, start=span.start, duration=span.duration)
+            for span in self.spans
+        ])
+
+    def to_prometheus(self, prefix='pdfer'):
+        """The stages in the Prometheus text format (a summary of seconds per stage)"""
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for name, stage in self.stages().items():
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stage["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def __str__(self):
+        lines = [f"{'stage':<12}{'count':>8}{'seconds':>12}{'max':>12}"]
+        for name, stage in self.stages().items():
+            lines.append(f"{name:<12}{stage['count']:>8}{stage['seconds']:>12.4f}{stage['max_seconds']:>12.4f}")
+        return "\n".join(lines)
+# + + + + + Timing Report + + + + +
+# + + + + + Classes + + + + +
+
+
+# + + + + + Functions + + + + +
+def traced_call(trace, function, *args):
+    """Run a function (in a worker process), return (its result, the spans it recorded if trace)"""
+    if not trace:
+        return function(*args), []
+    spans = []
+    with instrumentation.hooked(spans.append):
+        result = function(*args)
+    return result, spans
+# + + + + + Functions + + + + +
+
+
+# the instrumentation of the whole process
+instrumentation = Instrumentation()
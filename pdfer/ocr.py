@@ -0,0 +1,102 @@
+#
+# OCR
+# ---
+# This script contains the
+# class OCRRegistry
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    warning_print
+)
+import threading
+from .locks import (
+    Locked
+)
+# OCR (pyocr probes the engines, imported on first use)
+from .lazy import (
+    lazy_import
+)
+pyocr = lazy_import('pyocr')
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+DEFAULT_PYOCR_TOOL = "Tesseract (sh)"
+# + + + + + Constants + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + OCR Registry + + + + +
+class OCRRegistry(Locked):
+    def __init__(self):
+        """Process wide registry of the pyocr tools and their languages
+
+        pyocr probes the installed engines spawning subprocesses, here it is done
+        once per process (and per tool for the languages) until refresh() is called
+        """
+        self._lock = threading.Lock()
+        self._tools = None
+        self._languages = {}
+
+    def __repr__(self):
+        if self._tools is None:
+            return "<OCR Registry [not discovered] >"
+        return "<OCR Registry %s >" % list(self._tools)
+
+    def tools(self):
+        """The available tools by name (in the recommended order of usage), None if there is none"""
+        if self._tools is None:
+            with self._lock:
+                if self._tools is None:
+                    # The tools are returned in the recommended order of usage
+                    self._tools = {f"{t.get_name()}": t for t in pyocr.get_available_tools()}
+        if len(self._tools) == 0:
+            warning_print("No OCR tool found")
+            return None
+        return self._tools
+
+    def tool(self, tool_name):
+        tools = self.tools()
+        return None if tools is None else tools.get(tool_name)
+
+    def default_tool(self):
+        tool = self.tool(DEFAULT_PYOCR_TOOL)
+        if tool is None:
+            raise ValueError(f"The default OCR tool {DEFAULT_PYOCR_TOOL} is not available, please install tesseract")
+        return tool
+
+    def languages(self, tool):
+        """The languages available for a tool, probed once"""
+        tool_name = tool.get_name()
+        languages = self._languages.get(tool_name)
+        if languages is None:
+            with self._lock:
+                languages = self._languages.get(tool_name)
+                if languages is None:
+                    languages = list(tool.get_available_languages())
+                    self._languages[tool_name] = languages
+        return languages
+
+    def refresh(self):
+        """Forget the discovered tools and languages, they are probed again on next use"""
+        with self._lock:
+            self._tools = None
+            self._languages = {}
+# + + + + + OCR Registry + + + + +
+# + + + + + Classes + + + + +
+
+
+# the registry shared by the whole process
+ocr_registry = OCRRegistry()
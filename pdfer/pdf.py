@@ -26,77 +26,455 @@ from golog.log import (
 from golog.tools import (
     correct_filepath,
     filepath_exists,
-    to_int,
-    correct_nonlist
+    to_int
 )
 # to manage pdfs
 import PyPDF2
-import tabula
 import os
+import mmap
 import ntpath
-import uuid
-import pandas as pd
+from io import BytesIO
+import functools
+from contextlib import contextmanager
+from collections import (
+    deque,
+    namedtuple
+)
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
+from .metrics import (
+    TimingReport,
+    instrumentation,
+    traced_call
+)
+from .cache import (
+    DocumentCache,
+    document_cache,
+    buffer_digest,
+    file_digest,
+    image_digest
+)
 # OCR
-from pdf2image import convert_from_path
-import cv2
-from PIL import Image
-import pyocr
-import pyocr.builders
-import pytesseract as pt
+from .ocr import (
+    ocr_registry
+)
+# search
+from .search import (
+    PAGE_INDEX_EXTENSION,
+    PageIndex
+)
+# the heavy dependencies and the raster and layout features, imported on first use
+from .lazy import (
+    lazy_import
+)
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+cv2 = lazy_import('cv2')
+Image = lazy_import('PIL.Image')
+pyocr = lazy_import('pyocr')
+pt = lazy_import('pytesseract')
+tabula = lazy_import('tabula')
+raster = lazy_import('pdfer.raster')
+layout = lazy_import('pdfer.layout')
+records = lazy_import('pdfer.records')
 # + + + + + Libraries + + + + +
 
 
+# + + + + + Constants + + + + +
+AVAILABLE_OCRS = [
+    'pyocr', 'pytesseract'
+]
+# the image OCR methods that can run in a worker pool
+OCR_IMAGE_METHODS = [
+    'pyocr_image_to_text', 'pyocr_image_to_df', 'pyocr_image_to_boxes',
+    'pyocr_image_to_line_and_boxes', 'pyocr_image_to_digits',
+    'pytesseract_image_to_df', 'ocr_image_regions', 'pyocr_image_to_records'
+]
+# the image OCR methods that return a data frame with boxes
+OCR_DF_METHODS = ['pyocr_image_to_df', 'pytesseract_image_to_df']
+OCR_EXECUTORS = {
+    'process': ProcessPoolExecutor,
+    'thread': ThreadPoolExecutor
+}
+# the text of a page and where it comes from ('text_layer' or 'ocr'), df is the OCR data frame if any
+PageText = namedtuple('PageText', ['page', 'text', 'source', 'df'])
+TEXT_EXTRACTION_MODES = ['hybrid', 'text_layer', 'ocr']
+# a text layer is plausible with at least these many characters, mostly readable ones
+MIN_TEXT_LAYER_CHARS = 16
+MIN_TEXT_LAYER_READABLE_RATIO = 0.8
+# the DPI of the OCR when it cannot be measured
+DEFAULT_OCR_DPI = 350
+# the pyocr_image_to_df and pytesseract_image_to_df coordinate columns, (x columns, y columns, size columns)
+OCR_DF_BOXES = [
+    ('line_x0', 'line_y0', 'line_x1', 'line_y1'),
+    ('word_box_x0', 'word_box_y0', 'word_box_x1', 'word_box_y1'),
+    # pytesseract, a size instead of the corner
+    ('left', 'top', 'width', 'height')
+]
+# the in memory PDF contents a PDF can be opened from (besides paths and file like objects)
+PDF_BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+# what the PDF can be exported to Parquet or Arrow as (see pdf_to_parquet)
+COLUMNAR_CONTENTS = ['ocr', 'text', 'tables']
+# the file name of an in memory PDF without one
+DEFAULT_PDF_FILE_NAME = 'document'
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def parse_pages(pages, num_pages):
+    """The 0-based page numbers selected by pages, None if not valid
+
+    pages can be None (all), an int, a slice, a list of them or a string spec
+    like "1-5,9" or "3-" (string specs count from 1 like a PDF viewer does)
+    """
+    if pages is None:
+        return list(range(num_pages))
+    if isinstance(pages, slice):
+        return list(range(*pages.indices(num_pages)))
+    if isinstance(pages, str):
+        page_numbers = []
+        for part in pages.replace(' ', '').split(','):
+            if not part:
+                continue
+            first, separator, last = part.partition('-')
+            first = to_int(first) if first else 1
+            last = (to_int(last) if last else num_pages) if separator else first
+            if first is None or last is None or not 1 <= first <= last <= num_pages:
+                error_print(f"The page range {part} is not valid for a PDF of {num_pages} pages")
+                return None
+            page_numbers.extend(range(first - 1, last))
+        return page_numbers
+    if not isinstance(pages, (list, tuple, range)):
+        pages = [pages]
+    page_numbers = []
+    for page in pages:
+        if isinstance(page, (slice, str)):
+            selected = parse_pages(page, num_pages)
+            if selected is None:
+                return None
+            page_numbers.extend(selected)
+            continue
+        page_number = to_int(page)
+        if page_number is None or not -num_pages <= page_number < num_pages:
+            error_print(f"The page number {page} is not valid for a PDF of {num_pages} pages")
+            return None
+        page_numbers.append(page_number % num_pages)
+    return page_numbers
+
+
+def page_runs(page_numbers):
+    """The (start, stop) ranges of consecutive pages in sorted page numbers"""
+    runs = []
+    for page_number in page_numbers:
+        if runs and page_number == runs[-1][1]:
+            runs[-1][1] = page_number + 1
+        else:
+            runs.append([page_number, page_number + 1])
+    return [tuple(run) for run in runs]
+
+
+def is_plausible_text_layer(text):
+    """True if an extracted text layer looks like real text (not empty, not broken font encodings)"""
+    text = "".join(str(text).split())
+    if len(text) < MIN_TEXT_LAYER_CHARS:
+        return False
+    readable = sum(1 for char in text if char.isalnum() or char in ".,;:!?'\"()[]-/%$€&@#*+=")
+    return readable / len(text) >= MIN_TEXT_LAYER_READABLE_RATIO
+
+
+def ocr_df_text(page_df):
+    """The text of an OCR data frame (of pyocr_image_to_df, OCRPage.to_df or pytesseract_image_to_df), one line per row"""
+    if 'line_uuid' in page_df.columns or 'line_id' in page_df.columns:
+        lines = page_df.drop_duplicates('line_uuid' if 'line_uuid' in page_df.columns else 'line_id')['line_content'].dropna()
+        return "\n".join(str(line) for line in lines)
+    words = page_df[page_df['conf'] != -1].dropna(subset=['text'])
+    lines = words.groupby(['block_num', 'par_num', 'line_num'], sort=False)['text']
+    return "\n".join(" ".join(str(word) for word in line) for _, line in lines)
+
+
+# the PDF of a worker process, sent once by the pool initializer
+_WORKER_PDF = None
+
+
+def _init_ocr_worker(pdf):
+    global _WORKER_PDF
+    _WORKER_PDF = pdf
+    # a forked worker inherits the hooks of the parent, its spans go back with the results instead
+    instrumentation.clear_hooks()
+
+
+def restore_ocr_df_coordinates(page_df, scale=1.0, offset=(0, 0), matrix=None):
+    """Map the coordinates of an OCR data frame of a preprocessed image back to the page image
+
+    matrix is the affine transform of the page image to the preprocessed one (see PreprocessResult),
+    without it the image is the page from offset scaled by scale. A box becomes the bounding box of its corners
+    """
+    if matrix is None:
+        matrix = [[scale, 0, -offset[0] * scale], [0, scale, -offset[1] * scale]]
+    inverse = np.linalg.inv(np.vstack([np.asarray(matrix, dtype=np.float64), [0, 0, 1]]))
+    for box_columns in OCR_DF_BOXES:
+        x0_column, y0_column, x1_column, y1_column = box_columns
+        if x0_column not in page_df.columns or y0_column not in page_df.columns:
+            continue
+        x0, y0 = _float_column(page_df, x0_column), _float_column(page_df, y0_column)
+        # a missing corner is the first one (a point)
+        x1 = _float_column(page_df, x1_column) if x1_column in page_df.columns else x0
+        y1 = _float_column(page_df, y1_column) if y1_column in page_df.columns else y0
+        sized = x1_column == 'width'
+        if sized:
+            x1, y1 = x0 + x1, y0 + y1
+        corners = np.array([[x0, x1, x0, x1], [y0, y0, y1, y1]])
+        xs = inverse[0, 0] * corners[0] + inverse[0, 1] * corners[1] + inverse[0, 2]
+        ys = inverse[1, 0] * corners[0] + inverse[1, 1] * corners[1] + inverse[1, 2]
+        restored = {x0_column: xs.min(axis=0), y0_column: ys.min(axis=0), x1_column: xs.max(axis=0), y1_column: ys.max(axis=0)}
+        if sized:
+            restored[x1_column] = restored[x1_column] - restored[x0_column]
+            restored[y1_column] = restored[y1_column] - restored[y0_column]
+        for column in box_columns:
+            if column in page_df.columns:
+                page_df[column] = pd.Series(restored[column].round(), index=page_df.index).astype(page_df[column].dtype)
+    return page_df
+
+
+def _float_column(page_df, column):
+    """A column as floats, NaN for the missing values"""
+    return pd.to_numeric(page_df[column], errors='coerce').astype('float64').to_numpy()
+
+
+def _ocr_image_worker(pdf, method_name, image, kwargs, preprocess=None):
+    """Run one OCR image method (on the preprocessed image if any), return (result, error) so a failure never aborts the others"""
+    if pdf is None:
+        pdf = _WORKER_PDF
+    try:
+        matrix = None
+        if preprocess is not None:
+            with instrumentation.span('preprocess', document=pdf.pdf_file_name):
+                image, _, _, _, matrix = preprocess(image)
+        result = getattr(pdf, method_name)(image, **kwargs)
+        if isinstance(result, pd.DataFrame) and matrix is not None and not np.allclose(matrix, np.eye(2, 3)):
+            result = restore_ocr_df_coordinates(result, matrix=matrix)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    if result is None:
+        return None, f"{method_name} returned no result for {image}"
+    return result, None
+# + + + + + Functions + + + + +
+
+
 # + + + + + Classes + + + + +
 # + + + + + PDF + + + + +
 class PDF(object):
     def __init__(
         self,
         pdf_file_path,
-        show_debug=False
+        show_debug=False,
+        lazy=False,
+        ocr_cache=None,
+        password=None,
+        use_mmap=False,
+        document_cache=None
     ):
-        """Init and Load PDF file with PyPDF2"""
+        """Init and Load PDF file with PyPDF2
+
+        pdf_file_path can also be the PDF content itself: bytes, a file like object or an mmap,
+        the same buffer is then shared by the text, table and rasterization paths (no temp copy of ours).
+        With use_mmap=True a path is memory mapped instead of read through a file object.
+        With lazy=True pages are loaded and their text extracted only on first access,
+        ocr_cache is an optional OCRCache shared by all the OCR methods,
+        the password of an encrypted PDF is asked interactively if not given.
+        document_cache is an optional DocumentCache sharing the parse and the page texts between the PDF
+        instances of the same document (True for the one of the process), only eager PDFs fill it
+        """
         # preprocessing checks
-        pdf_file_path = str(pdf_file_path)
-        if not filepath_exists(pdf_file_path):
-            error_print(f"The file path {pdf_file_path} does not exist, please check again...")
+        source = None
+        if isinstance(pdf_file_path, (str, os.PathLike)):
+            pdf_file_path = str(pdf_file_path)
+            if not filepath_exists(pdf_file_path):
+                error_print(f"The file path {pdf_file_path} does not exist, please check again...")
+                return
+        elif isinstance(pdf_file_path, PDF_BUFFER_TYPES) or hasattr(pdf_file_path, 'read'):
+            source, pdf_file_path = pdf_file_path, None
+        else:
+            error_print(f"Cannot open a PDF from a {type(pdf_file_path).__name__}, use a path, bytes, a file like object or an mmap")
             return
 
         # define
         self.mode = 'rb'
         self.pdf_file_path = pdf_file_path
+        self.use_mmap = use_mmap
         # (get also pdf file name)
-        self.pdf_file_name = ntpath.basename(self.pdf_file_path).replace('.pdf', '')
-        # open the file
-        self.pdf_file = self.open_pdf(self.pdf_file_path, self.mode)
-        # objects related
-        self.pdf_reader = PyPDF2.PdfFileReader(self.pdf_file)
-        # data
-        self.num_pages = self.pdf_reader.numPages
-        self.pages = [
-            self.PDFPage(pdf=self, page_number=page, show_debug=show_debug)
-            for page in range(self.num_pages)
-        ]
-        self.text = self.get_pdf_text()
-        # is the PDF protected by a password?
-        if self.is_encrypted():
-            warning_print("This PDF is encrypted, please enter the password to decrypt it:\n\t>> ")
-            password = ask_password()
-            if password is None:
-                error_print("Error: Problems while parsing your password")
-                return
-            result = self.pdf_reader.decrypt(password)
-            if not bool(result):
-                error_print("Could not decrypt your PDF, check your password and try again")
-                return
+        if self.pdf_file_path is None:
+            self.pdf_file_name = ntpath.basename(str(getattr(source, 'name', DEFAULT_PDF_FILE_NAME))).replace('.pdf', '')
+        else:
+            self.pdf_file_name = ntpath.basename(self.pdf_file_path).replace('.pdf', '')
+        # OCR results cache (if any) and the PDF content digest it is keyed by
+        self.ocr_cache = ocr_cache
+        self._pdf_digest = None
+        # parsed documents cache (see _document_key)
+        self.document_cache = document_cache
+        self._document_cache_key = None
+        # open the file (or wrap the in memory content)
+        self._pdf_buffer = None
+        self._pdf_reader = None
+        with instrumentation.span('parse', document=self.pdf_file_name, lazy=lazy) as span:
+            self.pdf_file = self._open_source(source)
+            documents = self._documents()
+            entry = None if documents is None else documents.get(self._document_key())
+            if entry is not None:
+                # parsed before: the reader is built only when a page is not cached
+                self.num_pages = entry.num_pages
+            else:
+                # is the PDF protected by a password? (decrypt before reading any page)
+                if self.is_encrypted():
+                    # the decrypted texts never go to the shared cache
+                    self._document_cache_key = False
+                    if password is None:
+                        warning_print("This PDF is encrypted, please enter the password to decrypt it:\n\t>> ")
+                        password = ask_password()
+                    if password is None:
+                        error_print("Error: Problems while parsing your password")
+                        return
+                    result = self.pdf_reader.decrypt(password)
+                    if not bool(result):
+                        error_print("Could not decrypt your PDF, check your password and try again")
+                        return
+                # data
+                self.num_pages = self.pdf_reader.numPages
+                if self._document_key() is not None:
+                    documents.add(self._document_key(), self.num_pages)
+            if span:
+                span.set(pages=self.num_pages, bytes=self._source_size(), cached=entry is not None)
+            self.lazy = lazy
+            self._text = None
+            if self.lazy:
+                self.pages = self.PDFPages(pdf=self, show_debug=show_debug)
+            else:
+                self.pages = [
+                    self.PDFPage(pdf=self, page_number=page, show_debug=show_debug)
+                    for page in range(self.num_pages)
+                ]
+                self._text = self.get_pdf_text()
         # debug
         self.show_debug = show_debug
+        # per page errors of the last OCR run
+        self.ocr_errors = {}
+        # the PageIndex of the text, see build_search_index
+        self.search_index = None
+
+    def __getstate__(self):
+        """Pickle without the open file and the parsed objects (e.g. to send it to a worker process)"""
+        state = self.__dict__.copy()
+        for attribute in ['pdf_file', '_pdf_reader', 'pages', '_text', '_pdf_buffer', 'search_index']:
+            state.pop(attribute, None)
+        # an in memory PDF travels with its content
+        state['_pdf_source'] = None if self.pdf_file_path is not None else bytes(self._pdf_bytes())
+        return state
+
+    def __setstate__(self, state):
+        """Re open the PDF lazily after unpickling"""
+        source = state.pop('_pdf_source', None)
+        self.__dict__.update(state)
+        self.lazy = True
+        self._text = None
+        self._pdf_buffer = None
+        self.search_index = None
+        self.pdf_file = self._open_source(source)
+        self._pdf_reader = None
+        self.pages = self.PDFPages(pdf=self, show_debug=self.show_debug)
+
+    @property
+    def pdf_reader(self):
+        """The PyPDF2 reader, built on first access"""
+        if self._pdf_reader is None:
+            self._pdf_reader = PyPDF2.PdfFileReader(self.pdf_file)
+        return self._pdf_reader
+
+    # + + + + + Inner Class - PDF Pages + + + + +
+    class PDFPages(object):
+        def __init__(self, pdf, show_debug=False):
+            """A lazy sequence of PDF Pages, each PDFPage is built on first access"""
+            self.pdf = pdf
+            self.show_debug = show_debug
+            self._pages = {}
+
+        def __repr__(self):
+            return "<PDF Pages [%s/%s loaded] >" % (len(self._pages), len(self))
+
+        def __len__(self):
+            return self.pdf.num_pages
+
+        def __iter__(self):
+            for page_number in range(len(self)):
+                yield self[page_number]
+
+        def __getitem__(self, page_number):
+            if isinstance(page_number, slice):
+                return [self[i] for i in range(*page_number.indices(len(self)))]
+            page_number = int(page_number)
+            if page_number < 0:
+                page_number = len(self) + page_number
+            if page_number < 0 or page_number >= len(self):
+                raise IndexError(f"Page index out of range, the PDF has {len(self)} pages")
+
+            page = self._pages.get(page_number)
+            if page is None:
+                page = self.pdf.PDFPage(
+                    pdf=self.pdf, page_number=page_number,
+                    show_debug=self.show_debug, lazy=True
+                )
+                self._pages[page_number] = page
+            return page
+
+        def loaded(self):
+            """The page numbers already loaded"""
+            return sorted(self._pages)
+    # + + + + + Inner Class - PDF Pages + + + + +
+
+    # + + + + + Inner Class - PDF View + + + + +
+    class PDFView(object):
+        __slots__ = ('pdf', 'page_numbers')
+
+        def __init__(self, pdf, page_numbers):
+            """A lightweight view on some pages of a PDF, nothing is loaded until used"""
+            self.pdf = pdf
+            self.page_numbers = list(page_numbers)
+
+        def __repr__(self):
+            return "<PDF View [%s] %s pages >" % (self.pdf.pdf_file_name, len(self))
+
+        def __len__(self):
+            return len(self.page_numbers)
+
+        def __iter__(self):
+            for page_number in self.page_numbers:
+                yield self.pdf.get_page(page_number)
+
+        def __getitem__(self, index):
+            if isinstance(index, slice):
+                return self.pdf.PDFView(self.pdf, self.page_numbers[index])
+            return self.pdf.get_page(self.page_numbers[index])
+
+        @property
+        def text(self):
+            return ' '.join(str(self.pdf.get_page_text(page_number)) for page_number in self.page_numbers)
+
+        def to_pdf(self, output_file_path):
+            """Write only the pages of this view to a new PDF"""
+            return self.pdf.extract_pages(self.page_numbers, output_file_path)
+    # + + + + + Inner Class - PDF View + + + + +
 
     # + + + + + Inner Class - PDF Page + + + + +
     class PDFPage(object):
+        # no per page __dict__, a PDF can hold many thousands of them
+        __slots__ = ('pdf', 'num_pages', 'page_number', '_pdf_page', '_page_text', 'show_debug')
+
         def __init__(
-            self, pdf, page_number, show_debug=False
+            self, pdf, page_number, show_debug=False, lazy=False
         ):
-            """Init and Load a PDF Page"""
+            """Init and Load a PDF Page (with lazy=True the text is extracted on first access)"""
             if page_number is None:
                 raise ValueError("The Page Number cannot be None, please insert an integer, every PDFPage has an int reference to its PDF object")
 
@@ -104,10 +482,26 @@ class PDF(object):
             self.num_pages = self.pdf.num_pages
             self.page_number = self._page_number_validated(page_number)
             # data
-            self.pdf_page = self.pdf.pdf_reader.getPage(self.page_number)
-            self.page_text = self.get_text()
+            self._pdf_page = None
+            self._page_text = None
+            if not lazy:
+                self._page_text = self.get_text()
             self.show_debug = show_debug
 
+        @property
+        def pdf_page(self):
+            """The PyPDF2 page object, loaded on first access"""
+            if self._pdf_page is None:
+                self._pdf_page = self.pdf.pdf_reader.getPage(self.page_number)
+            return self._pdf_page
+
+        @property
+        def page_text(self):
+            """The page text, extracted on first access"""
+            if self._page_text is None:
+                self._page_text = self.get_text()
+            return self._page_text
+
         def __repr__(self):
             return "<PDF Page [%s] >" % self.page_text[:10]
         
@@ -149,37 +543,253 @@ class PDF(object):
             return page_number
 
         def get_text(self):
-            return str(self.pdf_page.extractText())
+            text = self.pdf._cached_page_text(self.page_number)
+            if text is not None:
+                return text
+            with instrumentation.span('page_text', document=self.pdf.pdf_file_name, page=self.page_number + 1):
+                text = str(self.pdf_page.extractText())
+            self.pdf._cache_page_text(self.page_number, text)
+            return text
 
         def export(self, output_file_path=None):
             # adding rotated page object to pdf writer
             writer = PyPDF2.PdfFileWriter()
             writer.addPage(self.pdf_page)
         
-            # new pdf file object
+            # new pdf file object, named from 1 like the files of split
             if output_file_path is None:
-                to_replace = self.pdf.pdf_file_name
-                output_file_path = self.pdf.pdf_file_path.replace(to_replace, to_replace + f'_page_{str(self.page_number)}')
+                output_file_path = self.pdf._output_file_path(f'_page_{self.page_number + 1}')
 
-            with open(output_file_path, 'wb') as new_file:
-                # writing rotated pages to new file 
-                writer.write(new_file)
+            return self.pdf._write_pdf(writer, output_file_path)
     # + + + + + Inner Class - PDF Page + + + + +
     
-    def to_pdf(self, output_file_path=None):
+    def to_pdf(self, output_file_path=None, pages=None, incremental=False):
+        """Write the PDF (or only the selected pages) to output_file_path, the PDF itself by default
+
+        With incremental=True (only when writing the whole PDF onto itself) the loaded pages
+        are appended as an incremental update instead of rewriting the file
+        """
+        if incremental:
+            if pages is not None or output_file_path not in [None, self.pdf_file_path]:
+                error_print("An incremental save can only write the whole PDF onto itself")
+                return None
+            return self.save_incremental()
+        page_numbers = self._page_numbers(pages)
+        if page_numbers is None:
+            return None
         writer = PyPDF2.PdfFileWriter()
         # writing a PDF object
-        for page_number in range(self.num_pages):
-            # copy in tmp file
-            page = self.get_page(page_number).pdf_page
-            # adding to file 
-            writer.addPage(page)
+        self._add_pages_to_writer(writer, page_numbers)
         if output_file_path is None:
             output_file_path = self.pdf_file_path
+        if output_file_path is None:
+            error_print("An in memory PDF needs an output file path to be written")
+            return None
+        if output_file_path == self.pdf_file_path:
+            # the content changes, so does its OCR cache key
+            self._pdf_digest = None
+            # and its documents cache key, with some pages only the file no longer matches this PDF
+            self._document_cache_key = None if pages is None else False
+
+        self._write_pdf(writer, output_file_path)
+        return output_file_path
+
+    def save_incremental(self, pages=None):
+        """Append the selected pages (the loaded ones by default) to the PDF file as an incremental update
+
+        Only the page objects and a new xref section are written after the original bytes,
+        so small edits (e.g. a rotation) cost the same whatever the file size. The xref section
+        is a table or an xref stream, like the last one of the file
+        """
+        if self.pdf_file_path is None:
+            error_print("Incremental updates need a PDF file, use to_pdf for an in memory PDF")
+            return None
+        if self.is_encrypted():
+            error_print("Incremental updates of encrypted PDFs are not supported, use to_pdf")
+            return None
+        if pages is None:
+            page_numbers = [page_number for page_number in range(self.num_pages) if self._loaded_page(page_number) is not None]
+        else:
+            page_numbers = self._page_numbers(pages)
+            if page_numbers is None:
+                return None
+        objects = {}
+        for page_number in page_numbers:
+            pdf_page = self.get_page(page_number).pdf_page
+            if pdf_page.indirectRef is None:
+                error_print(f"The page {page_number} has no object in this PDF, cannot save it incrementally")
+                return None
+            objects[pdf_page.indirectRef.idnum] = (pdf_page.indirectRef.generation, pdf_page)
+        previous_xref = self._startxref()
+        if previous_xref is None:
+            error_print("Could not find the xref of this PDF, cannot save it incrementally")
+            return None
 
-        with open(output_file_path, 'wb') as new_file:
-            # writing rotated pages to new file 
-            writer.write(new_file) 
+        trailer = self.pdf_reader.trailer
+        update = BytesIO()
+        with open(self.pdf_file_path, 'rb+') as f:
+            # a PDF 1.5+ file (e.g. with object streams) can have an xref stream instead of an xref table,
+            # the update must use the same kind (strict readers reject a table chained to a stream)
+            f.seek(previous_xref)
+            xref_stream = not f.read(32).lstrip().startswith(b'xref')
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) not in (b'\n', b'\r'):
+                update.write(b'\n')
+            # the changed objects
+            offsets = {}
+            for idnum, (generation, obj) in sorted(objects.items()):
+                offsets[idnum] = offset + update.tell()
+                update.write(b'%d %d obj\n' % (idnum, generation))
+                obj.writeToStream(update, None)
+                update.write(b'\nendobj\n')
+            # the new trailer, pointing to the previous xref
+            new_trailer = PyPDF2.generic.DictionaryObject()
+            for key in ['/Root', '/Info', '/ID']:
+                if key in trailer:
+                    new_trailer[PyPDF2.generic.NameObject(key)] = trailer.raw_get(key)
+            size = max([self._object_count()] + [idnum + 1 for idnum in objects])
+            new_trailer[PyPDF2.generic.NameObject('/Prev')] = PyPDF2.generic.NumberObject(previous_xref)
+            xref = offset + update.tell()
+            if xref_stream:
+                self._write_xref_stream(update, new_trailer, objects, offsets, size, xref)
+            else:
+                # the new xref section, one subsection per object
+                update.write(b'xref\n0 1\n0000000000 65535 f \n')
+                for idnum, (generation, _) in sorted(objects.items()):
+                    update.write(b'%d 1\n%010d %05d n \n' % (idnum, offsets[idnum], generation))
+                new_trailer[PyPDF2.generic.NameObject('/Size')] = PyPDF2.generic.NumberObject(size)
+                update.write(b'trailer\n')
+                new_trailer.writeToStream(update, None)
+            update.write(b'\nstartxref\n%d\n%%%%EOF\n' % xref)
+            f.write(update.getvalue())
+
+        # the content changes, so do its cache keys
+        self._pdf_digest = None
+        self._document_cache_key = None
+        self._invalidate_documents(self.pdf_file_path)
+        return self.pdf_file_path
+
+    @staticmethod
+    def _write_xref_stream(update, trailer, objects, offsets, size, xref):
+        """Write the xref section of an incremental update as an xref stream object (number size) at offset xref
+
+        trailer holds the trailer keys, the stream lists the changed objects and itself
+        """
+        entries = {idnum: (offsets[idnum], generation) for idnum, (generation, _) in objects.items()}
+        entries[size] = (xref, 0)
+        # type (1: in use), offset and generation fields, the offset as wide as needed
+        offset_width = max(4, (xref.bit_length() + 7) // 8)
+        data = b''.join(
+            b'\x01' + entry_offset.to_bytes(offset_width, 'big') + generation.to_bytes(2, 'big')
+            for _, (entry_offset, generation) in sorted(entries.items())
+        )
+        stream = PyPDF2.generic.StreamObject()
+        stream.update(trailer)
+        stream[PyPDF2.generic.NameObject('/Type')] = PyPDF2.generic.NameObject('/XRef')
+        stream[PyPDF2.generic.NameObject('/Size')] = PyPDF2.generic.NumberObject(size + 1)
+        stream[PyPDF2.generic.NameObject('/W')] = PyPDF2.generic.ArrayObject(
+            PyPDF2.generic.NumberObject(width) for width in [1, offset_width, 2]
+        )
+        stream[PyPDF2.generic.NameObject('/Index')] = PyPDF2.generic.ArrayObject(
+            PyPDF2.generic.NumberObject(number) for idnum in sorted(entries) for number in [idnum, 1]
+        )
+        stream._data = data
+        update.write(b'%d 0 obj\n' % size)
+        stream.writeToStream(update, None)
+        update.write(b'\nendobj')
+
+    def _object_count(self):
+        """The /Size of the PDF trailer, the number of objects"""
+        trailer = self.pdf_reader.trailer
+        if '/Size' in trailer:
+            return trailer['/Size']
+        # PyPDF2 does not keep the /Size of an xref stream, every object is in its xref though
+        reader = self.pdf_reader
+        idnums = [idnum for entries in reader.xref.values() for idnum in entries] + list(reader.xref_objStm)
+        return max(idnums, default=0) + 1
+
+    def _startxref(self):
+        """The offset of the last xref section of the PDF file, None if not found"""
+        with open(self.pdf_file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - 1024, 0))
+            tail = f.read()
+        position = tail.rfind(b'startxref')
+        if position < 0:
+            return None
+        return to_int(tail[position + len(b'startxref'):].split()[0])
+
+    def extract_pages(self, pages, output_file_path=None):
+        """Write only the selected pages to a new PDF, return it (lazy, with the texts already extracted)"""
+        page_numbers = self._page_numbers(pages)
+        if page_numbers is None:
+            return None
+        if output_file_path is None:
+            output_file_path = self._output_file_path('_extracted')
+        writer = PyPDF2.PdfFileWriter()
+        texts = self._add_pages_to_writer(writer, page_numbers)
+        self._write_pdf(writer, output_file_path)
+        return self._new_pdf_with_texts(output_file_path, texts)
+
+    def split(self, chunks=None, where=None):
+        """Split the PDF in many files, one per page or one per chunk (a list of page selections)
+
+        Return the paths of the new files
+        """
+        if chunks is None:
+            chunks = [[page_number] for page_number in range(self.num_pages)]
+        where = self._page_images_dir(where)
+        paths = []
+        for chunk in chunks:
+            page_numbers = self._page_numbers(chunk)
+            if not page_numbers:
+                error_print(f"Skipping the chunk {chunk}, no page selected")
+                continue
+            first, last = page_numbers[0] + 1, page_numbers[-1] + 1
+            suffix = f"_page_{first}" if len(page_numbers) == 1 else f"_pages_{first}-{last}"
+            output_file_path = where + self.pdf_file_name + suffix + '.pdf'
+            writer = PyPDF2.PdfFileWriter()
+            self._add_pages_to_writer(writer, page_numbers)
+            self._write_pdf(writer, output_file_path)
+            paths.append(output_file_path)
+        return paths
+
+    def _page_numbers(self, pages):
+        """The 0-based page numbers selected by pages (see parse_pages)"""
+        return parse_pages(pages, self.num_pages)
+
+    def _add_pages_to_writer(self, writer, page_numbers):
+        """Add the selected pages to a PyPDF2 writer, only touching those pages
+
+        Return the page texts already extracted (None where not extracted yet)
+        """
+        texts = []
+        for page_number in page_numbers:
+            page = self._loaded_page(page_number)
+            # a loaded page may have been edited (e.g. rotated)
+            writer.addPage(self.pdf_reader.getPage(page_number) if page is None else page.pdf_page)
+            texts.append(None if page is None else page._page_text)
+        return texts
+
+    def _write_pdf(self, writer, output_file_path):
+        """Write a PyPDF2 writer to a file, through a tmp file so the PDF can overwrite itself"""
+        tmp_file_path = output_file_path + '.tmp'
+        with open(tmp_file_path, 'wb') as new_file:
+            writer.write(new_file)
+        os.replace(tmp_file_path, output_file_path)
+        self._invalidate_documents(output_file_path)
+        return output_file_path
+
+    @classmethod
+    def _new_pdf_with_texts(cls, pdf_file_path, texts, show_debug=False):
+        """Open a PDF (a path or its content) lazily, filling in the page texts already known"""
+        new_pdf = cls(pdf_file_path, show_debug=show_debug, lazy=True)
+        for page_number, text in enumerate(texts):
+            if text is not None:
+                new_pdf.pages[page_number]._page_text = text
+        return new_pdf
 
     def __enter__(self):
         return self.pdf
@@ -188,37 +798,92 @@ class PDF(object):
         """Context Manager close PDF at the end"""
         self._close_file(self.pdf_file)
 
+    @property
+    def text(self):
+        """The whole PDF text, computed on first access"""
+        if self._text is None:
+            self._text = self.get_pdf_text()
+        return self._text
+
     def __repr__(self):
+        if self.lazy and self._text is None:
+            return "<PDF File [%s] (%s pages) >" % (self.pdf_file_name, self.num_pages)
         return "<PDF File [%s] >" % self.text[:10]
     
     def __int__(self):
         return self.num_pages
     
     def __getitem__(self, page_number):
+        # slices (and lists or specs like "1-5,9") give a lightweight view
+        if isinstance(page_number, (slice, str, list, tuple, range)):
+            page_numbers = self._page_numbers(page_number)
+            if page_numbers is None:
+                raise IndexError(f"Not valid pages {page_number} for a PDF of {self.num_pages} pages")
+            return self.PDFView(self, page_numbers)
         return self.pages[page_number]
     
     def __len__(self):
         return self.num_pages
 
     def __add__(self, other):
-        # pdf merge
-        pdf_merger = PyPDF2.PdfFileMerger()
-        pdf_merger.append(self.pdf_file)
-        pdf_merger.append(other.pdf_file)
-
-        to_replace = self.pdf_file_name
-        output = self.pdf_file_path.replace(to_replace, f'{self.pdf_file_name}_{other.pdf_file_name}')
-
-        # writing combined pdf to output pdf file 
-        with open(output, 'wb') as f: 
-            pdf_merger.write(f)
-
-        # new file
-        new_pdf = PDF(output)
-        # delete file combined
-        os.remove(output)
+        # pdf merge, in memory (lazy, with the texts already extracted from self and other)
+        return PDF.merge([self, other])
+
+    def __radd__(self, other):
+        # so that sum(pdfs) works, prefer PDF.merge(pdfs, output) to merge many PDFs in one pass
+        if other == 0:
+            return self
+        return other.__add__(self)
+
+    @classmethod
+    def merge(cls, pdfs, output_file_path=None, show_debug=False):
+        """Merge many PDFs (PDF objects or paths) into output_file_path in a single pass
+
+        The pages are streamed into one writer, the result is a lazy PDF that reuses
+        the page texts the inputs already extracted instead of parsing them again.
+        Without an output_file_path the merged PDF stays in memory (named after the inputs)
+        """
+        writer = PyPDF2.PdfFileWriter()
+        texts = []
+        names = []
+        inputs = []
+        # the PDFs opened here from paths, to close when written
+        opened = []
+        try:
+            for pdf in pdfs:
+                if not isinstance(pdf, PDF):
+                    pdf = cls(pdf, show_debug=show_debug, lazy=True)
+                    if not hasattr(pdf, 'pages'):
+                        error_print("Could not merge the PDFs, one of them cannot be opened")
+                        return None
+                    opened.append(pdf)
+                inputs.append(pdf)
+                names.append(pdf.pdf_file_name)
+                texts.extend(pdf._add_pages_to_writer(writer, range(pdf.num_pages)))
+            if not inputs:
+                error_print("No PDF to merge")
+                return None
 
-        return new_pdf
+            if output_file_path is None:
+                merged = BytesIO()
+                writer.write(merged)
+                merged.seek(0)
+                merged.name = '_'.join(names) + '.pdf'
+            else:
+                # through a tmp file, the output can be one of the inputs still read lazily
+                merged = inputs[0]._write_pdf(writer, output_file_path)
+                for pdf in inputs[1:]:
+                    pdf._invalidate_documents(output_file_path)
+                for pdf in inputs:
+                    if pdf.pdf_file_path == output_file_path:
+                        # its content changes, so do its cache keys
+                        pdf._pdf_digest = None
+                        pdf._document_cache_key = None
+        finally:
+            for pdf in opened:
+                pdf.close()
+
+        return cls._new_pdf_with_texts(merged, texts, show_debug=show_debug)
     
     def __hash__(self):
         return hash((self.num_pages, self.text))
@@ -256,6 +921,56 @@ class PDF(object):
     def open_pdf(self, file_path, mode):
         """Open a file"""
         return open(file_path, mode)
+
+    def _open_source(self, source=None):
+        """The stream PyPDF2 reads from: the file at pdf_file_path (or its mmap) or the in memory source"""
+        if source is None:
+            if not self.use_mmap:
+                return self.open_pdf(self.pdf_file_path, self.mode)
+            with open(self.pdf_file_path, self.mode) as f:
+                self._pdf_buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._pdf_buffer
+        if isinstance(source, mmap.mmap):
+            # an mmap is already a seekable stream
+            self._pdf_buffer = source
+            return source
+        if isinstance(source, PDF_BUFFER_TYPES):
+            self._pdf_buffer = source
+            # BytesIO shares the memory of bytes (other buffers are copied once)
+            return BytesIO(source)
+        if isinstance(source, BytesIO):
+            # the bytes a BytesIO holds, not copied while it is not written to
+            self._pdf_buffer = source.getvalue()
+        return source
+
+    def _pdf_bytes(self):
+        """The PDF content as a buffer (not a copy when possible), None if the PDF is a file path"""
+        if self.pdf_file_path is not None:
+            return None
+        if self._pdf_buffer is None:
+            # a generic file like object, read once
+            self.pdf_file.seek(0)
+            self._pdf_buffer = self.pdf_file.read()
+        return self._pdf_buffer
+
+    def _source_size(self):
+        """The size of the PDF content in bytes"""
+        if self.pdf_file_path is not None:
+            return os.path.getsize(self.pdf_file_path)
+        return memoryview(self._pdf_bytes()).nbytes
+
+    def _pdf_input(self):
+        """The PDF for the external tools (e.g. tabula), its path or a stream on its content"""
+        if self.pdf_file_path is not None:
+            return self.pdf_file_path
+        return BytesIO(self._pdf_bytes())
+
+    def _output_file_path(self, suffix):
+        """A new PDF path next to this one (in the working folder for an in memory PDF)"""
+        if self.pdf_file_path is None:
+            return os.path.join(os.getcwd(), self.pdf_file_name + suffix + '.pdf')
+        to_replace = self.pdf_file_name
+        return self.pdf_file_path.replace(to_replace, to_replace + suffix)
     
     def _close_file(self, file):
         """An internal way of closing files in general"""
@@ -266,7 +981,7 @@ class PDF(object):
         return self.pdf_file.close()
     
     def get_number_of_pages(self):
-        return self.pdf_reader.numPages
+        return self.num_pages
 
     def is_encrypted(self):
         return self.pdf_reader.isEncrypted
@@ -286,136 +1001,695 @@ class PDF(object):
         texts = [str(self.get_page_text(page_num)) for page_num in range(self.num_pages)]
         return ' '.join(texts)
 
+    def iter_page_texts(self, start=None, stop=None, chunk_size=1):
+        """Yield (page_number, text) one page at a time with bounded memory
+
+        Pages are read ahead chunk_size at a time, the parsed objects of each chunk
+        are released from the reader cache once its texts have been yielded
+        """
+        chunk_size = to_int(chunk_size)
+        if chunk_size is None or chunk_size < 1:
+            error_print("The chunk size must be an integer greater than 0")
+            return
+        page_numbers = range(*slice(start, stop).indices(self.num_pages))
+        for chunk_start in range(0, len(page_numbers), chunk_size):
+            chunk = page_numbers[chunk_start:chunk_start + chunk_size]
+            texts = [(page_number, self._known_page_text(page_number)) for page_number in chunk]
+            if any(text is None for _, text in texts):
+                resolved_objects = self._reader_resolved_objects()
+                already_resolved = set(resolved_objects)
+                for i, (page_number, text) in enumerate(texts):
+                    if text is None:
+                        with instrumentation.span('page_text', document=self.pdf_file_name, page=page_number + 1):
+                            text = str(self.pdf_reader.getPage(page_number).extractText())
+                        texts[i] = (page_number, text)
+                # release what this chunk parsed before yielding
+                for key in set(resolved_objects) - already_resolved:
+                    del resolved_objects[key]
+            while texts:
+                yield texts.pop(0)
+
+    def _loaded_page(self, page_number):
+        """The PDFPage if already loaded, None otherwise"""
+        if self.lazy:
+            return self.pages._pages.get(page_number)
+        return self.pages[page_number]
+
+    def _loaded_page_text(self, page_number):
+        """The page text if some PDFPage already extracted it, None otherwise"""
+        page = self._loaded_page(page_number)
+        return None if page is None else page._page_text
+
+    def _known_page_text(self, page_number):
+        """The page text if already extracted, by a PDFPage or in the documents cache, None otherwise"""
+        text = self._loaded_page_text(page_number)
+        return self._cached_page_text(page_number) if text is None else text
+
+    def _reader_resolved_objects(self):
+        """The PyPDF2 reader cache of parsed indirect objects"""
+        resolved_objects = getattr(self.pdf_reader, 'resolvedObjects', None)
+        if resolved_objects is None:
+            resolved_objects = getattr(self.pdf_reader, 'resolved_objects', {})
+        return resolved_objects
+
     def get_pdf_tables(
         self, multiple_tables=True,
         area=None, pages=1,
         output_format=None
     ):
-        df = tabula.read_pdf(
-            self.pdf_file_path,
-            area=area,
-            pages=pages,
-            output_format=output_format,
-            multiple_tables=multiple_tables
-        )
+        with instrumentation.span('tables', document=self.pdf_file_name, engine='tabula', pages=pages):
+            df = tabula.read_pdf(
+                self._pdf_input(),
+                area=area,
+                pages=pages,
+                output_format=output_format,
+                multiple_tables=multiple_tables
+            )
         return df
 
     def pdf_to_excel(self, excel_file_path):
-        return tabula.convert_into(
-            self.pdf_file_path,
-            excel_file_path, output_format="xlsx"
-        )
-
-    def pdf_rotate(self, rotation, pages=None):
+        with instrumentation.span('tables', document=self.pdf_file_name, engine='tabula', output_format='xlsx'):
+            return tabula.convert_into(
+                self._pdf_input(),
+                excel_file_path, output_format="xlsx"
+            )
+
+    # - Columnar export -
+    def pdf_to_parquet(self, output_file_path=None, content='ocr', pages=None, row_group_pages=1, **kwargs):
+        """Stream the OCR word boxes ('ocr'), the page texts ('text') or the tables ('tables') to a Parquet file
+
+        Each page is written as soon as it is ready (row_group_pages pages per row group) with the
+        explicit schema of the content (see export), nothing is gathered in one data frame.
+        kwargs go to iter_pdf_to_dfs, extract_text (e.g. mode='hybrid', 'text_layer' by default)
+        or get_page_tables. Read the pages back with export.read_pages. Return the file path, None on errors
+        """
+        return self._pdf_to_columnar(output_file_path, content, 'parquet', pages, row_group_pages, kwargs)
+
+    def pdf_to_arrow(self, output_file_path=None, content='ocr', pages=None, row_group_pages=1, **kwargs):
+        """Like pdf_to_parquet, to an Arrow IPC (Feather v2) file, one record batch per row group"""
+        return self._pdf_to_columnar(output_file_path, content, 'arrow', pages, row_group_pages, kwargs)
+
+    def _pdf_to_columnar(self, output_file_path, content, format, pages, row_group_pages, kwargs):
+        if content not in COLUMNAR_CONTENTS:
+            error_print(f"This content {content} not available, only these ones {COLUMNAR_CONTENTS}")
+            return None
+        page_numbers = self._page_numbers(pages)
+        if page_numbers is None:
+            return None
+        page_numbers = sorted(set(page_numbers))
+        # imported here, pyarrow is needed only to export
+        from . import export
+        if output_file_path is None:
+            output_file_path = os.path.splitext(self._output_file_path(f'_{content}'))[0] + export.COLUMNAR_EXTENSIONS[format]
+
+        completed = False
+        try:
+            with export.ColumnarWriter(
+                output_file_path, export.COLUMNAR_SCHEMAS[content], format=format, row_group_pages=row_group_pages
+            ) as writer:
+                completed = self._write_columnar(writer, export, content, page_numbers, kwargs)
+        finally:
+            # no partial file is left behind
+            if not completed and os.path.exists(output_file_path):
+                os.remove(output_file_path)
+        return output_file_path if completed else None
+
+    def _write_columnar(self, writer, export, content, page_numbers, kwargs):
+        """Write the content of the selected pages as it is extracted, False if the extraction failed"""
+        if content == 'ocr':
+            self.ocr_errors = {}
+            for page_number, page_df, error in self.iter_pdf_to_dfs(pages=page_numbers, **kwargs):
+                if error is not None:
+                    error_print(f"OCR failed on page {page_number}: {error}")
+                    self.ocr_errors[page_number] = error
+                else:
+                    writer.write(export.ocr_table(page_df, page_number))
+        elif content == 'text' and kwargs.get('mode', 'text_layer') == 'text_layer':
+            # the text layer is streamed, page by page
+            for start, stop in page_runs(page_numbers):
+                for page_number, text in self.iter_page_texts(start=start, stop=stop):
+                    writer.write(export.text_table(page_number + 1, text, 'text_layer'))
+        elif content == 'text':
+            page_texts = self.extract_text(pages=page_numbers, **kwargs)
+            if page_texts is None:
+                return False
+            for page_text in page_texts:
+                writer.write(export.text_table(page_text.page, page_text.text, page_text.source))
+        else:
+            # the tables are extracted and written one row group of pages at a time
+            for chunk_start in range(0, len(page_numbers), writer.row_group_pages):
+                chunk = page_numbers[chunk_start:chunk_start + writer.row_group_pages]
+                table_results = self.get_page_tables(pages=chunk, **kwargs)
+                if table_results is None:
+                    return False
+                page_results = {}
+                for result in table_results:
+                    page_results.setdefault(result.page, []).append(result)
+                for page_number in sorted(page_results):
+                    writer.write(export.tables_table(page_results[page_number]))
+        return True
+    # - Columnar export -
+
+    def get_page_tables(self, pages=None, areas=None, relative_area=False, engine=None, **tabula_kwargs):
+        """The tables of the selected pages and areas as a list of TableResult (page, area, table, df)
+
+        The tables go through a TableEngine (the process wide one by default), so the
+        JVM is not started again for every call, see TableEngine.extract
+        """
+        if engine is None:
+            # imported here, tabula is loaded only when tables are needed
+            from .tables import table_engine as engine
+        return engine.extract(self, pages=pages, areas=areas, relative_area=relative_area, **tabula_kwargs)
+
+    def pdf_rotate(self, rotation, pages=None, incremental=False):
+        """Rotate the selected pages clockwise into a new _rotated PDF
+
+        With incremental=True no _rotated PDF is written: the PDF file itself is changed
+        in place, the rotated pages are appended to it as an incremental update
+        (the cost does not depend on the file size, see save_incremental)
+        """
         # writing instance
         writer = PyPDF2.PdfFileWriter()
+        # validate
+        pages = self._page_numbers(pages)
         if pages is None:
-            pages = list(range(self.num_pages))
-        else:
-            # validate
-            pages = correct_nonlist(pages)
-
-        # rotating each page
-        for page_number in range(self.num_pages):
+            return False
 
+        # rotating only the selected pages
+        for page_number in set(pages):
             # creating rotated page object 
-            page = self.get_page(page_number).pdf_page
-            if page_number in pages:
-                page.rotateClockwise(rotation)
+            self.get_page(page_number).pdf_page.rotateClockwise(rotation)
 
-            # adding rotated page object to pdf writer 
-            writer.addPage(page) 
+        if incremental:
+            return self.save_incremental(pages=pages) is not None
+
+        # adding every page object to pdf writer (the others untouched)
+        self._add_pages_to_writer(writer, range(self.num_pages))
     
         # new pdf file object
-        to_replace = self.pdf_file_name
-        new_rotated_file_path = self.pdf_file_path.replace(to_replace, to_replace + '_rotated')
-        
-        with open(new_rotated_file_path, 'wb') as new_file:
-            # writing rotated pages to new file 
-            writer.write(new_file) 
-    
+        self._write_pdf(writer, self._output_file_path('_rotated'))
         return True
 
+    # - - - - - Metrics - - - - -
+    @contextmanager
+    def timed(self):
+        """Time what this PDF does in a with block, yield a TimingReport of its stages
+
+        with pdf.timed() as report:
+            df = pdf.pdf_to_df()
+        print(report)
+        """
+        with instrumentation.hooked(TimingReport(document=self.pdf_file_name)) as report:
+            yield report
+    # - - - - - Metrics - - - - -
+
+    # - - - - - Search - - - - -
+    def search_index_path(self):
+        """Where the search index is saved, next to the PDF (in the current directory for in memory PDFs)"""
+        if self.pdf_file_path is None:
+            return os.path.join(os.getcwd(), self.pdf_file_name + '.pdf' + PAGE_INDEX_EXTENSION)
+        return self.pdf_file_path + PAGE_INDEX_EXTENSION
+
+    def build_search_index(self, mode='text_layer', pages=None, save=True, index_path=None, **ocr_kwargs):
+        """Index the text of the selected pages (see parse_pages) for search, return the PageIndex
+
+        Pages are indexed one at a time as they are extracted, mode is the one of extract_text
+        ('text_layer' streams the text layer with iter_page_texts, 'hybrid' and 'ocr' also keep
+        the word boxes of the OCR pages, ocr_kwargs go to extract_text). A saved index of the
+        same content and pages is loaded instead of re-extracting, with save=True the index is
+        saved to index_path (search_index_path() by default)
+        """
+        if mode not in TEXT_EXTRACTION_MODES:
+            error_print(f"This mode {mode} not available, only these ones {TEXT_EXTRACTION_MODES}")
+            return None
+        page_numbers = self._page_numbers(pages)
+        if page_numbers is None:
+            return None
+        page_numbers = sorted(set(page_numbers))
+        if not page_numbers:
+            self.search_index = PageIndex(mode=mode)
+            return self.search_index
+        index_path = self.search_index_path() if index_path is None else str(index_path)
+
+        index = PageIndex.load(index_path, digest=self._content_digest())
+        if index is None or index.mode != mode or not all(page_number in index for page_number in page_numbers):
+            index = PageIndex(digest=self._content_digest(), mode=mode)
+            if mode == 'text_layer':
+                # only the selected pages, streamed one run of consecutive pages at a time
+                for start, stop in page_runs(page_numbers):
+                    for page_number, text in self.iter_page_texts(start=start, stop=stop):
+                        index.add_page(page_number, text)
+            else:
+                page_texts = self.extract_text(mode=mode, pages=page_numbers, **ocr_kwargs)
+                if page_texts is None:
+                    return None
+                for page_text in page_texts:
+                    if page_text.df is not None:
+                        index.add_ocr_page(page_text.page - 1, page_text.df)
+                    else:
+                        index.add_page(page_text.page - 1, page_text.text)
+            if save:
+                try:
+                    index.save(index_path)
+                except OSError as e:
+                    warning_print(f"Could not save the search index to {index_path}: {e}")
+        self.search_index = index
+        return index
+
+    def search(self, query, regex=False):
+        """The Hits (0-based page, offsets in the page text, OCR word box if any) of a term, a phrase or a regex
+
+        The index is built on first use (see build_search_index)
+        """
+        if self.search_index is None and self.build_search_index() is None:
+            return None
+        return self.search_index.find(query, regex=regex)
+    # - - - - - Search - - - - -
+
     # - - - - - OCR - - - - -
+    # text layer or ocr
+    def page_needs_ocr(self, page_number):
+        """True if the page (0-based) has no plausible text layer, e.g. a scanned page"""
+        return not is_plausible_text_layer(self.get_page_text(page_number))
+
+    def extract_text(
+        self, mode='hybrid', pages=None, ocr=None, workers=None,
+        executor='process', dpi=350, batch_size=4, preprocess=None
+    ):
+        """The text of the selected pages (see parse_pages) as a list of PageText, in page order
+
+        mode 'hybrid' reads the text layer of the pages that have a plausible one and OCRs
+        only the others, 'text_layer' and 'ocr' use one source for every page.
+        PageText.page starts from 1 like the OCR, a page whose OCR failed has text None
+        (and its error in self.ocr_errors)
+        """
+        if mode not in TEXT_EXTRACTION_MODES:
+            error_print(f"This mode {mode} not available, only these ones {TEXT_EXTRACTION_MODES}")
+            return None
+        page_numbers = self._page_numbers(pages)
+        if page_numbers is None:
+            return None
+        page_numbers = sorted(set(page_numbers))
+
+        results = {}
+        ocr_pages = []
+        for page_number in page_numbers:
+            if mode == 'ocr' or (mode == 'hybrid' and self.page_needs_ocr(page_number)):
+                ocr_pages.append(page_number)
+            else:
+                results[page_number + 1] = PageText(page_number + 1, self.get_page_text(page_number), 'text_layer', None)
+
+        self.ocr_errors = {}
+        if ocr_pages:
+            for page_number, page_df, error in self.iter_pdf_to_dfs(
+                ocr=ocr, workers=workers, executor=executor,
+                dpi=dpi, batch_size=batch_size, pages=ocr_pages, preprocess=preprocess
+            ):
+                if error is not None:
+                    error_print(f"OCR failed on page {page_number}: {error}")
+                    self.ocr_errors[page_number] = error
+                    results[page_number] = PageText(page_number, None, 'ocr', None)
+                else:
+                    results[page_number] = PageText(page_number, ocr_df_text(page_df), 'ocr', page_df)
+        return [results.get(page_number + 1, PageText(page_number + 1, None, 'ocr', None)) for page_number in page_numbers]
+
     # ocr pdf to df
-    def pdf_to_df(self, keep_page_images=False, ocr=None):
-        """Convert a PDF to images then with OCR to data frame based on boxes (autodetected or not)"""
-        available_ocrs = [
-            'pyocr', 'pytesseract'
-        ]
+    def pdf_to_df(
+        self, keep_page_images=False, ocr=None, workers=None,
+        executor='process', dpi=350, batch_size=4, pages=None, preprocess=None, regions=False
+    ):
+        """Convert a PDF to images then with OCR to data frame based on boxes (autodetected or not)
+
+        Only the selected pages (all by default, see parse_pages) are rasterized and OCRed,
+        batch_size at a time and each page in memory as soon as it is ready.
+        With workers > 1 the pages are OCRed in parallel over a process (or thread) pool,
+        pages are still returned in order and a failing page is reported in self.ocr_errors.
+        preprocess is an OCRPreprocessor (or its quality, e.g. 'fast') run on each page before the OCR,
+        with dpi='auto' the DPI is measured on the first page to hit its target glyph height.
+        With regions=True each page is split in its text regions and only those are OCRed (see ocr_image_regions)
+        """
         ocr = 'pyocr' if ocr is None else ocr
-        if ocr not in available_ocrs:
-            error_print(f"This ocr {ocr} not available, only these ones {available_ocrs}")
-            return None
-        # convert to images
-        jpgs = self.pdf_to_jpgs()
-        if jpgs:
-            df = None
-            i = 1
-            for jpg in jpgs:
-                if ocr == 'pytesseract':
-                    page_df = self.pytesseract_image_to_df(jpg)
-                elif ocr == 'pyocr':
-                    page_df = self.pyocr_image_to_df(jpg)
-                else:
-                    page_df = self.pyocr_image_to_df(jpg)
-                page_df['page'] = i
-
-                if keep_page_images:
-                    self._image_auto_post_mark_regions(jpg, page_df, save_img=True)
-
-                # remove image
-                os.remove(jpg)
-                
-                # first df or not?
-                if df is None:
-                    df = page_df
-                else:
-                    df = df.append(page_df, ignore_index=True)
-                
-                i = i + 1
+        if ocr not in AVAILABLE_OCRS:
+            error_print(f"This ocr {ocr} not available, only these ones {AVAILABLE_OCRS}")
+            return None
 
-            return df
-        else:
+        self.ocr_errors = {}
+        page_dfs = []
+        num_pages = 0
+        for page_number, page_df, error in self.iter_pdf_to_dfs(
+            keep_page_images=keep_page_images, ocr=ocr, workers=workers,
+            executor=executor, dpi=dpi, batch_size=batch_size, pages=pages,
+            preprocess=preprocess, regions=regions
+        ):
+            num_pages = num_pages + 1
+            if error is not None:
+                error_print(f"OCR failed on page {page_number}: {error}")
+                self.ocr_errors[page_number] = error
+            else:
+                page_dfs.append(page_df)
+
+        if num_pages == 0:
             error_print("Could not convert this PDF pages to images for the OCR process")
             return None
+        if not page_dfs:
+            error_print("The OCR failed on every page of this PDF")
+            return None
+        return pd.concat(page_dfs, ignore_index=True)
 
-    # - PY OCR -
-    def pyocr_get_tools(self):
-        # all tools
-        tools = pyocr.get_available_tools()
-        if len(tools) == 0:
-            warning_print("No OCR tool found")
+    def iter_pdf_to_dfs(
+        self, keep_page_images=False, ocr=None, workers=None,
+        executor='process', dpi=350, batch_size=4, pages=None, preprocess=None, regions=False
+    ):
+        """Rasterize and OCR the PDF as a pipeline, yield (page_number, page_df, error) in page order
+
+        Rasterization of the next batch overlaps with the OCR of the current one,
+        so the first page is ready without waiting for the whole document
+        """
+        ocr = 'pyocr' if ocr is None else ocr
+        if ocr not in AVAILABLE_OCRS:
+            error_print(f"This ocr {ocr} not available, only these ones {AVAILABLE_OCRS}")
+            return
+        method_name = 'pytesseract_image_to_df' if ocr == 'pytesseract' else 'pyocr_image_to_df'
+        method_kwargs = {}
+        if regions:
+            method_name, method_kwargs = 'ocr_image_regions', {'ocr_method': method_name}
+        pool = self._ocr_pool(workers, executor)
+        if pool is False:
+            return
+        # keep at most 2 pages per worker in flight
+        max_in_flight = 1 if pool is None else 2 * to_int(workers)
+
+        page_numbers = self._page_numbers(pages)
+        if page_numbers is None:
+            if pool is not None:
+                pool.shutdown()
+            return
+        # page numbers of the OCR start from 1
+        selected_pages = sorted(set(page_number + 1 for page_number in page_numbers))
+        if isinstance(preprocess, str):
+            from .preprocess import OCRPreprocessor
+            preprocess = OCRPreprocessor(quality=preprocess)
+
+        # pages already in the OCR cache are not rasterized nor OCRed again, they are cached
+        # by page only (keyed by 'auto' with dpi='auto', the measured DPI follows from the page and preprocess)
+        cache_keys = {}
+        cached_dfs = {}
+        if self.ocr_cache is not None:
+            method_kwargs['cached'] = False
+            for page_number in selected_pages:
+                cache_keys[page_number] = self._pdf_page_ocr_cache_key(
+                    page_number, dpi, ocr, builder='df_regions' if regions else 'df', preprocess=preprocess
+                )
+                page_df = self.ocr_cache.get(cache_keys[page_number])
+                if page_df is not None:
+                    cached_dfs[page_number] = page_df
+        missing_pages = [page_number - 1 for page_number in selected_pages if page_number not in cached_dfs]
+        if dpi == 'auto':
+            # no probe page to rasterize when every page is cached
+            dpi = self.measure_ocr_dpi(preprocess, page_number=selected_pages[0] - 1) if missing_pages else DEFAULT_OCR_DPI
+        # the page images stay in memory, no JPG round trip to disk
+        images = self.iter_page_images(
+            dpi=dpi, batch_size=batch_size, pages=missing_pages,
+            grayscale=preprocess is not None and preprocess.grayscale
+        )
+
+        # process workers already hold a copy of this PDF (see _ocr_pool)
+        worker_pdf = None if isinstance(pool, ProcessPoolExecutor) else self
+        pending = deque()
+        completed = False
+        try:
+            for page_number in selected_pages:
+                image = None
+                cache_key = None
+                if page_number in cached_dfs:
+                    result = (cached_dfs[page_number], None)
+                else:
+                    _, image = next(images, (None, None))
+                    if image is None:
+                        error_print(f"Could not rasterize the page {page_number}")
+                        break
+                    cache_key = cache_keys.get(page_number)
+                    if pool is None:
+                        result = _ocr_image_worker(self, method_name, image, method_kwargs, preprocess)
+                    else:
+                        result = self._submit_ocr(pool, worker_pdf, method_name, image, method_kwargs, preprocess)
+                pending.append((page_number, image if keep_page_images else None, result, cache_key))
+                del image
+                # yield what is already done (in order)
+                while pending and (
+                    len(pending) > max_in_flight or pool is None
+                    or not isinstance(pending[0][2], Future) or pending[0][2].done()
+                ):
+                    yield self._ocr_page_result(*pending.popleft())
+            while pending:
+                yield self._ocr_page_result(*pending.popleft())
+            completed = True
+        finally:
+            images.close()
+            if pool is not None:
+                # stopped early (e.g. a batch timeout): do not wait for the pages still running
+                pool.shutdown(wait=completed, cancel_futures=True)
+
+    def _ocr_page_result(self, page_number, image, result, cache_key=None):
+        """Unpack one pipelined OCR page, set the page column, cache it and save the marked image if kept"""
+        if isinstance(result, Future):
+            result = self._ocr_future_result(result)
+        page_df, error = result
+        if error is None:
+            page_df['page'] = np.int32(page_number)
+            if cache_key is not None:
+                self.ocr_cache.set(cache_key, page_df)
+            if image is not None:
+                image_path = self._page_images_dir() + self._page_image_name(page_number)
+                self._image_auto_post_mark_regions(image_path, page_df, save_img=True, image=image)
+        return page_number, page_df, error
+
+    # - OCR Cache -
+    def _cached_ocr(self, image, engine, lang, builder, compute, cached=True):
+        """compute() the OCR result of an image, through the OCR cache if there is one (and cached)"""
+        if instrumentation.enabled:
+            untraced = compute
+
+            def compute():
+                with instrumentation.span('ocr', document=self.pdf_file_name, engine=engine, lang=str(lang), builder=builder):
+                    return untraced()
+        if self.ocr_cache is None or not cached:
+            return compute()
+        key = self.ocr_cache.key(image_digest(image), engine, str(lang), builder)
+        return self.ocr_cache.get_or_compute(key, compute)
+
+    def _pdf_page_ocr_cache_key(self, page_number, dpi, ocr, lang='eng', builder='df', preprocess=None):
+        """The OCR cache key of a page of this PDF (by the PDF content, not by its raster, and preprocessing if any)"""
+        pdf_digest = self._content_digest()
+        if preprocess is not None:
+            return self.ocr_cache.key(pdf_digest, page_number, dpi, ocr, str(lang), builder, preprocess.key())
+        return self.ocr_cache.key(pdf_digest, page_number, dpi, ocr, str(lang), builder)
+
+    def _content_digest(self):
+        """The digest of the PDF content (computed once)"""
+        if self._pdf_digest is None:
+            if self.pdf_file_path is None:
+                self._pdf_digest = buffer_digest(self._pdf_bytes())
+            else:
+                self._pdf_digest = file_digest(self.pdf_file_path)
+        return self._pdf_digest
+    # - OCR Cache -
+
+    # - Document Cache -
+    def _documents(self):
+        """The DocumentCache of this PDF, None if there is none"""
+        if self.document_cache is True:
+            return document_cache
+        if self.document_cache is False:
             return None
-        # The tools are returned in the recommended order of usage
-        return {f"{t.get_name()}": t for t in tools}
+        return self.document_cache
 
-    def pyocr_get_tool(self, tool_name):
-        # all tools
-        tools = self.pyocr_get_tools()
-        tool = None
-        if tools is not None:
-            for t in tools:
-                if t.get_name() == tool_name:
-                    tool = t
-                    break
+    def _document_key(self):
+        """The key of this PDF in its DocumentCache (computed once), None if not cached"""
+        if self._document_cache_key is False or self._documents() is None:
+            return None
+        if self._document_cache_key is None:
+            if self.pdf_file_path is None:
+                self._document_cache_key = DocumentCache.content_key(self._content_digest())
+            else:
+                self._document_cache_key = DocumentCache.path_key(self.pdf_file_path)
+        return self._document_cache_key
+
+    def _cached_page_text(self, page_number):
+        key = self._document_key()
+        if key is None:
+            return None
+        return self._documents().text(key, page_number)
+
+    def _cache_page_text(self, page_number, text):
+        # a lazy or streamed PDF keeps its memory bounded, only an eager one (holding every text anyway) fills the cache
+        if self.lazy:
+            return
+        key = self._document_key()
+        if key is not None:
+            self._documents().add(key, self.num_pages, {page_number: text})
+
+    def _invalidate_documents(self, file_path):
+        """Forget the cached parse of a PDF file just written"""
+        document_cache.invalidate(file_path)
+        documents = self._documents()
+        if documents is not None and documents is not document_cache:
+            documents.invalidate(file_path)
+    # - Document Cache -
+
+    def _ocr_pool(self, workers=None, executor='process'):
+        """The worker pool for the OCR, None to run in process, False if the arguments are not valid"""
+        if executor not in OCR_EXECUTORS:
+            error_print(f"This executor {executor} not available, only these ones {list(OCR_EXECUTORS)}")
+            return False
+        workers = 1 if workers is None else to_int(workers)
+        if workers is None or workers < 1:
+            error_print("The number of workers must be an integer greater than 0")
+            return False
+        if workers == 1:
+            return None
+        if executor == 'process':
+            # send this PDF once per worker process instead of once per image
+            pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_ocr_worker, initargs=(self,)
+            )
+            # start the workers now, before the threads of the pipeline (e.g. the rasterizer of iter_page_images):
+            # forking a process while other threads run can deadlock it
+            pool.submit(int)
+            return pool
+        return OCR_EXECUTORS[executor](max_workers=workers)
+
+    def ocr_images(self, images, method_name='pyocr_image_to_df', workers=None, executor='process', **kwargs):
+        """Run an OCR image method on many images, in parallel when workers > 1
+
+        Return a list of (result, error) in the same order of the images
+        """
+        if method_name not in OCR_IMAGE_METHODS:
+            error_print(f"This OCR method {method_name} not available, only these ones {OCR_IMAGE_METHODS}")
+            return None
+        images = list(images)
+        pool = self._ocr_pool(workers, executor)
+        if pool is False:
+            return None
 
-        return tool
+        if pool is None:
+            return [_ocr_image_worker(self, method_name, image, kwargs) for image in images]
+
+        # process workers already hold a copy of this PDF (see _ocr_pool)
+        worker_pdf = None if isinstance(pool, ProcessPoolExecutor) else self
+        results = []
+        with pool:
+            futures = [
+                self._submit_ocr(pool, worker_pdf, method_name, image, kwargs)
+                for image in images
+            ]
+            for future in futures:
+                results.append(self._ocr_future_result(future))
+        return results
+
+    def _submit_ocr(self, pool, worker_pdf, method_name, image, kwargs, preprocess=None):
+        """Submit one OCR image method to a pool, process workers send back their spans too"""
+        if isinstance(pool, ProcessPoolExecutor):
+            future = pool.submit(
+                traced_call, instrumentation.enabled, _ocr_image_worker, worker_pdf, method_name, image, kwargs, preprocess
+            )
+            future.traced = True
+            return future
+        return pool.submit(_ocr_image_worker, worker_pdf, method_name, image, kwargs, preprocess)
+
+    def _ocr_future_result(self, future):
+        """The (result, error) of a submitted OCR, the spans of a process worker go to the hooks here"""
+        try:
+            result = future.result()
+        except Exception as e:
+            # e.g. a worker process died
+            return None, f"{type(e).__name__}: {e}"
+        if getattr(future, 'traced', False):
+            result, spans = result
+            for span in spans:
+                instrumentation.emit(span)
+        return result
+
+    # - Regions -
+    def detect_image_regions(self, image_path):
+        """The text regions of a page image (a path, a PIL image or an array), see layout.detect_regions"""
+        image = self._ocr_input_image(image_path, pil=False)
+        return None if image is None else layout.detect_regions(image)
+
+    def ocr_image_regions(self, image_path, ocr_method='pyocr_image_to_df', regions=None, workers=None, executor='thread', **kwargs):
+        """OCR only the text regions of a page image (detected if not given), return one data frame
+
+        The regions are OCRed in parallel with workers > 1, the coordinates are on the page
+        image and the region column is the index of the region of each row
+        """
+        if ocr_method not in OCR_DF_METHODS:
+            error_print(f"This OCR method {ocr_method} not available, only these ones {OCR_DF_METHODS}")
+            return None
+        image = self._ocr_input_image(image_path)
+        if image is None:
+            return None
+        regions = layout.detect_regions(image) if regions is None else regions
+        width, height = image.size
+        boxes = [region.to_pixels(width, height) for region in regions]
+        results = self.ocr_images(
+            [image.crop(box) for box in boxes], method_name=ocr_method,
+            workers=workers, executor=executor, **kwargs
+        )
+        region_dfs = []
+        for region, (box, (region_df, error)) in enumerate(zip(boxes, results)):
+            if error is not None:
+                error_print(f"OCR failed on the region {region} {box}: {error}")
+                return None
+            region_df = restore_ocr_df_coordinates(region_df, offset=box[:2])
+            region_df['region'] = np.int32(region)
+            region_dfs.append(region_df)
+        if not region_dfs:
+            # no text on this page
+            return pd.DataFrame({'region': pd.Series([], dtype='int32')})
+        return pd.concat(region_dfs, ignore_index=True)
+    # - Regions -
+
+    # - Images -
+    def _ocr_input_image(self, image, pil=True):
+        """The image to OCR from a path, a PIL image or a NumPy (OpenCV BGR) array
+
+        In memory images are used as they are (arrays are converted only for PIL based tools),
+        paths are read with PIL (or OpenCV with pil=False), None if the path does not exist
+        """
+        if isinstance(image, Image.Image):
+            return image
+        if isinstance(image, np.ndarray):
+            return raster.cv2_to_pil(image) if pil else image
+        image_path = str(image)
+        if not filepath_exists(image_path):
+            error_print(f"The image file path {image_path} does not exist, please check again...")
+            return None
+        return Image.open(image_path) if pil else cv2.imread(image_path)
+    # - Images -
+
+    # - PY OCR -
+    def pyocr_get_tools(self, refresh=False):
+        """All the tools by name, discovered once per process by the OCR registry (unless refresh)"""
+        if refresh:
+            ocr_registry.refresh()
+        return ocr_registry.tools()
+
+    def pyocr_get_tool(self, tool_name):
+        return ocr_registry.tool(tool_name)
 
     def pyocr_get_tools_name(self):
-        # all tools
+        # all tools
         tools = self.pyocr_get_tools()
-        if len(tools) == 0:
-            warning_print("No OCR tool found")
+        if tools is None:
             return None
-        return [*map(lambda x: x.get_name(), tools)]
+        return list(tools)
     
     def pyocr_get_tool_name(self, tool):
         # tool name
         return None if tool is None else tool.get_name()
 
     def pyocr_get_tool_languages(self, pyocr_tool):
-        return pyocr_tool.get_available_languages()
+        return ocr_registry.languages(pyocr_tool)
 
     def pyocr_get_tool_language(self, tool, lang, default_eng=True):
         """Check if lang selected is available in the tool, if not default is english if default is applied"""
@@ -435,134 +1709,108 @@ class PDF(object):
     
     def pyocr_image_to_text(self, image_path, tool=None, lang=None, broken_path_return_empty_txt=False):
         if tool is None:
-            tool = self.pyocr_get_tools()["Tesseract (sh)"]
+            tool = ocr_registry.default_tool()
         if lang is None:
             lang = 'eng'
 
-        image_path = str(image_path)
-        if not filepath_exists(image_path):
-            error_print(f"The image file path {image_path} does not exist, please check again...")
+        image = self._ocr_input_image(image_path)
+        if image is None:
             if broken_path_return_empty_txt:
                 return ""
             return None
 
-        txt = tool.image_to_string(
-            Image.open(image_path),
-            lang=str(lang),
-            builder=pyocr.builders.TextBuilder()
+        txt = self._cached_ocr(
+            image_path, self.pyocr_get_tool_name(tool), lang, 'text',
+            lambda: tool.image_to_string(
+                image,
+                lang=str(lang),
+                builder=pyocr.builders.TextBuilder()
+            )
         )
         return txt
 
-    def pyocr_image_to_df(self, image_path, tool=None, lang=None, broken_path_return_empty_txt=False):
+    def pyocr_image_to_df(self, image_path, tool=None, lang=None, broken_path_return_empty_txt=False, cached=True):
         if tool is None:
-            tool = self.pyocr_get_tools()["Tesseract (sh)"]
+            tool = ocr_registry.default_tool()
         if lang is None:
             lang = 'eng'
 
-        image_path = str(image_path)
-        if not filepath_exists(image_path):
-            error_print(f"The image file path {image_path} does not exist, please check again...")
+        image = self._ocr_input_image(image_path)
+        if image is None:
             if broken_path_return_empty_txt:
                 return ""
             return None
 
-        line_word_list = self.pyocr_image_to_line_and_boxes(
-            image_path, tool=tool, lang=lang,
-            broken_path_return_empty_txt=broken_path_return_empty_txt
-        )
-
-        # pass to a df
-        df = pd.DataFrame(
-            columns=[
-                "line_uuid", "line_position", "line_content",
-                "word_box_position", "word_box_content",
-                "word_box_confidence"
-            ]
-        )
-        for line in line_word_list:
-            line_uuid = str(uuid.uuid4())
-            line_position = line.get('position')
-            line_content = line.get('content') 
-            line_boxes = line.get('word_boxes')
-            if line_boxes is None:
-                df = df.append({
-                        "line_uuid": line_uuid,
-                        "line_position": line_position,
-                        "line_content": line_content,
-                        "word_box_position": None,
-                        "word_box_content": None,
-                        "word_box_confidence": None
-                    }, ignore_index=True
-                )
-            else:
-                for box in line_boxes:
-                    df = df.append({
-                            "line_uuid": line_uuid,
-                            "line_position": line_position,
-                            "line_content": line_content,
-                            "word_box_position": box.get('position'),
-                            "word_box_content": box.get('content'),
-                            "word_box_confidence": box.get('confidence')
-                        }, ignore_index=True
-                    )
-
-        return df
+        # built from the compact records, the line_id is the index of the line in the page
+        ocr_page = self.pyocr_image_to_records(image, tool=tool, lang=lang, cached=cached)
+        with instrumentation.span('ocr_df', document=self.pdf_file_name, lines=len(ocr_page.lines)):
+            return ocr_page.to_df()
 
     def pyocr_image_to_boxes(self, image_path, tool=None, lang=None, broken_path_return_empty_txt=False):
+        """The word boxes of an image as dicts, from pyocr_image_to_records (use it directly for the compact form)"""
         if tool is None:
-            tool = self.pyocr_get_tools()["Tesseract (sh)"]
+            tool = ocr_registry.default_tool()
         if lang is None:
             lang = 'eng'
 
-        image_path = str(image_path)
-        if not filepath_exists(image_path):
-            error_print(f"The image file path {image_path} does not exist, please check again...")
+        image = self._ocr_input_image(image_path)
+        if image is None:
             if broken_path_return_empty_txt:
                 return ""
             return None
 
-        word_boxes = tool.image_to_string(
-            Image.open(image_path),
-            lang=str(lang),
-            builder=pyocr.builders.WordBoxBuilder()
-        )
-        return [{"position": box.position, "content": box.content, "confidence": box.confidence} for box in word_boxes]
+        return self.pyocr_image_to_records(image, tool=tool, lang=lang).to_word_boxes()
     
     def pyocr_image_to_line_and_boxes(self, image_path, tool=None, lang=None, broken_path_return_empty_txt=False):
+        """The lines and their word boxes of an image as dicts, from pyocr_image_to_records (use it directly for the compact form)"""
         if tool is None:
-            tool = self.pyocr_get_tools()["Tesseract (sh)"]
+            tool = ocr_registry.default_tool()
         if lang is None:
             lang = 'eng'
 
-        image_path = str(image_path)
-        if not filepath_exists(image_path):
-            error_print(f"The image file path {image_path} does not exist, please check again...")
+        image = self._ocr_input_image(image_path)
+        if image is None:
             if broken_path_return_empty_txt:
                 return ""
             return None
 
-        line_and_word_boxes = tool.image_to_string(
-            Image.open(image_path),
-            lang=str(lang),
-            builder=pyocr.builders.LineBoxBuilder()
+        return self.pyocr_image_to_records(image, tool=tool, lang=lang).to_line_boxes()
+
+    def pyocr_image_to_records(self, image_path, tool=None, lang=None, page=None, broken_path_return_empty_txt=False, cached=True):
+        """The OCR of an image as a compact OCRPage (arrays and integer line ids, see records)
+
+        pyocr_image_to_df, pyocr_image_to_boxes and pyocr_image_to_line_and_boxes are built from it,
+        OCRPage.to_df() builds the data frame only when needed. cached=False skips the OCR cache
+        """
+        if tool is None:
+            tool = ocr_registry.default_tool()
+        if lang is None:
+            lang = 'eng'
+
+        image = self._ocr_input_image(image_path)
+        if image is None:
+            if broken_path_return_empty_txt:
+                return records.OCRPage.from_line_boxes([], page=page)
+            return None
+
+        ocr_page = self._cached_ocr(
+            image_path, self.pyocr_get_tool_name(tool), lang, 'records',
+            lambda: records.OCRPage.from_line_boxes(
+                tool.image_to_string(image, lang=str(lang), builder=pyocr.builders.LineBoxBuilder())
+            ),
+            cached=cached
         )
-        return [
-            {
-                "position": line.position,
-                "content": line.content,
-                "word_boxes": [{"position": box.position, "content": box.content, "confidence": box.confidence} for box in line.word_boxes]
-            } for line in line_and_word_boxes
-        ]
+        # the cached page is shared, the page number goes on a new (array sharing) record
+        return records.OCRPage(ocr_page.lines, ocr_page.words, page=page)
 
     def pyocr_image_to_digits(self, image_path, tool=None, lang=None, broken_path_return_empty_txt=False):
         if tool is None:
-            tool = self.pyocr_get_tools()["Tesseract (sh)"]
+            tool = ocr_registry.default_tool()
         if lang is None:
             lang = 'eng'
 
-        image_path = str(image_path)
-        if not filepath_exists(image_path):
-            error_print(f"The image file path {image_path} does not exist, please check again...")
+        image = self._ocr_input_image(image_path)
+        if image is None:
             if broken_path_return_empty_txt:
                 return ""
             return None
@@ -573,68 +1821,162 @@ class PDF(object):
                 return ""
             return None
 
-        digits = tool.image_to_string(
-            Image.open(image_path),
-            lang=str(lang),
-            builder=pyocr.tesseract.DigitBuilder()
-        )
+        with instrumentation.span('ocr', document=self.pdf_file_name, engine=self.pyocr_get_tool_name(tool), lang=str(lang), builder='digits'):
+            digits = tool.image_to_string(
+                image,
+                lang=str(lang),
+                builder=pyocr.tesseract.DigitBuilder()
+            )
 
         return digits
     # - PY OCR -
 
     # - PyTesseract -
-    def pytesseract_image_to_df(self, image_path, lang=None, broken_path_return_empty_txt=False):
+    def pytesseract_image_to_df(self, image_path, lang=None, broken_path_return_empty_txt=False, cached=True):
         if lang is None:
             lang = 'eng'
 
-        if not filepath_exists(str(image_path)):
-            error_print(f"The image file path {str(image_path)} does not exist, please check again...")
+        im = self._ocr_input_image(image_path, pil=False)
+        if im is None:
             if broken_path_return_empty_txt:
                 return ""
             return None
-        im = cv2.imread(str(image_path))
 
-        df = pt.image_to_data(im, lang=lang, nice=0, output_type='data.frame')
+        df = self._cached_ocr(
+            image_path, 'pytesseract', lang, 'data.frame',
+            lambda: pt.image_to_data(im, lang=lang, nice=0, output_type='data.frame'),
+            cached=cached
+        )
 
         return df        
     # - PyTesseract -
 
-    def pdf_to_jpgs(self, where=None, dpi=350, return_raw=False):
-        """Convert each PDF page to a JPG image"""
-        pages = convert_from_path(self.pdf_file_path, dpi=dpi)
-        if where is None:
-            where = self.pdf_file_path.replace('.pdf', '').replace(self.pdf_file_name, '')
-        where = correct_filepath(where)
-        if not pages:
-            return []
+    def pdf_to_jpgs(self, where=None, dpi=350, return_raw=False, batch_size=None, pages=None):
+        """Convert each PDF page (or only the selected pages, see parse_pages) to a JPG image
+
+        With a batch_size the pages are rasterized and saved batch_size at a time
+        """
+        if pages is None and (return_raw or batch_size is None):
+            pages_images = enumerate(self._convert_pages(dpi=dpi), start=1)
+        else:
+            page_numbers = self._page_numbers(pages)
+            if page_numbers is None:
+                return []
+            pages_images = self.iter_page_images(
+                dpi=dpi, batch_size=4 if batch_size is None else batch_size, pages=page_numbers
+            )
+        where = self._page_images_dir(where)
 
         if return_raw:
-            return pages
+            return [page for _, page in pages_images]
 
-        i = 1
         paths = []
-        for page in pages:
-            image_name = f"{self.pdf_file_name}_page_" + str(i) + ".jpg"
+        for page_number, page in pages_images:
+            image_name = self._page_image_name(page_number)
             page.save(where + image_name, "JPEG")
-            i = i + 1
             paths.append(where + image_name)
         
         return paths
 
-    def _image_auto_post_mark_regions(self, image_path, page_df, save_img=False):
-        # load image
-        im = cv2.imread(image_path)
+    def iter_page_images(self, dpi=350, batch_size=4, first_page=None, last_page=None, pages=None, grayscale=False):
+        """Rasterize the PDF batch_size pages at a time, yield (page_number, image) (page_number starts from 1)
+
+        Only the pages from first_page to last_page (starting from 1), or the selected pages
+        (see parse_pages) are rasterized. The next batch is rasterized in a background thread
+        while the current one is consumed, so only about two batches of images are in memory at once.
+        With grayscale=True poppler renders the pages directly in gray (a third of the memory)
+        """
+        batch_size = to_int(batch_size)
+        if batch_size is None or batch_size < 1:
+            error_print("The batch size must be an integer greater than 0")
+            return
+        if pages is not None:
+            page_numbers = self._page_numbers(pages)
+            if page_numbers is None:
+                return
+            selected = sorted(set(page_number + 1 for page_number in page_numbers))
+        else:
+            first_page = 1 if first_page is None else max(first_page, 1)
+            last_page = self.num_pages if last_page is None else min(last_page, self.num_pages)
+            selected = range(first_page, last_page + 1)
+        # batches of consecutive pages, one rasterize call each
+        batches = []
+        for page_number in selected:
+            if batches and page_number == batches[-1][1] + 1 and page_number - batches[-1][0] < batch_size:
+                batches[-1][1] = page_number
+            else:
+                batches.append([page_number, page_number])
+        if not batches:
+            return
 
-        box_positions = list(page_df['word_box_position'].values)
-        line_items_coordinates = []
-        for box in box_positions:
-            #area = cv2.contourArea(c)
-            #x, y, w, h = cv2.boundingRect(c)
-            x, y = box[0]
-            w, h = box[1]
+        rasterize = functools.partial(self._rasterize_pages, grayscale=True) if grayscale else self._rasterize_pages
+        with ThreadPoolExecutor(max_workers=1) as rasterizer:
+            next_images = rasterizer.submit(rasterize, *batches[0], dpi)
+            for i, (start, _) in enumerate(batches):
+                images = next_images.result()
+                if i + 1 < len(batches):
+                    next_images = rasterizer.submit(rasterize, *batches[i + 1], dpi)
+                for page_number, image in enumerate(images, start=start):
+                    yield page_number, image
+                del images
+
+    def _rasterize_pages(self, first_page, last_page, dpi=350, grayscale=False):
+        """Rasterize the pages from first_page to last_page (both included, starting from 1)"""
+        return self._convert_pages(dpi=dpi, first_page=first_page, last_page=last_page, grayscale=grayscale)
+
+    def _convert_pages(self, dpi=350, first_page=None, last_page=None, grayscale=False):
+        """pdf2image on the PDF path, or on the in memory content (passed as a buffer, not copied)"""
+        with instrumentation.span(
+            'rasterize', document=self.pdf_file_name, engine='poppler',
+            dpi=dpi, first_page=first_page, last_page=last_page
+        ):
+            return raster.rasterize(
+                self.pdf_file_path, self._pdf_bytes(), dpi=dpi,
+                first_page=first_page, last_page=last_page, grayscale=grayscale
+            )
+
+    def measure_ocr_dpi(self, preprocess=None, page_number=0, probe_dpi=150):
+        """The DPI that rasterizes the text at the target glyph height of preprocess (an OCRPreprocessor)
+
+        The glyph height is measured on one page (0-based) rasterized at the cheap probe_dpi
+        """
+        if preprocess is None:
+            from .preprocess import OCRPreprocessor
+            preprocess = OCRPreprocessor()
+        images = self._rasterize_pages(page_number + 1, page_number + 1, probe_dpi)
+        glyph_height = preprocess.measure(images[0]).glyph_height if images else None
+        if glyph_height is None:
+            return DEFAULT_OCR_DPI
+        return preprocess.dpi_for(glyph_height, probe_dpi)
+
+    def _page_images_dir(self, where=None):
+        """The folder for the page images, the PDF one by default (the working one for an in memory PDF)"""
+        if where is None:
+            if self.pdf_file_path is None:
+                where = os.getcwd()
+            else:
+                where = self.pdf_file_path.replace('.pdf', '').replace(self.pdf_file_name, '')
+        return correct_filepath(where)
 
-            image = cv2.rectangle(im, (x, y), (2200, y + h), color=(255, 0, 255), thickness=3)
-            line_items_coordinates.append([(x, y), (2200, y + h)])
+    def _page_image_name(self, page_number):
+        return f"{self.pdf_file_name}_page_" + str(page_number) + ".jpg"
+
+    def _image_auto_post_mark_regions(self, image_path, page_df, save_img=False, image=None):
+        # load image (if not already in memory)
+        im = cv2.imread(image_path) if image is None else raster.pil_to_cv2(image)
+        image = im
+
+        if 'word_box_x0' in page_df.columns:
+            boxes = page_df[['word_box_x0', 'word_box_y0', 'word_box_y1']].dropna()
+        else:
+            # pytesseract data frame
+            boxes = page_df[['left', 'top']].assign(bottom=page_df['top'] + page_df['height']).dropna()
+        right = int(layout.LINE_ITEMS_RIGHT_EDGE * im.shape[1])
+        line_items_coordinates = []
+        for x, y, y1 in boxes.itertuples(index=False):
+            x, y, y1 = int(x), int(y), int(y1)
+            image = cv2.rectangle(im, (x, y), (right, y1), color=(255, 0, 255), thickness=3)
+            line_items_coordinates.append([(x, y), (right, y1)])
 
         if save_img:
             image_name = ntpath.basename(image_path)
@@ -645,41 +1987,19 @@ class PDF(object):
         return image, line_items_coordinates
 
     def _image_auto_pre_mark_regions(self, image_path, save_img=False):
-        """Pre Auto Mark Boxes/Region for an image"""
+        """Pre Auto Mark Boxes/Region for an image (the line items regions, at any resolution)"""
         # from https://towardsdatascience.com/extracting-text-from-scanned-pdf-using-pytesseract-open-cv-cd670ee38052
         # load image
         im = cv2.imread(image_path)
-
-        gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (9, 9), 0)
-        thresh = cv2.adaptiveThreshold(
-            blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV, 11, 30
-        )
-
-        # Dilate to combine adjacent text contours
-        kernel = cv2.getStructuringElement(
-            cv2.MORPH_RECT, (9, 9)
-        )
-        dilate = cv2.dilate(thresh, kernel, iterations=4)
-
-        # Find contours, highlight text areas, and extract ROIs
-        cnts = cv2.findContours(dilate, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        cnts = cnts[0] if len(cnts) == 2 else cnts[1]
+        image = im
+        height, width = im.shape[:2]
+        right = int(layout.LINE_ITEMS_RIGHT_EDGE * width)
 
         line_items_coordinates = []
-        for c in cnts:
-            area = cv2.contourArea(c)
-            x, y, w, h = cv2.boundingRect(c)
-
-            if y >= 600 and x <= 1000:
-                if area > 10000:
-                    image = cv2.rectangle(im, (x, y), (2200, y + h), color=(255, 0, 255), thickness=3)
-                    line_items_coordinates.append([(x, y), (2200, y + h)])
-
-            if y >= 2400 and x <= 2000:
-                image = cv2.rectangle(im, (x, y), (2200, y + h), color=(255, 0, 255), thickness=3)
-                line_items_coordinates.append([(x, y), (2200, y + h)])
+        for region in layout.line_items_regions(layout.detect_regions(im)):
+            x, y, _, y1 = region.to_pixels(width, height)
+            image = cv2.rectangle(im, (x, y), (right, y1), color=(255, 0, 255), thickness=3)
+            line_items_coordinates.append([(x, y), (right, y1)])
 
         if save_img:
             image_name = ntpath.basename(image_path)
@@ -690,9 +2010,8 @@ class PDF(object):
         return image, line_items_coordinates
     
     def _save_image_from_array(self, image, image_path):
-        # save from array
-        img = Image.fromarray(image, 'RGB')
-        img.save(image_path)
+        # save from an OpenCV array (BGR, or gray for the preprocessed pages)
+        raster.cv2_to_pil(image).save(image_path)
         return image_path
     # - - - - - OCR - - - - -
 # + + + + + PDF + + + + +
@@ -0,0 +1,220 @@
+#
+# Preprocess
+# ----------
+# This script contains the
+# class OCRPreprocessor
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+from collections import namedtuple
+import cv2
+import numpy as np
+from PIL import Image
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# in the order they are applied ('grayscale' rasterizes the pages directly in gray)
+PREPROCESS_STAGES = ['grayscale', 'crop', 'deskew', 'rescale', 'binarize']
+# the glyph height (in pixels) the pages are rescaled to, the higher the slower and more accurate
+OCR_QUALITY_GLYPH_HEIGHTS = {
+    'fast': 16,
+    'balanced': 24,
+    'accurate': 32
+}
+# skews under this angle (degrees) are left alone, over the max they are not skews
+MIN_SKEW_ANGLE = 0.3
+MAX_SKEW_ANGLE = 15
+# glyph heights within this ratio of the target are not rescaled
+RESCALE_TOLERANCE = 0.15
+MAX_UPSCALE = 2.0
+MIN_OCR_DPI = 72
+MAX_OCR_DPI = 600
+# what was measured on a page, glyph_height and skew_angle are None on a blank page
+PageMeasures = namedtuple('PageMeasures', ['ink_ratio', 'glyph_height', 'skew_angle', 'text_box'])
+# the preprocessed image, matrix is the 2x3 affine transform of the page image to it (crop, deskew, rescale),
+# OCR coordinates map back to the page with its inverse (see restore_ocr_df_coordinates),
+# scale and offset are its rescale and crop parts
+PreprocessResult = namedtuple('PreprocessResult', ['image', 'scale', 'offset', 'measures', 'matrix'])
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def to_gray(image):
+    """A PIL image or an OpenCV (BGR) array to a gray uint8 array"""
+    if isinstance(image, Image.Image):
+        return np.asarray(image if image.mode == 'L' else image.convert('L'))
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def ink_mask(gray):
+    """The dark (text) pixels of a gray image as 255, by Otsu threshold"""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return mask
+
+
+def binarize(gray):
+    """Black text on white, by Otsu threshold"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def measure_page(gray):
+    """Measure the ink, the median glyph height, the skew and the text box of a gray page"""
+    height, width = gray.shape[:2]
+    mask = ink_mask(gray)
+    ink_ratio = np.count_nonzero(mask) / mask.size
+    if ink_ratio == 0 or ink_ratio > 0.5:
+        # blank (or a photo, nothing to measure as text)
+        return PageMeasures(ink_ratio, None, None, (0, 0, width, height))
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    # glyph like components, no specks nor rules or pictures
+    glyphs = stats[(stats[:, cv2.CC_STAT_AREA] >= 4) & (heights >= 3) & (heights < height / 10)]
+    if len(glyphs) == 0:
+        return PageMeasures(ink_ratio, None, None, (0, 0, width, height))
+    glyph_height = float(np.median(glyphs[:, cv2.CC_STAT_HEIGHT]))
+    text_box = (
+        int(glyphs[:, cv2.CC_STAT_LEFT].min()),
+        int(glyphs[:, cv2.CC_STAT_TOP].min()),
+        int((glyphs[:, cv2.CC_STAT_LEFT] + glyphs[:, cv2.CC_STAT_WIDTH]).max()),
+        int((glyphs[:, cv2.CC_STAT_TOP] + glyphs[:, cv2.CC_STAT_HEIGHT]).max())
+    )
+    return PageMeasures(ink_ratio, glyph_height, _skew_angle(mask, glyph_height), text_box)
+
+
+def _skew_angle(mask, glyph_height):
+    """The median angle (degrees, counterclockwise) of the text lines, None if there are none"""
+    # smear the words into lines
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(int(glyph_height * 2), 3), 1))
+    lines = cv2.dilate(mask, kernel)
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    angles = []
+    for contour in contours:
+        (_, _), (w, h), angle = cv2.minAreaRect(contour)
+        if w < h:
+            w, h, angle = h, w, angle - 90
+        # long and thin, a text line
+        if w < 5 * h or w < glyph_height * 8:
+            continue
+        # the range of the angles depends on the OpenCV version
+        while angle > 45:
+            angle = angle - 90
+        while angle <= -45:
+            angle = angle + 90
+        angles.append(-angle)
+    if not angles:
+        return None
+    return float(np.median(angles))
+
+
+def rotation_matrix(gray, angle):
+    """The 2x3 affine transform rotating a gray image counterclockwise by angle degrees around its center"""
+    height, width = gray.shape[:2]
+    return cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+
+
+def rotate(gray, angle):
+    """Rotate a gray image counterclockwise by angle degrees around its center, on a white background"""
+    height, width = gray.shape[:2]
+    return cv2.warpAffine(gray, rotation_matrix(gray, angle), (width, height), flags=cv2.INTER_LINEAR, borderValue=255)
+
+
+def _then(matrix, step):
+    """The 2x3 affine transform of matrix followed by step"""
+    return np.vstack([step, [0, 0, 1]]).dot(np.vstack([matrix, [0, 0, 1]]))[:2]
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + OCR Preprocessor + + + + +
+class OCRPreprocessor(object):
+    def __init__(self, stages=None, quality='balanced', target_glyph_height=None):
+        """A pipeline of image stages run before the OCR, smaller and cleaner pages OCR faster
+
+        stages are some of PREPROCESS_STAGES (all by default), each page is measured first and
+        only gets the stages it needs (a straight page is not deskewed, a page already at the
+        target glyph height is not rescaled). quality ('fast', 'balanced', 'accurate') or
+        target_glyph_height in pixels is the knob between throughput and accuracy
+        """
+        stages = PREPROCESS_STAGES if stages is None else list(stages)
+        unknown = [stage for stage in stages if stage not in PREPROCESS_STAGES]
+        if unknown:
+            raise ValueError(f"These stages {unknown} not available, only these ones {PREPROCESS_STAGES}")
+        if target_glyph_height is None:
+            if quality not in OCR_QUALITY_GLYPH_HEIGHTS:
+                raise ValueError(f"This quality {quality} not available, only these ones {list(OCR_QUALITY_GLYPH_HEIGHTS)}")
+            target_glyph_height = OCR_QUALITY_GLYPH_HEIGHTS[quality]
+        self.stages = [stage for stage in PREPROCESS_STAGES if stage in stages]
+        self.target_glyph_height = target_glyph_height
+
+    def __repr__(self):
+        return "<OCR Preprocessor %s glyph height %s >" % (self.stages, self.target_glyph_height)
+
+    def key(self):
+        """What identifies the output of this pipeline (e.g. in an OCR cache key)"""
+        return f"{'+'.join(self.stages)}@{self.target_glyph_height}"
+
+    @property
+    def grayscale(self):
+        """True if the pages can be rasterized directly in gray"""
+        return 'grayscale' in self.stages
+
+    def measure(self, image):
+        return measure_page(to_gray(image))
+
+    def dpi_for(self, glyph_height, dpi):
+        """The DPI that gives the target glyph height, from a glyph height measured at dpi"""
+        if not glyph_height:
+            return dpi
+        return int(min(max(dpi * self.target_glyph_height / glyph_height, MIN_OCR_DPI), MAX_OCR_DPI))
+
+    def __call__(self, image):
+        """Run the stages a page needs, return a PreprocessResult"""
+        gray = to_gray(image)
+        measures = measure_page(gray)
+        scale, offset = 1.0, (0, 0)
+        matrix = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+        if measures.glyph_height is None:
+            # nothing that looks like text, leave it as it is
+            return PreprocessResult(image if isinstance(image, Image.Image) else Image.fromarray(gray), scale, offset, measures, matrix)
+
+        if 'crop' in self.stages:
+            margin = int(measures.glyph_height * 2)
+            x0, y0, x1, y1 = measures.text_box
+            x0, y0 = max(x0 - margin, 0), max(y0 - margin, 0)
+            x1, y1 = min(x1 + margin, gray.shape[1]), min(y1 + margin, gray.shape[0])
+            gray = gray[y0:y1, x0:x1]
+            offset = (x0, y0)
+            matrix = _then(matrix, [[1, 0, -x0], [0, 1, -y0]])
+        if 'deskew' in self.stages and measures.skew_angle is not None and MIN_SKEW_ANGLE <= abs(measures.skew_angle) <= MAX_SKEW_ANGLE:
+            matrix = _then(matrix, rotation_matrix(gray, -measures.skew_angle))
+            gray = rotate(gray, -measures.skew_angle)
+        if 'rescale' in self.stages:
+            ratio = min(self.target_glyph_height / measures.glyph_height, MAX_UPSCALE)
+            if abs(ratio - 1) > RESCALE_TOLERANCE:
+                gray = cv2.resize(
+                    gray, None, fx=ratio, fy=ratio,
+                    interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_CUBIC
+                )
+                scale = ratio
+                matrix = _then(matrix, [[ratio, 0, 0], [0, ratio, 0]])
+        if 'binarize' in self.stages:
+            gray = binarize(gray)
+        return PreprocessResult(Image.fromarray(np.ascontiguousarray(gray)), scale, offset, measures, matrix)
+# + + + + + OCR Preprocessor + + + + +
+# + + + + + Classes + + + + +
@@ -0,0 +1,67 @@
+#
+# Raster
+# ------
+# This script contains the
+# rasterization of the PDF pages and the image conversions
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+from pdf2image import (
+    convert_from_bytes,
+    convert_from_path
+)
+import cv2
+import numpy as np
+from PIL import Image
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Functions + + + + +
+def pil_to_cv2(image):
+    """PIL image to a writable OpenCV (BGR, or gray for gray images) array
+
+    The array PIL exposes is read only, so a gray image is copied once (np.array)
+    and a color one only by the RGB to BGR swap
+    """
+    if image.mode == 'RGB':
+        return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+    if image.mode == 'RGBA':
+        return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGBA2BGRA)
+    if image.mode != 'L':
+        image = image.convert('L')
+    # the callers draw on it (e.g. the marked page images)
+    return np.array(image)
+
+
+def cv2_to_pil(array):
+    """OpenCV (BGR or gray) array to a PIL image, sharing the array memory when no channel swap is needed"""
+    if array.ndim == 3 and array.shape[2] == 3:
+        array = cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+        mode = 'RGB'
+    elif array.ndim == 3 and array.shape[2] == 4:
+        array = cv2.cvtColor(array, cv2.COLOR_BGRA2RGBA)
+        mode = 'RGBA'
+    else:
+        array = array.reshape(array.shape[:2])
+        mode = 'L'
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    height, width = array.shape[:2]
+    return Image.frombuffer(mode, (width, height), array, 'raw', mode, 0, 1)
+
+
+def rasterize(pdf_file_path=None, pdf_bytes=None, dpi=350, first_page=None, last_page=None, grayscale=False):
+    """The PIL images of the pages (from 1) first_page to last_page of a PDF path or in memory content, by poppler"""
+    if pdf_file_path is None:
+        return convert_from_bytes(pdf_bytes, dpi=dpi, first_page=first_page, last_page=last_page, grayscale=grayscale)
+    return convert_from_path(pdf_file_path, dpi=dpi, first_page=first_page, last_page=last_page, grayscale=grayscale)
+# + + + + + Functions + + + + +
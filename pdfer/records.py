@@ -0,0 +1,211 @@
+#
+# Records
+# -------
+# This script contains the
+# class OCRPage and its array backed lines and word boxes
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# a missing confidence (pyocr gives none for some engines)
+NO_CONFIDENCE = -1
+# one line or one word box read back from the arrays, line_id is the index of its line in the page
+Line = namedtuple('Line', ['line_id', 'x0', 'y0', 'x1', 'y1', 'content'])
+WordBox = namedtuple('WordBox', ['line_id', 'x0', 'y0', 'x1', 'y1', 'confidence', 'content'])
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def _field(item, name):
+    """An attribute of a pyocr box or a key of its dict form (see PDF.pyocr_image_to_line_and_boxes)"""
+    return item.get(name) if isinstance(item, dict) else getattr(item, name)
+
+
+def _box_dict(word):
+    """A WordBox in the dict form of PDF.pyocr_image_to_boxes"""
+    return {"position": ((word.x0, word.y0), (word.x1, word.y1)), "content": word.content, "confidence": word.confidence}
+
+
+def _boxes_array(positions):
+    """((x0, y0), (x1, y1)) positions to an int32 (n, 4) array"""
+    if not positions:
+        return np.empty((0, 4), dtype=np.int32)
+    return np.array([(x0, y0, x1, y1) for (x0, y0), (x1, y1) in positions], dtype=np.int32)
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + OCR Lines + + + + +
+class OCRLines(object):
+    """The lines of a page as arrays, the line ids are the row numbers"""
+    __slots__ = ('boxes', 'content')
+
+    def __init__(self, boxes, content):
+        # (n, 4) int32 x0, y0, x1, y1
+        self.boxes = boxes
+        self.content = content
+
+    def __repr__(self):
+        return "<OCR Lines [%s] >" % len(self)
+
+    def __len__(self):
+        return len(self.content)
+
+    def __getitem__(self, line_id):
+        return Line(line_id, *(int(value) for value in self.boxes[line_id]), self.content[line_id])
+
+    def __iter__(self):
+        for line_id in range(len(self)):
+            yield self[line_id]
+# + + + + + OCR Lines + + + + +
+
+
+# + + + + + Word Boxes + + + + +
+class WordBoxes(object):
+    """The word boxes of a page as arrays, each word points to its line by line_id"""
+    __slots__ = ('line_id', 'boxes', 'confidence', 'content')
+
+    def __init__(self, line_id, boxes, confidence, content):
+        # int32 line ids, (n, 4) int32 x0, y0, x1, y1, int16 confidences (NO_CONFIDENCE if missing)
+        self.line_id = line_id
+        self.boxes = boxes
+        self.confidence = confidence
+        self.content = content
+
+    def __repr__(self):
+        return "<Word Boxes [%s] >" % len(self)
+
+    def __len__(self):
+        return len(self.content)
+
+    def __getitem__(self, index):
+        return WordBox(
+            int(self.line_id[index]), *(int(value) for value in self.boxes[index]),
+            None if self.confidence[index] == NO_CONFIDENCE else int(self.confidence[index]),
+            self.content[index]
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+# + + + + + Word Boxes + + + + +
+
+
+# + + + + + OCR Page + + + + +
+class OCRPage(object):
+    """The OCR of a page in a compact form: NumPy arrays for the boxes and confidences,
+    integer line ids, no dict nor UUID per line. to_df and to_arrow build the tables on request
+    """
+    __slots__ = ('page', 'lines', 'words')
+
+    def __init__(self, lines, words, page=None):
+        self.page = page
+        self.lines = lines
+        self.words = words
+
+    @classmethod
+    def from_line_boxes(cls, line_boxes, page=None):
+        """From the pyocr LineBoxes (or their dict form of pyocr_image_to_line_and_boxes)"""
+        line_positions, line_content = [], []
+        word_line_id, word_positions, word_confidence, word_content = [], [], [], []
+        for line_id, line in enumerate(line_boxes):
+            line_positions.append(_field(line, 'position'))
+            line_content.append(_field(line, 'content'))
+            for box in _field(line, 'word_boxes') or []:
+                confidence = _field(box, 'confidence')
+                word_line_id.append(line_id)
+                word_positions.append(_field(box, 'position'))
+                word_confidence.append(NO_CONFIDENCE if confidence is None else confidence)
+                word_content.append(_field(box, 'content'))
+        return cls(
+            OCRLines(_boxes_array(line_positions), line_content),
+            WordBoxes(
+                np.array(word_line_id, dtype=np.int32), _boxes_array(word_positions),
+                np.array(word_confidence, dtype=np.int16), word_content
+            ),
+            page=page
+        )
+
+    def __repr__(self):
+        return "<OCR Page [%s] %s lines, %s words >" % (self.page, len(self.lines), len(self.words))
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def nbytes(self):
+        """The bytes of the arrays (the strings not included)"""
+        return self.lines.boxes.nbytes + self.words.line_id.nbytes + self.words.boxes.nbytes + self.words.confidence.nbytes
+
+    def text(self):
+        """The text of the page, one line per row (like ocr_df_text)"""
+        return "\n".join(content for content in self.lines.content if content is not None)
+
+    def to_word_boxes(self):
+        """The word boxes as dicts (the form of PDF.pyocr_image_to_boxes)"""
+        return [_box_dict(word) for word in self.words]
+
+    def to_line_boxes(self):
+        """The lines and their word boxes as dicts (the form of PDF.pyocr_image_to_line_and_boxes)"""
+        line_words = [[] for _ in range(len(self.lines))]
+        for word in self.words:
+            line_words[word.line_id].append(_box_dict(word))
+        return [
+            {"position": ((line.x0, line.y0), (line.x1, line.y1)), "content": line.content, "word_boxes": words}
+            for line, words in zip(self.lines, line_words)
+        ]
+
+    def to_df(self):
+        """The data frame of pyocr_image_to_df, with an integer line_id (and page if known) instead of the line_uuid
+
+        A line without word boxes is one row with empty word columns
+        """
+        words = self.words
+        # one row per word, plus one per line without words (word -1), in line order
+        empty_lines = np.setdiff1d(np.arange(len(self.lines), dtype=np.int32), words.line_id)
+        line_id = np.concatenate([words.line_id, empty_lines])
+        word = np.concatenate([np.arange(len(words), dtype=np.int64), np.full(len(empty_lines), -1)])
+        order = np.argsort(line_id, kind='stable')
+        line_id, word = line_id[order], word[order]
+        no_word = word < 0
+        # word -1 picks this padding row
+        word_boxes = np.vstack([words.boxes, np.zeros((1, 4), dtype=np.int32)])[word]
+        confidence = np.append(words.confidence, np.int16(NO_CONFIDENCE))[word]
+
+        columns = {'line_id': pd.arrays.IntegerArray(line_id, np.zeros(len(line_id), dtype=bool))}
+        for i, name in enumerate(['x0', 'y0', 'x1', 'y1']):
+            columns[f"line_{name}"] = pd.arrays.IntegerArray(
+                np.ascontiguousarray(self.lines.boxes[line_id, i]), np.zeros(len(line_id), dtype=bool)
+            )
+        columns["line_content"] = pd.array(np.array(self.lines.content + [None], dtype=object)[line_id], dtype="string")
+        for i, name in enumerate(['x0', 'y0', 'x1', 'y1']):
+            columns[f"word_box_{name}"] = pd.arrays.IntegerArray(np.ascontiguousarray(word_boxes[:, i]), no_word)
+        columns["word_box_content"] = pd.array(np.array(words.content + [None], dtype=object)[word], dtype="string")
+        columns["word_box_confidence"] = pd.arrays.IntegerArray(confidence, confidence == NO_CONFIDENCE)
+        df = pd.DataFrame(columns)
+        if self.page is not None:
+            df['page'] = np.int32(self.page)
+        return df
+
+    def to_arrow(self):
+        """The pyarrow Table of to_df (pip install pyarrow)"""
+        import pyarrow as pa
+        return pa.Table.from_pandas(self.to_df(), preserve_index=False)
+# + + + + + OCR Page + + + + +
+# + + + + + Classes + + + + +
@@ -0,0 +1,263 @@
+#
+# Search
+# ------
+# This script contains the
+# class PageIndex
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    warning_print
+)
+import os
+import re
+import json
+import tempfile
+from array import array
+from collections import namedtuple
+from .lazy import (
+    lazy_import
+)
+pd = lazy_import('pandas')
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+TOKEN_PATTERN = re.compile(r"\w+")
+# the format of the saved JSON (the page texts and boxes)
+PAGE_INDEX_VERSION = 2
+PAGE_INDEX_EXTENSION = '.index'
+# one match, page starts from 0, start and end are offsets in the page text,
+# box is (x0, y0, x1, y1) on the page image for OCR pages (None for the text layer)
+Hit = namedtuple('Hit', ['page', 'start', 'end', 'box'])
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def tokenize(text):
+    """(token, start, end) of each word of a text, tokens are case folded"""
+    return [(match.group().casefold(), match.start(), match.end()) for match in TOKEN_PATTERN.finditer(text)]
+
+
+def _union_box(boxes):
+    boxes = [box for box in boxes if box is not None]
+    if not boxes:
+        return None
+    return (
+        min(box[0] for box in boxes), min(box[1] for box in boxes),
+        max(box[2] for box in boxes), max(box[3] for box in boxes)
+    )
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Page Index + + + + +
+class PageIndex(object):
+    def __init__(self, digest=None, mode=None):
+        """An inverted index of the page texts: token -> page -> token positions
+
+        Pages are added one at a time (e.g. while they are extracted or OCRed), the page
+        texts are kept for regexes and the word boxes of the OCR pages for highlighting.
+        digest identifies the indexed PDF content, a saved index of other content is stale,
+        mode is how the texts were extracted (see PDF.extract_text)
+        """
+        self.digest = digest
+        self.mode = mode
+        self._postings = {}
+        # page -> text, start offset of every token, box of every token (OCR pages only)
+        self._texts = {}
+        self._starts = {}
+        self._ends = {}
+        self._boxes = {}
+
+    def __repr__(self):
+        return "<Page Index [%s pages, %s tokens] >" % (len(self._texts), len(self._postings))
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, page_number):
+        return page_number in self._texts
+
+    def pages_indexed(self):
+        return sorted(self._texts)
+
+    # - Build -
+    def add_page(self, page_number, text, boxes=None):
+        """Index the text of a page (0-based), boxes is the box of each token if known"""
+        if page_number in self._texts:
+            self.remove_page(page_number)
+        text = "" if text is None else str(text)
+        tokens = tokenize(text)
+        for position, (token, _, _) in enumerate(tokens):
+            self._postings.setdefault(token, {}).setdefault(page_number, array('I')).append(position)
+        self._texts[page_number] = text
+        self._starts[page_number] = array('I', [start for _, start, _ in tokens])
+        self._ends[page_number] = array('I', [end for _, _, end in tokens])
+        if boxes is not None:
+            self._boxes[page_number] = list(boxes)
+        return len(tokens)
+
+    def add_ocr_page(self, page_number, page_df):
+        """Index an OCR data frame (of pyocr_image_to_df, OCRPage.to_df or pytesseract_image_to_df) with its word boxes"""
+        if 'word_box_content' in page_df.columns:
+            line_columns = ['line_uuid' if 'line_uuid' in page_df.columns else 'line_id']
+            words = page_df[['word_box_content', 'word_box_x0', 'word_box_y0', 'word_box_x1', 'word_box_y1']]
+        else:
+            # a line number restarts in every block and paragraph
+            line_columns = ['block_num', 'par_num', 'line_num']
+            words = page_df[['text', 'left', 'top']].assign(
+                right=page_df['left'] + page_df['width'], bottom=page_df['top'] + page_df['height']
+            )
+        lines = page_df[line_columns].itertuples(index=False, name=None)
+        parts, boxes = [], []
+        previous_line = None
+        for (content, x0, y0, x1, y1), line in zip(words.itertuples(index=False, name=None), lines):
+            # a line without words has a missing (None, NaN or NA) content and box
+            if pd.isna(content) or not str(content).strip():
+                continue
+            if parts:
+                parts.append("\n" if line != previous_line else " ")
+            previous_line = line
+            parts.append(str(content))
+            box = None if pd.isna(x0) else (int(x0), int(y0), int(x1), int(y1))
+            boxes.extend(box for _ in tokenize(str(content)))
+        return self.add_page(page_number, "".join(parts), boxes=boxes)
+
+    def remove_page(self, page_number):
+        """Drop a page from the index"""
+        for token in set(token for token, _, _ in tokenize(self._texts.pop(page_number, ""))):
+            pages = self._postings.get(token)
+            if pages is not None:
+                pages.pop(page_number, None)
+                if not pages:
+                    del self._postings[token]
+        for pages in [self._starts, self._ends, self._boxes]:
+            pages.pop(page_number, None)
+    # - Build -
+
+    # - Search -
+    def pages(self, query, regex=False):
+        """The sorted pages (0-based) that contain a term or a phrase (or match a regex)"""
+        if regex:
+            return sorted(set(hit.page for hit in self.find(query, regex=True)))
+        tokens = [token for token, _, _ in tokenize(query)]
+        if len(tokens) == 1:
+            return sorted(self._postings.get(tokens[0], {}))
+        return sorted(set(hit.page for hit in self.find(query)))
+
+    def count(self, query):
+        """How many times a term or a phrase is in the indexed pages"""
+        return len(self.find(query))
+
+    def find(self, query, regex=False):
+        """Every Hit of a term, a phrase (words in a row, case insensitive) or a regex, in page order"""
+        if regex:
+            return self._find_regex(query)
+        tokens = [token for token, _, _ in tokenize(query)]
+        if not tokens:
+            return []
+        postings = [self._postings.get(token) for token in tokens]
+        if any(pages is None for pages in postings):
+            return []
+        # only the pages with every token, starting from the rarest one
+        candidates = set(min(postings, key=len))
+        for pages in postings:
+            candidates.intersection_update(pages)
+
+        hits = []
+        for page_number in sorted(candidates):
+            following = [set(pages[page_number]) for pages in postings[1:]]
+            for position in postings[0][page_number]:
+                if all(position + i + 1 in positions for i, positions in enumerate(following)):
+                    hits.append(self._hit(page_number, position, position + len(tokens) - 1))
+        return hits
+
+    def _find_regex(self, pattern):
+        pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        hits = []
+        for page_number in sorted(self._texts):
+            for match in pattern.finditer(self._texts[page_number]):
+                box = None
+                if page_number in self._boxes:
+                    starts, ends = self._starts[page_number], self._ends[page_number]
+                    box = _union_box(
+                        self._boxes[page_number][position] for position in range(len(starts))
+                        if starts[position] < match.end() and ends[position] > match.start()
+                    )
+                hits.append(Hit(page_number, match.start(), match.end(), box))
+        return hits
+
+    def _hit(self, page_number, first_position, last_position):
+        box = None
+        if page_number in self._boxes:
+            box = _union_box(self._boxes[page_number][first_position:last_position + 1])
+        return Hit(page_number, self._starts[page_number][first_position], self._ends[page_number][last_position], box)
+
+    def snippet(self, hit, width=40):
+        """The text around a hit"""
+        text = self._texts[hit.page]
+        return text[max(hit.start - width, 0):hit.end + width]
+    # - Search -
+
+    # - Persistence -
+    def save(self, index_path):
+        """Write the index to a file (atomically), return its path
+
+        Only the page texts and boxes are written, as JSON (loading an index never runs code),
+        the postings are rebuilt on load
+        """
+        index_path = str(index_path)
+        state = {
+            'version': PAGE_INDEX_VERSION,
+            'digest': self.digest,
+            'mode': self.mode,
+            'pages': [
+                [page_number, text, self._boxes.get(page_number)]
+                for page_number, text in sorted(self._texts.items())
+            ]
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return index_path
+
+    @classmethod
+    def load(cls, index_path, digest=None):
+        """Read a saved index, None if missing, broken or (with a digest) of other content"""
+        try:
+            with open(str(index_path), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') != PAGE_INDEX_VERSION or (digest is not None and state.get('digest') != digest):
+                return None
+            index = cls(digest=state['digest'], mode=state['mode'])
+            for page_number, text, boxes in state['pages']:
+                index.add_page(int(page_number), text, boxes=None if boxes is None else [
+                    None if box is None else tuple(box) for box in boxes
+                ])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # ValueError covers a bad JSON and a file that is not text (e.g. an old pickled index)
+            warning_print(f"Broken page index {index_path} ({e}), ignoring it")
+            return None
+        return index
+    # - Persistence -
+# + + + + + Page Index + + + + +
+# + + + + + Classes + + + + +
@@ -0,0 +1,232 @@
+#
+# Tables
+# ------
+# This script contains the
+# class TableEngine
+#
+# Date: 2026-10-18
+#
+# Author: Lorenzo Coacci
+#
+#
+# Copyright (C) 2026 Lorenzo Coacci
+#
+# pylint: disable=logging-format-interpolation,too-many-lines
+#
+
+
+# + + + + + Libraries + + + + +
+# import basic
+from golog.log import (
+    error_print
+)
+import os
+import json
+import importlib.util
+import tempfile
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import PyPDF2
+import tabula
+from .metrics import (
+    instrumentation
+)
+from .locks import (
+    Locked
+)
+# + + + + + Libraries + + + + +
+
+
+# + + + + + Constants + + + + +
+# one table found by the engine, area is the index of the area it is in (None for the whole page)
+TableResult = namedtuple('TableResult', ['document', 'page', 'area', 'table', 'df'])
+TABLE_ENGINE_MODES = ['auto', 'jvm', 'batch']
+# + + + + + Constants + + + + +
+
+
+# + + + + + Functions + + + + +
+def _table_df(table):
+    """A tabula-java JSON table to a data frame, the first row is the header"""
+    rows = [[cell["text"] if cell["text"] else np.nan for cell in row] for row in table["data"]]
+    if not rows:
+        return None
+    return pd.DataFrame(rows[1:], columns=rows[0])
+
+
+def _area_index(table, areas):
+    """The index of the (absolute) area the table center is in, None if not in any"""
+    center_y = table["top"] + table["height"] / 2
+    center_x = table["left"] + table["width"] / 2
+    for i, (top, left, bottom, right) in enumerate(areas):
+        if top <= center_y <= bottom and left <= center_x <= right:
+            return i
+    return None
+# + + + + + Functions + + + + +
+
+
+# + + + + + Classes + + + + +
+# + + + + + Table Engine + + + + +
+class TableEngine(Locked):
+    def __init__(self, java_options=None, mode='auto'):
+        """Table extraction with tabula that does not pay a JVM start per call
+
+        mode 'jvm' keeps one JVM inside this process (tabula-py over jpype, pip install jpype1)
+        shared by every call and PDF, mode 'batch' runs all the pages of all the documents
+        of a call in one java process, 'auto' is 'jvm' when jpype is installed.
+        Results are per page and per area, see extract
+        """
+        if mode not in TABLE_ENGINE_MODES:
+            raise ValueError(f"This mode {mode} not available, only these ones {TABLE_ENGINE_MODES}")
+        self.java_options = java_options
+        self.mode = mode
+        # java runs (processes or in process calls) so far
+        self.java_calls = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<Table Engine [%s] %s java calls >" % (self.resolved_mode(), self.java_calls)
+
+    def resolved_mode(self):
+        if self.mode == 'auto':
+            return 'jvm' if importlib.util.find_spec('jpype') is not None else 'batch'
+        return self.mode
+
+    def extract(self, pdfs, pages=None, areas=None, relative_area=False, **tabula_kwargs):
+        """The tables of the selected pages (see parse_pages) of one or many PDFs (PDF objects or paths)
+
+        areas is one area or a list of areas (top, left, bottom, right) in points, or in % of
+        the page with relative_area=True, every area of every page is extracted in the same run.
+        Return a list of TableResult (document index, 1-based page, area index, table index, df),
+        None if a document cannot be opened or the pages are not valid
+        """
+        # imported here, pdf imports this module
+        from .pdf import PDF
+        if isinstance(pdfs, (PDF, str, os.PathLike)):
+            pdfs = [pdfs]
+        if areas is not None and not isinstance(areas[0], (list, tuple)):
+            areas = [areas]
+        opened = []
+        try:
+            requests = []
+            for document, pdf in enumerate(pdfs):
+                if not isinstance(pdf, PDF):
+                    pdf = PDF(pdf, lazy=True)
+                    if not hasattr(pdf, 'pages'):
+                        error_print("Could not extract the tables, one of the PDFs cannot be opened")
+                        return None
+                    opened.append(pdf)
+                page_numbers = pdf._page_numbers(pages)
+                if page_numbers is None:
+                    return None
+                for page_number in sorted(set(page_numbers)):
+                    page_areas = None
+                    if areas is not None:
+                        page_areas = self._absolute_areas(pdf, page_number, areas, relative_area)
+                    requests.append((document, pdf, page_number, page_areas))
+
+            with tempfile.TemporaryDirectory() as where:
+                if self.resolved_mode() == 'jvm':
+                    raw_tables = self._run_jvm(requests, where, tabula_kwargs)
+                else:
+                    raw_tables = self._run_batch(requests, where, tabula_kwargs)
+        finally:
+            for pdf in opened:
+                pdf.close()
+
+        results = []
+        for (document, _, page_number, page_areas), tables in zip(requests, raw_tables):
+            for table_index, table in enumerate(tables):
+                df = _table_df(table)
+                if df is None:
+                    continue
+                area = None if page_areas is None else _area_index(table, page_areas)
+                results.append(TableResult(document, page_number + 1, area, table_index, df))
+        return results
+
+    def _absolute_areas(self, pdf, page_number, areas, relative_area):
+        """The areas in points from the top left corner of the page"""
+        if not relative_area:
+            return [tuple(float(value) for value in area) for area in areas]
+        media_box = pdf.get_page(page_number).pdf_page.mediaBox
+        width, height = float(media_box.getWidth()), float(media_box.getHeight())
+        return [
+            (top * height / 100, left * width / 100, bottom * height / 100, right * width / 100)
+            for top, left, bottom, right in areas
+        ]
+
+    def _run_jvm(self, requests, where, tabula_kwargs):
+        """One call per page in the JVM of this process, the raw tables of each request"""
+        raw_tables = []
+        # in memory PDFs are written once, not once per page
+        paths = {}
+        for document, pdf, page_number, page_areas in requests:
+            if document not in paths:
+                paths[document] = pdf.pdf_file_path
+                if paths[document] is None:
+                    paths[document] = pdf.to_pdf(os.path.join(where, f"{document}.pdf"))
+            with self._lock, instrumentation.span(
+                'tables', document=pdf.pdf_file_name, engine='tabula', mode='jvm', page=page_number + 1
+            ):
+                tables = tabula.read_pdf(
+                    paths[document], pages=page_number + 1,
+                    area=None if page_areas is None else [list(area) for area in page_areas],
+                    output_format='json', multiple_tables=True,
+                    java_options=self.java_options, **tabula_kwargs
+                )
+                self.java_calls = self.java_calls + 1
+            raw_tables.append(tables or [])
+        return raw_tables
+
+    def _run_batch(self, requests, where, tabula_kwargs):
+        """Every page as a one page PDF in a folder, one java process per folder"""
+        groups = {}
+        for i, (_, _, _, page_areas) in enumerate(requests):
+            groups.setdefault(None if page_areas is None else tuple(page_areas), []).append(i)
+        raw_tables = [None] * len(requests)
+        # one folder per different set of areas (relative areas on pages of different sizes)
+        for page_areas, selected in groups.items():
+            group_tables = self._run_batch_folder(
+                [requests[i] for i in selected], page_areas, tempfile.mkdtemp(dir=where), tabula_kwargs
+            )
+            for i, tables in zip(selected, group_tables):
+                raw_tables[i] = tables
+        return raw_tables
+
+    def _run_batch_folder(self, requests, page_areas, where, tabula_kwargs):
+        names = []
+        for i, (_, pdf, page_number, _) in enumerate(requests):
+            name = os.path.join(where, f"{i:08d}")
+            writer = PyPDF2.PdfFileWriter()
+            pdf._add_pages_to_writer(writer, [page_number])
+            pdf._write_pdf(writer, name + '.pdf')
+            names.append(name)
+        # one java run for all the documents, named after the document when there is only one
+        documents = set(pdf.pdf_file_name for _, pdf, _, _ in requests)
+        with self._lock, instrumentation.span(
+            'tables', document=documents.pop() if len(documents) == 1 else None,
+            engine='tabula', mode='batch', pages=len(requests)
+        ):
+            tabula.convert_into_by_batch(
+                where, output_format='json', pages='all',
+                area=None if page_areas is None else [list(area) for area in page_areas],
+                java_options=self.java_options, **tabula_kwargs
+            )
+            self.java_calls = self.java_calls + 1
+
+        raw_tables = []
+        for name in names:
+            try:
+                with open(name + '.json') as f:
+                    raw_tables.append(json.load(f))
+            except (FileNotFoundError, ValueError) as e:
+                error_print(f"No tables output for the page {name}: {e}")
+                raw_tables.append([])
+        return raw_tables
+# + + + + + Table Engine + + + + +
+# + + + + + Classes + + + + +
+
+
+# the engine shared by the whole process
+table_engine = TableEngine()
@@ -42,6 +42,12 @@ setup(
         'opencv-python',
         'pyocr'
     ],
+    extras_require={
+        # a JVM kept inside the process for the table extraction (see TableEngine)
+        'jvm': ['jpype1'],
+        # the Parquet and Arrow exports (see PDF.pdf_to_parquet)
+        'parquet': ['pyarrow']
+    },
     packages=find_packages(exclude=('tests', 'docs')),
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -1,6 +1,1133 @@
 from pdfer.pdf import (
     PDF
 )
+from pdfer.cache import (
+    OCRCache
+)
+import os
+import pytest
+
+
+# + + + + + Helpers + + + + +
+def make_pdf(path, page_texts, xref_stream=False):
+    """Write a minimal text-only PDF, one page per text
+
+    With xref_stream=True it is a PDF 1.5 with an xref stream and the font in an object stream
+    """
+    num_pages = len(page_texts)
+    # objects: 1 catalog, 2 pages, 3 font, then (page, content) pairs
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for i, text in enumerate(page_texts):
+        page_id = 4 + 2 * i
+        kids.append(f"{page_id} 0 R")
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {num_pages} >>".encode()
+
+    if xref_stream:
+        return _write_xref_stream_pdf(path, objects)
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % (i + 1) + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as f:
+        f.write(out)
+    return str(path)
+
+
+def _write_xref_stream_pdf(path, objects):
+    # the font (object 3) goes in an object stream, the last two objects are the object stream and the xref stream
+    object_stream, xref_stream = len(objects) + 1, len(objects) + 2
+    font = b"3 0 " + objects[2]
+    out = b"%PDF-1.5\n"
+    entries = {0: (0, 0, 65535), 3: (2, object_stream, 0)}
+    for i, obj in enumerate(objects):
+        if i + 1 != 3:
+            entries[i + 1] = (1, len(out), 0)
+            out += b"%d 0 obj\n" % (i + 1) + obj + b"\nendobj\n"
+    entries[object_stream] = (1, len(out), 0)
+    out += b"%d 0 obj\n<< /Type /ObjStm /N 1 /First 4 /Length %d >>\nstream\n" % (object_stream, len(font))
+    out += font + b"\nendstream\nendobj\n"
+    xref = entries[xref_stream] = (1, len(out), 0)
+    data = b"".join(
+        bytes([kind]) + field.to_bytes(4, 'big') + generation.to_bytes(2, 'big')
+        for _, (kind, field, generation) in sorted(entries.items())
+    )
+    out += b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Length %d >>\nstream\n" % (
+        xref_stream, xref_stream + 1, len(data)
+    )
+    out += data + b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % xref[1]
+
+    with open(path, 'wb') as f:
+        f.write(out)
+    return str(path)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    return make_pdf(tmp_path / "sample.pdf", [f"Page number {i}" for i in range(5)])
+
+
+class FakeRaster(object):
+    """Stands for poppler: the page n is a blank n x n image (or page_image(page, dpi)), the calls are recorded"""
+
+    def __init__(self, page_image=None):
+        self.page_image = page_image
+        self.calls = []
+
+    @property
+    def pages(self):
+        """The (first_page, last_page) rasterized"""
+        return [(first_page, last_page) for first_page, last_page, _, _ in self.calls]
+
+    def __call__(self, first_page, last_page, dpi=350, grayscale=False):
+        from PIL import Image
+        self.calls.append((first_page, last_page, dpi, grayscale))
+        return [
+            Image.new('RGB', (page, page)) if self.page_image is None else self.page_image(page, dpi)
+            for page in range(first_page, last_page + 1)
+        ]
+
+
+@pytest.fixture
+def fake_raster(monkeypatch):
+    """Every PDF rasterizes through a FakeRaster"""
+    raster = FakeRaster()
+    monkeypatch.setattr(PDF, '_rasterize_pages', lambda self, *args, **kwargs: raster(*args, **kwargs))
+    return raster
+
+
+def fake_ocr_df(image, **kwargs):
+    """Stands for pyocr_image_to_df: two lines, the second word of the first one is the image width"""
+    import pandas as pd
+    width = image.size[0]
+    return pd.DataFrame({
+        "line_uuid": pd.array(["a", "a", "b"], dtype="string"),
+        "line_x0": [0, 0, 0], "line_y0": [0, 0, 9], "line_x1": [9, 9, 9], "line_y1": [5, 5, 14],
+        "line_content": [f"scanned {width}", f"scanned {width}", "end"],
+        "word_box_x0": pd.array([0, 5, None], dtype="Int32"), "word_box_y0": pd.array([0, 0, None], dtype="Int32"),
+        "word_box_x1": pd.array([4, 9, None], dtype="Int32"), "word_box_y1": pd.array([5, 5, None], dtype="Int32"),
+        "word_box_content": ["scanned", str(width), None], "word_box_confidence": pd.array([90, 80, None], dtype="Int16")
+    })
+# + + + + + Helpers + + + + +
+
+
+# + + + + + PDF + + + + +
+def test_pdf_eager_text(pdf_path):
+    pdf = PDF(pdf_path)
+    assert len(pdf) == 5
+    assert pdf.get_page_text(2) == "Page number 2"
+    assert "Page number 4" in pdf.text
+    pdf.close()
+
+
+def test_pdf_lazy_pages(pdf_path):
+    pdf = PDF(pdf_path, lazy=True)
+    assert len(pdf) == 5
+    assert pdf.pages.loaded() == []
+    assert pdf.get_page(3).page_text == "Page number 3"
+    assert pdf[-1].page_number == 4
+    assert pdf.pages.loaded() == [3, 4]
+    assert pdf._text is None
+    assert pdf.text == PDF(pdf_path).text
+    with pytest.raises(IndexError):
+        pdf[5]
+    pdf.close()
+
+
+def test_pdf_iter_page_texts(pdf_path):
+    pdf = PDF(pdf_path, lazy=True)
+    assert list(pdf.iter_page_texts()) == [(i, f"Page number {i}") for i in range(5)]
+    assert [n for n, _ in pdf.iter_page_texts(1, 4, chunk_size=2)] == [1, 2, 3]
+    assert [n for n, _ in pdf.iter_page_texts(-2)] == [3, 4]
+    # nothing stays cached once the iteration is over
+    assert pdf.pages.loaded() == []
+    pdf.close()
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_pdf_ocr_images_reports_failures_in_order(pdf_path, tmp_path, executor):
+    pdf = PDF(pdf_path)
+    images = [str(tmp_path / f"missing_{i}.jpg") for i in range(3)]
+    results = pdf.ocr_images(images, method_name='pytesseract_image_to_df', workers=2, executor=executor)
+    assert len(results) == 3
+    for image, (result, error) in zip(images, results):
+        assert result is None
+        assert image in error
+    assert pdf.ocr_images(images, method_name='not_a_method') is None
+    pdf.close()
+
+
+@pytest.mark.parametrize("workers", [None, 3])
+def test_pdf_to_df_pipeline(pdf_path, monkeypatch, workers, tmp_path, fake_raster):
+    pdf = PDF(pdf_path, ocr_cache=OCRCache(tmp_path / "cache"))
+
+    def fake_ocr(image, **kwargs):
+        if image.size == (2, 2):
+            raise RuntimeError("broken page")
+        return fake_ocr_df(image)
+
+    monkeypatch.setattr(pdf, 'pyocr_image_to_df', fake_ocr)
+    df = pdf.pdf_to_df(workers=workers, executor='thread', batch_size=2)
+    assert fake_raster.pages == [(1, 2), (3, 4), (5, 5)]
+    assert list(df['page'].unique()) == [1, 3, 4, 5]
+    assert list(df['word_box_content'])[1::3] == ['1', '3', '4', '5']
+    assert list(pdf.ocr_errors) == [2]
+    # page images are removed
+    assert not [f for f in os.listdir(os.path.dirname(pdf_path)) if f.endswith('.jpg')]
+
+    # the second run only rasterizes and OCRs the page that failed
+    fake_raster.calls.clear()
+    df = pdf.pdf_to_df(workers=workers, executor='thread', batch_size=2)
+    assert fake_raster.pages == [(2, 2)]
+    assert list(df['page'].unique()) == [1, 3, 4, 5]
+    assert pdf.ocr_cache.hits == 4
+    pdf.close()
+
+
+def test_pdf_to_df_process_pool_started_first(pdf_path, monkeypatch, fake_raster):
+    import multiprocessing
+    import pandas as pd
+    import pdfer.pdf
+
+    # the worker processes already exist when the rasterizer thread starts
+    workers_at_raster = []
+    fake_raster.page_image = lambda page, dpi: workers_at_raster.append(len(multiprocessing.active_children())) or _glyphs_page()
+    monkeypatch.setattr(pdfer.pdf.pt, 'image_to_data', lambda im, **kwargs: pd.DataFrame({"text": ["x"]}))
+    pdf = PDF(pdf_path)
+    df = pdf.pdf_to_df(ocr='pytesseract', workers=2, executor='process', pages=[0, 1])
+    assert list(df['page'].unique()) == [1, 2]
+    assert workers_at_raster[0] == 2
+    pdf.close()
+
+
+def test_pdf_to_df_ocr_cache_by_page(pdf_path, monkeypatch, tmp_path, fake_raster):
+    import pandas as pd
+    import pdfer.pdf
+
+    fake_raster.page_image = lambda page, dpi: _glyphs_page(glyph_height=dpi // 5)
+    monkeypatch.setattr(pdfer.pdf.pt, 'image_to_data', lambda im, **kwargs: pd.DataFrame({
+        "block_num": [1], "par_num": [1], "line_num": [1], "left": [1], "top": [2], "width": [3], "height": [4], "text": ["x"]
+    }))
+    pdf = PDF(pdf_path, ocr_cache=OCRCache(tmp_path / "cache"))
+    pdf.pdf_to_df(ocr='pytesseract', pages=[0, 1], dpi='auto', preprocess='fast')
+    # one entry per page, the page raster is not hashed into a second one
+    assert len(pdf.ocr_cache) == 2
+
+    # every page is cached: nothing is rasterized, not even the DPI probe
+    fake_raster.calls.clear()
+    df = pdf.pdf_to_df(ocr='pytesseract', pages=[0, 1], dpi='auto', preprocess='fast')
+    assert fake_raster.calls == [] and list(df['page'].unique()) == [1, 2]
+    assert pdf.ocr_cache.hits == 2
+    pdf.close()
+
+
+def test_pil_cv2_conversions():
+    import numpy as np
+    from PIL import Image
+    from pdfer.raster import pil_to_cv2, cv2_to_pil
+
+    image = Image.new('RGB', (4, 3), color=(255, 0, 0))
+    array = pil_to_cv2(image)
+    assert array.shape == (3, 4, 3)
+    assert tuple(array[0, 0]) == (0, 0, 255)
+    assert cv2_to_pil(array).getpixel((0, 0)) == (255, 0, 0)
+
+    # gray arrays are shared with the PIL image
+    gray = np.zeros((3, 4), dtype=np.uint8)
+    gray_image = cv2_to_pil(gray)
+    gray[1, 2] = 200
+    assert gray_image.getpixel((2, 1)) == 200
+
+
+def test_pdf_ocr_input_image(pdf_path, tmp_path):
+    import numpy as np
+    from PIL import Image
+
+    pdf = PDF(pdf_path)
+    image = Image.new('RGB', (4, 3))
+    assert pdf._ocr_input_image(image) is image
+    assert pdf._ocr_input_image(np.zeros((3, 4, 3), dtype=np.uint8)).size == (4, 3)
+    assert pdf._ocr_input_image(str(tmp_path / "missing.jpg")) is None
+    pdf.close()
+
+
+def test_pyocr_image_to_df_columns(pdf_path, monkeypatch):
+    from PIL import Image
+    from pdfer.records import OCRPage
+
+    pdf = PDF(pdf_path)
+    lines = [
+        {
+            "position": ((10, 20), (110, 40)), "content": "hello world",
+            "word_boxes": [
+                {"position": ((10, 20), (50, 40)), "content": "hello", "confidence": 96},
+                {"position": ((60, 20), (110, 40)), "content": "world", "confidence": 91}
+            ]
+        },
+        {"position": ((10, 50), (30, 70)), "content": "", "word_boxes": None}
+    ]
+    monkeypatch.setattr(pdf, 'pyocr_image_to_records', lambda *args, **kwargs: OCRPage.from_line_boxes(lines))
+    df = pdf.pyocr_image_to_df(Image.new('RGB', (4, 4)), tool=object())
+    assert len(df) == 3
+    assert list(df['word_box_content'][:2]) == ["hello", "world"]
+    assert list(df['word_box_x0'][:2]) == [10, 60]
+    assert str(df['word_box_x0'].dtype) == "Int32"
+    assert list(df['line_id']) == [0, 0, 1] and str(df['line_id'].dtype) == "Int32"
+    assert df['word_box_confidence'].isna().tolist() == [False, False, True]
+    # the dict forms come from the same records
+    assert pdf.pyocr_image_to_line_and_boxes(Image.new('RGB', (4, 4)), tool=object()) == [
+        dict(lines[0]), dict(lines[1], word_boxes=[])
+    ]
+    assert pdf.pyocr_image_to_boxes(Image.new('RGB', (4, 4)), tool=object()) == lines[0]["word_boxes"]
+    pdf.close()
+
+
+def test_pdf_merge_reuses_texts(tmp_path, monkeypatch):
+    paths = [make_pdf(tmp_path / f"doc_{i}.pdf", [f"Doc {i} page {j}" for j in range(2)]) for i in range(3)]
+    first = PDF(paths[0])
+    second = PDF(paths[1], lazy=True)
+    second.get_page(1).page_text
+    merged = PDF.merge([first, second, paths[2]], str(tmp_path / "merged.pdf"))
+    assert len(merged) == 6
+    assert merged.pages.loaded() == [0, 1, 3]
+    # the texts extracted by the inputs are not extracted again
+    monkeypatch.setattr(PDF.PDFPage, 'get_text', lambda self: "extracted again")
+    assert [merged.get_page_text(i) for i in [0, 1, 3]] == ["Doc 0 page 0", "Doc 0 page 1", "Doc 1 page 1"]
+    assert merged.get_page_text(4) == "extracted again"
+    monkeypatch.undo()
+
+    added = first + second
+    assert len(added) == 4
+    assert added.get_page_text(3) == "Doc 1 page 1"
+    # merged in memory, nothing written next to the inputs and still usable after
+    assert added.pdf_file_path is None and added.pdf_file_name == "doc_0_doc_1"
+    assert sorted(os.listdir(tmp_path)) == ["doc_0.pdf", "doc_1.pdf", "doc_2.pdf", "merged.pdf"]
+    assert added.build_search_index(save=False).pages("page 0") == [0, 2]
+    assert len(sum([first, second, PDF(paths[2])])) == 6
+
+    # merged onto an input still read lazily, through a tmp file
+    lazy_input = PDF(paths[2], lazy=True)
+    merged = PDF.merge([second, lazy_input], paths[2])
+    assert len(merged) == 4 and merged.get_page_text(3) == "Doc 2 page 1"
+    assert len(PDF(paths[2])) == 4 and not os.path.exists(paths[2] + '.tmp')
+    first.close()
+    second.close()
+    lazy_input.close()
+
+
+def test_parse_pages():
+    from pdfer.pdf import parse_pages
+
+    assert parse_pages(None, 4) == [0, 1, 2, 3]
+    assert parse_pages(-1, 4) == [3]
+    assert parse_pages(slice(1, None, 2), 4) == [1, 3]
+    assert parse_pages("1-2, 4", 4) == [0, 1, 3]
+    assert parse_pages("3-", 4) == [2, 3]
+    assert parse_pages([0, "4", slice(1, 2)], 4) == [0, 3, 1]
+    assert parse_pages("2-9", 4) is None
+    assert parse_pages(7, 4) is None
+
+
+def test_pdf_page_selection(pdf_path, tmp_path):
+    pdf = PDF(pdf_path, lazy=True)
+    view = pdf[1:4]
+    assert len(view) == 3
+    assert pdf.pages.loaded() == []
+    assert view.text == "Page number 1 Page number 2 Page number 3"
+    assert view[-1].page_number == 3
+    assert [page.page_number for page in pdf["1,5"]] == [0, 4]
+
+    extracted = pdf.extract_pages("2-3", str(tmp_path / "extracted.pdf"))
+    assert extracted.text == "Page number 1 Page number 2"
+    # the texts already extracted are reused
+    assert extracted.pages.loaded() == [0, 1]
+
+    copy_path = pdf.to_pdf(str(tmp_path / "copy.pdf"), pages=[4, 0])
+    assert PDF(copy_path).text == "Page number 4 Page number 0"
+
+    paths = pdf.split(chunks=["1-2", [4]], where=str(tmp_path / ""))
+    assert [os.path.basename(path) for path in paths] == ["sample_pages_1-2.pdf", "sample_page_5.pdf"]
+    assert len(PDF(paths[0])) == 2
+    # an exported page is named from 1 like the split ones
+    assert pdf.get_page(4).export() == paths[1] and PDF(paths[1]).text == "Page number 4"
+
+    assert pdf.pdf_rotate(90, pages=[1]) is True
+    rotated = PDF(pdf_path.replace("sample", "sample_rotated"))
+    assert [rotated[i].pdf_page.get('/Rotate', 0) for i in range(5)] == [0, 90, 0, 0, 0]
+    # only the rotated page had to be loaded
+    assert 1 in pdf.pages.loaded()
+    pdf.close()
+
+
+def test_pdf_to_df_selected_pages(pdf_path, monkeypatch, fake_raster):
+    pdf = PDF(pdf_path, lazy=True)
+    monkeypatch.setattr(pdf, 'pyocr_image_to_df', fake_ocr_df)
+    df = pdf.pdf_to_df(pages="2-3,5", batch_size=4)
+    assert fake_raster.pages == [(2, 3), (5, 5)]
+    assert list(df['page'].unique()) == [2, 3, 5]
+    pdf.close()
+
+
+def test_pdf_rotate_incremental(pdf_path):
+    with open(pdf_path, 'rb') as f:
+        original = f.read()
+    pdf = PDF(pdf_path, lazy=True)
+    assert pdf.pdf_rotate(90, pages=[1, 3], incremental=True) is True
+    pdf.close()
+
+    with open(pdf_path, 'rb') as f:
+        updated = f.read()
+    # the original bytes are untouched, only the update is appended
+    assert updated.startswith(original)
+    assert len(updated) - len(original) < 1024
+    rotated = PDF(pdf_path)
+    assert [rotated[i].pdf_page.get('/Rotate', 0) for i in range(5)] == [0, 90, 0, 90, 0]
+    assert rotated.get_page_text(3) == "Page number 3"
+
+    # a second update chains to the first one
+    rotated.pdf_rotate(90, pages=[1], incremental=True)
+    rotated.close()
+    assert PDF(pdf_path)[1].pdf_page.get('/Rotate') == 180
+
+
+def test_pdf_rotate_incremental_xref_stream(tmp_path):
+    pdf_path = make_pdf(tmp_path / "streams.pdf", [f"Page number {i}" for i in range(3)], xref_stream=True)
+    with open(pdf_path, 'rb') as f:
+        original = f.read()
+    pdf = PDF(pdf_path, lazy=True)
+    assert pdf.get_page_text(2) == "Page number 2"
+    assert pdf.pdf_rotate(90, pages=[2], incremental=True) is True
+    pdf.close()
+
+    with open(pdf_path, 'rb') as f:
+        updated = f.read()
+    update = updated[len(original):]
+    # an xref stream chained to the previous one, no xref table nor trailer mixed in
+    assert updated.startswith(original)
+    assert b"/Type /XRef" in update and b"/Prev %d" % int(original.split(b"startxref")[-1].split()[0]) in update
+    assert b"trailer" not in update and b"\nxref" not in update
+    rotated = PDF(pdf_path)
+    assert [rotated[i].pdf_page.get('/Rotate', 0) for i in range(3)] == [0, 0, 90]
+    assert rotated.get_page_text(2) == "Page number 2"
+    rotated.pdf_rotate(90, pages=[0], incremental=True)
+    rotated.close()
+    assert [PDF(pdf_path)[i].pdf_page.get('/Rotate', 0) for i in range(3)] == [90, 0, 90]
+
+
+def test_pdf_from_bytes_and_streams(pdf_path, monkeypatch):
+    import io
+    import mmap
+    import pickle
+    import pdfer.raster
+    with open(pdf_path, 'rb') as f:
+        content = f.read()
+
+    pdf = PDF(content, lazy=True)
+    assert pdf.pdf_file_path is None
+    assert pdf.pdf_file_name == "document"
+    assert pdf.get_page_text(3) == "Page number 3"
+    # pickled with its content (e.g. for the OCR worker processes)
+    assert pickle.loads(pickle.dumps(pdf)).get_page_text(1) == "Page number 1"
+
+    # the rasterization gets the same buffer, no path
+    buffers = []
+    monkeypatch.setattr(pdfer.raster, 'convert_from_bytes', lambda data, **kwargs: buffers.append(data) or [])
+    pdf._rasterize_pages(1, 2)
+    assert buffers[0] is content
+
+    with open(pdf_path, 'rb') as f:
+        assert PDF(f).get_page_text(4) == "Page number 4"
+    assert PDF(io.BytesIO(content)).get_page_text(0) == "Page number 0"
+    with open(pdf_path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    assert PDF(mapped).get_page_text(2) == "Page number 2"
+    mapped_pdf = PDF(pdf_path, use_mmap=True)
+    assert mapped_pdf.get_page_text(2) == "Page number 2"
+    mapped_pdf.close()
+
+    # in memory PDFs cannot be overwritten, only written elsewhere
+    assert pdf.to_pdf() is None
+    assert pdf.save_incremental() is None
+    assert PDF(pdf.to_pdf(pdf_path + ".copy.pdf")).get_page_text(4) == "Page number 4"
+
+
+def test_pdf_extract_text_hybrid(tmp_path, monkeypatch, fake_raster):
+    pdf = PDF(make_pdf(tmp_path / "mixed.pdf", ["A born digital page with real text", "", "#~^~#~^~#~^~#~^~#~^~#~^", "Another page of real text"]))
+    monkeypatch.setattr(pdf, 'pyocr_image_to_df', fake_ocr_df)
+    results = pdf.extract_text()
+    # only the empty and the garbage pages are OCRed
+    assert fake_raster.pages == [(2, 3)]
+    assert [(r.page, r.source) for r in results] == [(1, 'text_layer'), (2, 'ocr'), (3, 'ocr'), (4, 'text_layer')]
+    assert results[0].text == "A born digital page with real text"
+    assert results[1].text == "scanned 2\nend"
+    assert list(results[2].df['page']) == [3, 3, 3]
+    assert [r.source for r in pdf.extract_text(mode='text_layer', pages="1-2")] == ['text_layer', 'text_layer']
+
+
+def test_import_defers_heavy_dependencies():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, pdfer; "
+        "print(sorted(m for m in ['pandas', 'numpy', 'cv2', 'tabula', 'pyocr', 'pytesseract', 'pdf2image', 'PIL.Image'] if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_pyocr_image_to_records(pdf_path, monkeypatch):
+    from PIL import Image
+    from pdfer.pdf import ocr_df_text
+
+    class Box(object):
+        def __init__(self, position, content, confidence=None, word_boxes=None):
+            self.position, self.content, self.confidence, self.word_boxes = position, content, confidence, word_boxes
+
+    class Tool(object):
+        def get_name(self):
+            return "Fake"
+
+        def image_to_string(self, image, lang, builder):
+            return [
+                Box(((10, 20), (110, 40)), "hello world", word_boxes=[
+                    Box(((10, 20), (50, 40)), "hello", 96), Box(((60, 20), (110, 40)), "world")
+                ]),
+                Box(((10, 50), (30, 70)), "", word_boxes=[]),
+                Box(((10, 80), (40, 95)), "bye", word_boxes=[Box(((10, 80), (40, 95)), "bye", 88)])
+            ]
+
+    pdf = PDF(pdf_path, lazy=True)
+    ocr_page = pdf.pyocr_image_to_records(Image.new('RGB', (4, 4)), tool=Tool(), page=3)
+    assert (len(ocr_page.lines), len(ocr_page.words)) == (3, 3)
+    assert ocr_page.words.boxes.dtype.name == 'int32' and list(ocr_page.words.line_id) == [0, 0, 2]
+    assert ocr_page.words[1].confidence is None and ocr_page.lines[2].content == "bye"
+    df = ocr_page.to_df()
+    # the columns of pyocr_image_to_df, an integer line_id instead of the line_uuid
+    assert list(df['line_id']) == [0, 0, 1, 2] and list(df['page']) == [3, 3, 3, 3]
+    assert list(df['word_box_x0'].fillna(-1)) == [10, 60, -1, 10]
+    assert df['word_box_confidence'].isna().tolist() == [False, True, True, False]
+    assert str(df['word_box_x0'].dtype) == "Int32" and str(df['word_box_content'].dtype) == "string"
+    assert ocr_df_text(df) == ocr_page.text() == "hello world\n\nbye"
+    pdf.close()
+# + + + + + PDF + + + + +
+
+
+# + + + + + OCR Cache + + + + +
+def test_ocr_cache_get_set(tmp_path):
+    cache = OCRCache(tmp_path)
+    key = cache.key("digest", 350, "pyocr", "eng", "df")
+    assert cache.get(key) is None
+    cache.set(key, {"text": "hello"})
+    assert key in cache
+    assert cache.get(key) == {"text": "hello"}
+    assert cache.get_or_compute(cache.key("other"), lambda: "computed") == "computed"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert len(cache) == 2
+
+
+def test_ocr_cache_lru_eviction(tmp_path):
+    cache = OCRCache(tmp_path, max_size=3500)
+    for i in range(3):
+        cache.set(cache.key(i), b"x" * 1000)
+        os.utime(cache._entry_path(cache.key(i)), (i, i))
+    # use the oldest one, then go over the limit
+    cache.get(cache.key(0))
+    cache.set(cache.key(3), b"x" * 1000)
+    assert cache.key(0) in cache
+    assert cache.key(1) not in cache
+    assert cache.evictions >= 1
+    cache.clear()
+    assert len(cache) == 0
+# + + + + + OCR Cache + + + + +
+
+
+# + + + + + OCR Registry + + + + +
+def test_ocr_registry_discovers_once(monkeypatch):
+    import pyocr
+    from pdfer.ocr import OCRRegistry
+
+    class FakeTool(object):
+        probes = 0
+
+        def get_name(self):
+            return "Tesseract (sh)"
+
+        def get_available_languages(self):
+            FakeTool.probes = FakeTool.probes + 1
+            return ['eng', 'ita']
+
+    discoveries = []
+    monkeypatch.setattr(pyocr, 'get_available_tools', lambda: discoveries.append(1) or [FakeTool()])
+    registry = OCRRegistry()
+    tool = registry.default_tool()
+    assert registry.tool("Tesseract (sh)") is tool
+    assert registry.languages(tool) == registry.languages(tool) == ['eng', 'ita']
+    assert len(discoveries) == 1
+    assert FakeTool.probes == 1
+    registry.refresh()
+    registry.tools()
+    assert len(discoveries) == 2
+# + + + + + OCR Registry + + + + +
+
+
+# + + + + + PDF Batch + + + + +
+@pytest.mark.parametrize("workers", [None, 2])
+def test_pdf_batch(tmp_path, workers):
+    from pdfer.batch import PDFBatch
+
+    for i in range(3):
+        make_pdf(tmp_path / f"doc_{i}.pdf", [f"Document {i}"])
+    (tmp_path / "doc_3.pdf").write_bytes(b"not a pdf")
+    batch = PDFBatch([str(tmp_path / "doc_*.pdf"), str(tmp_path / "missing.pdf")], workers=workers)
+    assert len(batch) == 5
+
+    results = batch.get_pdf_text()
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [r.result for r in results[:3]] == ["Document 0", "Document 1", "Document 2"]
+    assert [r.error is None for r in results] == [True, True, True, False, False]
+    unordered = batch.run('get_number_of_pages', ordered=False)
+    assert sorted(r.index for r in unordered) == [0, 1, 2, 3, 4]
+    assert batch.run('_close_file') is None
+
+
+def test_pdf_batch_timeout(pdf_path, monkeypatch, fake_raster):
+    import time
+    from pdfer.batch import PDFBatch
+
+    monkeypatch.setattr(PDF, 'get_pdf_text', lambda self: time.sleep(5))
+    start = time.perf_counter()
+    result, = PDFBatch(pdf_path, timeout=0.2).get_pdf_text()
+    assert result.error.startswith("TimeoutError")
+    assert time.perf_counter() - start < 2
+
+    # the OCR handles the errors of each page, not the timeout
+    monkeypatch.setattr(PDF, 'pyocr_image_to_df', lambda self, image, **kwargs: time.sleep(0.5) or fake_ocr_df(image))
+    start = time.perf_counter()
+    result, = PDFBatch(pdf_path, timeout=0.3).pdf_to_df()
+    assert result.error.startswith("TimeoutError") and result.result is None
+    assert time.perf_counter() - start < 1
+# + + + + + PDF Batch + + + + +
+
+
+# + + + + + Async PDF + + + + +
+def test_async_pdf(pdf_path, monkeypatch):
+    import asyncio
+    import pdfer.aio
+    from pdfer.aio import AsyncPDF
+
+    running = []
+    peak = []
+
+    class FakeProcess(object):
+        returncode = 0
+
+        def __init__(self, command):
+            self.command = command
+
+        async def communicate(self, stdin=None):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            if self.command[0] == 'pdftoppm':
+                return b"png of page " + self.command[-2].encode(), b""
+            page = stdin.decode().split()[-1]
+            if page == "3":
+                self.returncode = 1
+                return b"", b"broken page"
+            return f"level\ttext\n5\tword{page}\n".encode(), b""
+
+    async def fake_exec(*command, **kwargs):
+        return FakeProcess(command)
+
+    monkeypatch.setattr(pdfer.aio.asyncio, 'create_subprocess_exec', fake_exec)
+
+    async def main():
+        pdf = await AsyncPDF.open(pdf_path, max_concurrency=2)
+        assert "Page number 4" in await pdf.text()
+        pages = [page.page_text async for page in pdf.iter_pages("2-3")]
+        assert pages == ["Page number 1", "Page number 2"]
+        df = await pdf.ocr_df(pages="2-4")
+        await pdf.close()
+        return pdf, df
+
+    pdf, df = asyncio.run(main())
+    assert list(df['text']) == ["word2", "word4"]
+    assert list(df['page']) == [2, 4]
+    assert list(pdf.pdf.ocr_errors) == [3]
+    # never more subprocesses at once than the limit
+    assert max(peak) == 2
+    assert asyncio.run(AsyncPDF.open(pdf_path + ".missing")) is None
+
+
+def test_async_pdf_concurrent_page_texts(pdf_path, monkeypatch):
+    import asyncio
+    import time
+    from pdfer.aio import AsyncPDF
+
+    active = []
+    peak = []
+    get_page_text = PDF.get_page_text
+
+    def tracked_get_page_text(self, page_number):
+        active.append(1)
+        peak.append(len(active))
+        time.sleep(0.001)
+        try:
+            return get_page_text(self, page_number)
+        finally:
+            active.pop()
+
+    monkeypatch.setattr(PDF, 'get_page_text', tracked_get_page_text)
+
+    async def main():
+        pdf = await AsyncPDF.open(pdf_path, max_concurrency=8)
+        texts = await asyncio.gather(*[pdf.page_text(i % 5) for i in range(300)])
+        await pdf.close()
+        return texts
+
+    assert asyncio.run(main()) == [f"Page number {i % 5}" for i in range(300)]
+    # the reader is never used by two threads at once
+    assert max(peak) == 1
+
+
+def test_async_pdf_tables_of_file_like(pdf_path, monkeypatch):
+    import asyncio
+    import io
+    import pdfer.pdf
+    from pdfer.aio import AsyncPDF
+
+    with open(pdf_path, 'rb') as f:
+        content = f.read()
+    unlocked = []
+
+    class TrackedFile(io.BufferedReader):
+        # a generic file like object, every read after it is opened must hold the parse lock
+        def read(self, *args):
+            if pdf is not None and not pdf._parse_lock.locked():
+                unlocked.append('read')
+            return super().read(*args)
+
+    pdf = None
+    monkeypatch.setattr(pdfer.pdf.tabula, 'read_pdf', lambda source, **kwargs: [source.read()])
+
+    async def main():
+        nonlocal pdf
+        pdf = await AsyncPDF.open(TrackedFile(io.BytesIO(content)))
+        tables = await pdf.tables()
+        texts = await asyncio.gather(*[pdf.page_text(i) for i in range(5)])
+        await pdf.close()
+        return tables, texts
+
+    tables, texts = asyncio.run(main())
+    assert tables == [content] and texts[-1] == "Page number 4"
+    assert unlocked == []
+# + + + + + Async PDF + + + + +
+
+
+# + + + + + Table Engine + + + + +
+def _fake_tabula_table(top, left, text):
+    return {
+        "top": top, "left": left, "height": 20, "width": 50,
+        "data": [[{"text": "name"}], [{"text": text}]]
+    }
+
+
+def test_table_engine_batch(tmp_path, pdf_path, monkeypatch):
+    import glob
+    import json
+    import tabula
+    from pdfer.tables import TableEngine
+
+    runs = []
+
+    def fake_convert_into_by_batch(where, output_format, area=None, **kwargs):
+        # one java run for every page of every document
+        runs.append(sorted(os.listdir(where)))
+        for i, path in enumerate(sorted(glob.glob(os.path.join(where, "*.pdf")))):
+            tables = [_fake_tabula_table(top, left, f"{i}-{top}") for top, left, _, _ in area]
+            with open(path.replace('.pdf', '.json'), 'w') as f:
+                json.dump(tables, f)
+
+    monkeypatch.setattr(tabula, 'convert_into_by_batch', fake_convert_into_by_batch)
+    other_path = make_pdf(tmp_path / "other.pdf", ["Other 1", "Other 2"])
+    engine = TableEngine(mode='batch')
+    results = engine.extract(
+        [pdf_path, PDF(other_path)], pages=[0, 1],
+        areas=[[0, 0, 50, 50], [50, 50, 100, 100]], relative_area=True
+    )
+    assert engine.java_calls == 1
+    assert len(runs[0]) == 4
+    assert [(r.document, r.page, r.area) for r in results[::2]] == [(0, 1, 0), (0, 2, 0), (1, 1, 0), (1, 2, 0)]
+    assert [r.area for r in results[1::2]] == [1, 1, 1, 1]
+    assert list(results[3].df['name']) == ["1-396.0"]
+
+
+def test_pdf_get_page_tables_jvm(pdf_path, monkeypatch):
+    import tabula
+    from pdfer.tables import TableEngine
+
+    calls = []
+
+    def fake_read_pdf(path, pages, area=None, **kwargs):
+        calls.append((path, pages, area))
+        return [_fake_tabula_table(10, 10, f"page {pages}")]
+
+    monkeypatch.setattr(tabula, 'read_pdf', fake_read_pdf)
+    engine = TableEngine(mode='jvm')
+    results = PDF(pdf_path, lazy=True).get_page_tables(pages="2-3", engine=engine)
+    assert [(r.page, r.area, list(r.df['name'])) for r in results] == [(2, None, ["page 2"]), (3, None, ["page 3"])]
+    assert calls == [(pdf_path, 2, None), (pdf_path, 3, None)]
+# + + + + + Table Engine + + + + +
+
+
+# + + + + + OCR Preprocessor + + + + +
+def _glyphs_page(glyph_height=40, angle=0):
+    """A white page with rows of black glyph like boxes (a gray PIL image)"""
+    from PIL import Image, ImageDraw
+    image = Image.new('L', (1200, 1600), color=255)
+    draw = ImageDraw.Draw(image)
+    for row in range(10):
+        y = 300 + row * glyph_height * 2
+        for column in range(30):
+            x = 200 + column * glyph_height
+            draw.rectangle([x, y, x + glyph_height // 2, y + glyph_height - 1], fill=0)
+    return image.rotate(angle, fillcolor=255)
+
+
+def test_ocr_preprocessor():
+    from pdfer.preprocess import OCRPreprocessor
+
+    preprocess = OCRPreprocessor(quality='balanced')
+    measures = preprocess.measure(_glyphs_page(angle=3))
+    assert abs(measures.skew_angle - 3) < 0.5
+    image, scale, offset, _, _ = preprocess(_glyphs_page(angle=3))
+    # cropped to the text, straightened, glyphs at the target height
+    assert abs(scale - 24 / 40) < 0.03
+    assert offset[0] > 0 and offset[1] > 0
+    assert abs(preprocess.measure(image).skew_angle) < 0.5
+    assert abs(preprocess.measure(image).glyph_height - 24) <= 2
+    # a page already at the target is left at its scale
+    assert preprocess(_glyphs_page(glyph_height=24))[1] == 1.0
+    assert preprocess.dpi_for(40, 300) == 180
+    with pytest.raises(ValueError):
+        OCRPreprocessor(stages=['sharpen'])
+
+
+def test_pdf_to_df_preprocess(pdf_path, monkeypatch, fake_raster):
+    pdf = PDF(pdf_path)
+    fake_raster.page_image = lambda page, dpi: _glyphs_page(glyph_height=dpi // 5)
+    monkeypatch.setattr(pdf, 'pyocr_image_to_df', fake_ocr_df)
+    df = pdf.pdf_to_df(pages=[0, 1], dpi='auto', preprocess='fast')
+    # measured at 150 dpi (glyphs of 30 px), rasterized in gray at the dpi of 16 px glyphs
+    assert fake_raster.calls == [(1, 1, 150, False), (1, 2, 80, True)]
+    # the coordinates are on the page image, not on the cropped one
+    assert df['word_box_x0'].dtype == "Int32"
+    assert list(df['word_box_x0'])[:2] == [200 - 32, 200 - 32 + 5]
+    # the gray pages can be kept too
+    df = pdf.pdf_to_df(pages=[0], dpi=80, preprocess='fast', keep_page_images=True)
+    assert list(df['page'].unique()) == [1]
+    assert os.path.exists(os.path.join(os.path.dirname(pdf_path), "sample_page_1_auto_post_marked.jpg"))
+
+
+def test_restore_ocr_df_coordinates_deskewed():
+    import numpy as np
+    import pandas as pd
+    from pdfer.pdf import restore_ocr_df_coordinates
+    from pdfer.preprocess import OCRPreprocessor
+
+    page = _glyphs_page(angle=10)
+    result = OCRPreprocessor(stages=['crop', 'deskew', 'rescale'], quality='balanced')(page)
+    # a glyph in the middle of the page and where the preprocessing puts it
+    x, y = 600 + 10, 800 + 20
+    gx, gy = result.matrix.dot([x, y, 1])
+    df = restore_ocr_df_coordinates(pd.DataFrame({
+        "word_box_x0": pd.array([round(gx)], dtype="Int32"), "word_box_y0": pd.array([round(gy)], dtype="Int32"),
+        "word_box_x1": pd.array([round(gx)], dtype="Int32"), "word_box_y1": pd.array([round(gy)], dtype="Int32"),
+        "left": [round(gx)], "top": [round(gy)], "width": [0], "height": [0]
+    }), matrix=result.matrix)
+    # the rotation is undone too, not only the crop and the rescale
+    assert abs(df['word_box_x0'][0] - x) <= 2 and abs(df['word_box_y0'][0] - y) <= 2
+    assert abs(df['left'][0] - x) <= 2 and df['width'][0] == 0
+    assert abs(result.measures.skew_angle - 10) < 1 and not np.allclose(result.matrix[:, :2], np.eye(2) * result.scale)
+# + + + + + OCR Preprocessor + + + + +
+
+
+# + + + + + Layout + + + + +
+def _blocks_page(scale=1.0):
+    """A white page with two text blocks, drawn at a scale of a 1000 x 1300 page"""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (int(1000 * scale), int(1300 * scale)), color='white')
+    draw = ImageDraw.Draw(image)
+    for x0, y0, x1, y1 in [(100, 100, 500, 160), (100, 600, 800, 900)]:
+        for y in range(y0, y1, 16):
+            for x in range(x0, x1, 14):
+                draw.rectangle([x * scale, y * scale, (x + 7) * scale, (y + 12) * scale], fill='black')
+    return image
+
+
+def test_detect_regions_resolution_independent():
+    from pdfer.layout import detect_regions, line_items_regions
+
+    small, large = detect_regions(_blocks_page(1.0)), detect_regions(_blocks_page(2.5))
+    assert len(small) == len(large) == 2
+    for a, b in zip(small, large):
+        assert abs(a.x0 - b.x0) < 0.01 and abs(a.y0 - b.y0) < 0.01 and abs(a.y1 - b.y1) < 0.01
+    assert small[0].y0 < small[1].y0
+    assert abs(small[1].x0 - 0.1) < 0.02 and abs(small[1].y1 - 0.69) < 0.02
+    # only the block under the header is a line items region
+    assert [region.kind for region in line_items_regions(small)] == ['line_items']
+
+
+def test_ocr_image_regions(pdf_path, monkeypatch):
+    import pandas as pd
+
+    pdf = PDF(pdf_path, lazy=True)
+    sizes = []
+
+    def fake_ocr(image, **kwargs):
+        sizes.append(image.size)
+        return pd.DataFrame({"word_box_x0": pd.array([5], dtype="Int32"), "word_box_y0": pd.array([7], dtype="Int32")})
+
+    monkeypatch.setattr(pdf, 'pyocr_image_to_df', fake_ocr)
+    page = _blocks_page(2.0)
+    regions = pdf.detect_image_regions(page)
+    df = pdf.ocr_image_regions(page, workers=2)
+    # only the regions are OCRed, not the whole page
+    assert len(sizes) == 2 and all(w * h < 2000 * 2600 / 4 for w, h in sizes)
+    assert list(df['region']) == [0, 1]
+    x0, y0, _, _ = regions[1].to_pixels(*page.size)
+    assert (df['word_box_x0'][1], df['word_box_y0'][1]) == (x0 + 5, y0 + 7)
+# + + + + + Layout + + + + +
+
+
+# + + + + + Search + + + + +
+def test_page_index_search(tmp_path):
+    import pickle
+    import pandas as pd
+    from pdfer.search import PageIndex
+
+    index = PageIndex()
+    index.add_page(0, "Total amount due: 42 EUR")
+    index.add_page(1, "The amount is due in 30 days, the total amount")
+    index.add_ocr_page(2, pd.DataFrame({
+        "line_uuid": ["a", "a", "b"],
+        "word_box_x0": [10, 60, 10], "word_box_y0": [5, 5, 30], "word_box_x1": [50, 120, 40], "word_box_y1": [20, 20, 45],
+        "word_box_content": ["Total", "Amount", "paid"]
+    }))
+    assert index.pages("amount") == [0, 1, 2]
+    assert index.pages("total amount") == [0, 1, 2]
+    assert index.count("amount due") == 1
+    hit = index.find("total amount")[-1]
+    assert (hit.page, hit.box) == (2, (10, 5, 120, 20))
+    assert index.snippet(index.find("due")[0], width=0) == "due"
+    assert [(h.page, h.start) for h in index.find(r"\d+ (EUR|days)", regex=True)] == [(0, 18), (1, 21)]
+    # re-adding a page replaces it
+    index.add_page(1, "nothing here")
+    assert index.pages("amount") == [0, 2] and index.find("missing words") == []
+
+    path = index.save(tmp_path / "sample.pdf.index")
+    assert PageIndex.load(path).pages("paid") == [2]
+    assert PageIndex.load(path, digest="other") is None
+    assert PageIndex.load(path).find("total amount")[-1].box == (10, 5, 120, 20)
+    # an old pickled index is ignored, never unpickled
+    with open(path, 'wb') as f:
+        f.write(pickle.dumps((1, {"digest": None})))
+    assert PageIndex.load(path) is None
+
+
+def test_page_index_ocr_frames():
+    import pandas as pd
+    from pdfer.records import OCRPage
+    from pdfer.search import PageIndex
+
+    # the second line has no words: NA content and boxes in the nullable columns
+    ocr_page = OCRPage.from_line_boxes([
+        {"position": ((10, 5), (120, 20)), "content": "Total Amount", "word_boxes": [
+            {"position": ((10, 5), (50, 20)), "content": "Total", "confidence": 90},
+            {"position": ((60, 5), (120, 20)), "content": "Amount", "confidence": 80}
+        ]},
+        {"position": ((10, 30), (40, 45)), "content": None, "word_boxes": []},
+        {"position": ((10, 50), (40, 65)), "content": "paid", "word_boxes": [
+            {"position": ((10, 50), (40, 65)), "content": "paid", "confidence": None}
+        ]}
+    ])
+    index = PageIndex()
+    index.add_ocr_page(0, ocr_page.to_df())
+    assert index.find("Amount\npaid", regex=True) and index.count("total amount") == 1
+    assert index.find("paid")[0].box == (10, 50, 40, 65)
+
+    # pytesseract frames: line 1 of block 1 and line 1 of block 2 are two lines
+    index.add_ocr_page(1, pd.DataFrame({
+        "block_num": [1, 1, 2], "par_num": [1, 1, 1], "line_num": [1, 1, 1],
+        "left": [10, 60, 10], "top": [5, 5, 300], "width": [40, 60, 30], "height": [15, 15, 15],
+        "text": ["Total", "Amount", None]
+    }).astype({"text": "string"}))
+    index.add_ocr_page(2, pd.DataFrame({
+        "block_num": [1, 2], "par_num": [1, 1], "line_num": [1, 1],
+        "left": [10, 10], "top": [5, 300], "width": [40, 30], "height": [15, 15], "text": ["Total", "paid"]
+    }))
+    assert index.pages("Total\npaid", regex=True) == [2] and index.pages("total amount") == [0, 1]
+
+
+def test_pdf_search(pdf_path, monkeypatch):
+    pdf = PDF(pdf_path, lazy=True)
+    hits = pdf.search("number 3")
+    assert [(hit.page, hit.start, hit.end) for hit in hits] == [(3, 5, 13)]
+    assert os.path.exists(pdf.search_index_path())
+    # a plain JSON file, nothing is unpickled
+    with open(pdf.search_index_path()) as f:
+        assert f.read().startswith('{"version": 2')
+    # the saved index is used, no page is extracted again
+    iter_page_texts = PDF.iter_page_texts
+    monkeypatch.setattr(PDF, 'iter_page_texts', lambda *args, **kwargs: pytest.fail("re-extracted"))
+    other = PDF(pdf_path, lazy=True)
+    assert other.search("page", regex=False) and other.search_index.pages("page") == [0, 1, 2, 3, 4]
+
+    # only the selected pages are extracted, an empty selection is an empty index
+    extracted = []
+
+    def tracked_iter_page_texts(self, start=None, stop=None, chunk_size=1):
+        for page_number, text in iter_page_texts(self, start, stop, chunk_size):
+            extracted.append(page_number)
+            yield page_number, text
+
+    monkeypatch.setattr(PDF, 'iter_page_texts', tracked_iter_page_texts)
+    index = other.build_search_index(pages="1,5", save=False, index_path=pdf_path + ".other.index")
+    assert index.pages_indexed() == [0, 4] and extracted == [0, 4]
+    assert len(other.build_search_index(pages=[])) == 0 and other.search("page") == []
+# + + + + + Search + + + + +
+
+
+# + + + + + Metrics + + + + +
+@pytest.mark.parametrize("executor", ['thread', 'process'])
+def test_pdf_timed_stages(pdf_path, monkeypatch, executor):
+    from PIL import Image
+    import pandas as pd
+    import pdfer.pdf
+    import pdfer.raster
+    from pdfer.metrics import NULL_SPAN, TimingReport, instrumentation
+
+    assert instrumentation.span('parse') is NULL_SPAN
+    with instrumentation.hooked(TimingReport()) as opened:
+        pdf = PDF(pdf_path)
+    assert [span.name for span in opened.spans].count('page_text') == 5
+    assert opened.stages()['parse']['count'] == 1
+    assert opened.spans[-1].attributes['bytes'] == os.path.getsize(pdf_path)
+
+    monkeypatch.setattr(pdfer.raster, 'convert_from_path', lambda path, first_page, last_page, **kwargs: [
+        Image.new('RGB', (page, page)) for page in range(first_page, last_page + 1)
+    ])
+    monkeypatch.setattr(pdfer.pdf.pt, 'image_to_data', lambda im, **kwargs: pd.DataFrame({"text": ["x"]}))
+    with pdf.timed() as report:
+        df = pdf.pdf_to_df(ocr='pytesseract', workers=2, executor=executor, batch_size=2, pages="1-3")
+    assert list(df['page']) == [1, 2, 3]
+    stages = report.stages()
+    assert list(stages) == ['rasterize', 'ocr']
+    assert stages['rasterize']['count'] == 2 and stages['ocr']['count'] == 3
+    assert report.spans[0].attributes['dpi'] == 350
+    assert 'pdfer_stage_seconds_count{stage="ocr"} 3' in report.to_prometheus()
+    # the hook is gone after the block
+    assert not instrumentation.enabled
+    pdf.close()
+# + + + + + Metrics + + + + +
+
+
+# + + + + + Columnar Export + + + + +
+@pytest.mark.parametrize("format", ['parquet', 'arrow'])
+def test_pdf_to_columnar(pdf_path, monkeypatch, format, fake_raster):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+    import pyarrow.parquet as pq
+    from pdfer.export import read_pages
+    from pdfer.tables import TableResult
+
+    pdf = PDF(pdf_path, lazy=True)
+    monkeypatch.setattr(pdf, 'pyocr_image_to_df', fake_ocr_df)
+    path = getattr(pdf, f'pdf_to_{format}')(content='ocr', pages="2-4", row_group_pages=2, batch_size=2)
+    assert path.endswith(f"sample_ocr.{format}")
+    if format == 'parquet':
+        # 3 pages, 2 per row group
+        assert pq.ParquetFile(path).num_row_groups == 2
+    df = read_pages(path, pages=[3], format=format)
+    assert list(df['page']) == [3, 3, 3] and list(df['line_id']) == [0, 0, 1]
+    assert df['word_box_content'].tolist()[:2] == ["scanned", "3"] and df['word_box_x0'].isna().tolist() == [False, False, True]
+
+    path = getattr(pdf, f'pdf_to_{format}')(content='text')
+    assert read_pages(path, pages=5, columns=['text'], format=format)['text'].tolist() == ["Page number 4"]
+
+    table_calls = []
+    monkeypatch.setattr(pdf, 'get_page_tables', lambda pages=None, **kwargs: table_calls.append(pages) or [
+        TableResult(0, pages[0] + 1, None, 0, pd.DataFrame({"a": ["1", None], "b": ["2", "3"]}))
+    ])
+    df = read_pages(getattr(pdf, f'pdf_to_{format}')(content='tables', pages="1-3", row_group_pages=2), pages=[1], format=format)
+    # extracted (and written) one row group of pages at a time
+    assert table_calls == [[0, 1], [2]]
+    assert df[['row', 'column']].values.tolist() == [[0, 'a'], [0, 'b'], [1, 'a'], [1, 'b']]
+    assert df['value'].fillna('-').tolist() == ['1', '2', '-', '3']
+
+    # a failed extraction leaves no partial file
+    monkeypatch.setattr(pdf, 'get_page_tables', lambda pages=None, **kwargs: None if pages == [2] else [])
+    assert getattr(pdf, f'pdf_to_{format}')(content='tables', pages="1-3", row_group_pages=2) is None
+    assert not os.path.exists(os.path.join(os.path.dirname(pdf_path), f"sample_tables.{format}"))
+    pdf.close()
+# + + + + + Columnar Export + + + + +
+
+
+# + + + + + Document Cache + + + + +
+def test_document_cache_reopen(pdf_path, monkeypatch):
+    import PyPDF2
+    from pdfer.cache import DocumentCache
+    cache = DocumentCache()
+    pdf = PDF(pdf_path, document_cache=cache)
+    pdf.close()
+    # the same file again: no parse and no text extraction
+    monkeypatch.setattr(PyPDF2, 'PdfFileReader', lambda *args, **kwargs: pytest.fail("parsed again"))
+    again = PDF(pdf_path, document_cache=cache)
+    assert again.text == pdf.text and again._pdf_reader is None
+    assert list(PDF(pdf_path, lazy=True, document_cache=cache).iter_page_texts(stop=2)) == [(0, "Page number 0"), (1, "Page number 1")]
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+    monkeypatch.undo()
+    # writing the file forgets it
+    again.to_pdf(pages=[0, 1])
+    assert len(cache) == 0
+    assert PDF(pdf_path, document_cache=cache).text == "Page number 0 Page number 1"
+    # streaming and lazy pages never fill the cache, no cache by default
+    cache.clear()
+    lazy = PDF(pdf_path, lazy=True, document_cache=cache)
+    assert len(list(lazy.iter_page_texts())) == 2 and lazy.get_page_text(0) == "Page number 0"
+    assert cache.get(lazy._document_key()).texts == {}
+    assert PDF(pdf_path)._document_key() is None and PDF(pdf_path, document_cache=True)._documents() is not None
 
 
-# TODO
+def test_document_cache_lru_eviction():
+    from pdfer.cache import DocumentCache
+    cache = DocumentCache(max_size=3000)
+    for i in range(3):
+        cache.add(('doc', i), 1, {0: "x" * 1000})
+    assert ('doc', 0) not in cache and ('doc', 2) in cache
+    assert cache.get(('doc', 1)).texts == {0: "x" * 1000}
+    cache.add(('doc', 3), 1, {0: "x" * 1000})
+    # the one just used is kept
+    assert ('doc', 1) in cache and ('doc', 2) not in cache
+    assert cache.size <= 3000 and cache.evictions == 2
+# + + + + + Document Cache + + + + +